@@ -0,0 +1,75 @@
+"""对比单进程 filter_complex 编码与分段并行编码的合并耗时
+
+用 lavfi 生成与 mock 后端同规格的测试片段，然后分别用两种方式合并：
+
+    python benchmarks/bench_chunked_merge.py --clips 12 --seconds 6 --jobs 4
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from videoclaw.ffmpeg.chunked import DEFAULT_CHUNK_SECONDS, chunked_encode
+from videoclaw.ffmpeg.merge import MergeTarget, build_filter_merge_command
+from videoclaw.ffmpeg.probe import probe
+from videoclaw.ffmpeg.runner import run_ffmpeg
+
+
+def make_clip(path: Path, seconds: float, width: int, height: int, index: int) -> None:
+    """生成带画面和正弦音的测试片段"""
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=24:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency={220 + index * 40}:duration={seconds}",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", str(path),
+    ], check=True)
+
+
+def timed(label: str, func) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:8.2f}s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=12, help="片段数量")
+    parser.add_argument("--seconds", type=float, default=6.0, help="每个片段时长（秒）")
+    parser.add_argument("--size", default="1280x720", help="片段分辨率")
+    parser.add_argument("--jobs", type=int, default=0, help="分段编码并发数，0 表示按 CPU 核心数")
+    parser.add_argument("--chunk-seconds", type=float, default=DEFAULT_CHUNK_SECONDS, help="分段时长（秒）")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    with tempfile.TemporaryDirectory(prefix="videoclaw-bench-") as tmp:
+        work = Path(tmp)
+        print(f"生成 {args.clips} 个 {args.size} 片段，每个 {args.seconds:g} 秒 ...")
+        paths = []
+        for i in range(args.clips):
+            path = work / f"clip_{i:03d}.mp4"
+            make_clip(path, args.seconds, width, height, i)
+            paths.append(path)
+        infos = [probe(str(p)) for p in paths]
+        target = MergeTarget.from_infos(infos)
+
+        single = timed("单进程 filter_complex", lambda: run_ffmpeg(
+            build_filter_merge_command(infos, work / "single.mp4", target)
+        ))
+        chunked = timed("分段并行编码", lambda: chunked_encode(
+            infos, work / "chunked.mp4", target,
+            chunk_seconds=args.chunk_seconds, jobs=args.jobs,
+        ))
+        print(f"{'加速比':<24} {single / chunked:8.2f}x")
+        for name in ("single.mp4", "chunked.mp4"):
+            info = probe(str(work / name))
+            print(f"{name:<24} {info.duration:8.2f}s  {(work / name).stat().st_size / 1e6:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""对比参考图旧编码路径（每次解码并重新编码）与 videoclaw.media.images 的预处理耗时
+
+生成不同尺寸的 JPEG/PNG 测试图，按各服务商的尺寸规则编码为 data URL，输出耗时和请求体大小：
+
+    python benchmarks/bench_image_encode.py --repeat 20
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import logging
+import time
+
+from PIL import Image, ImageFilter
+
+from videoclaw.media.images import (
+    SEEDANCE_RULE,
+    SEEDREAM_I2I_RULE,
+    ImageRule,
+    clear_cache,
+    image_data_url,
+)
+
+
+def make_image(size: tuple, fmt: str) -> bytes:
+    """生成带噪声的渐变测试图（纯色或纯渐变图压缩率过高，不能代表真实负载）"""
+    noise = Image.effect_noise(size, 40).filter(ImageFilter.GaussianBlur(1))
+    img = Image.merge("RGB", [Image.linear_gradient("L").resize(size), noise, noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)])
+    buffered = io.BytesIO()
+    img.save(buffered, format=fmt, quality=90) if fmt == "JPEG" else img.save(buffered, format=fmt)
+    return buffered.getvalue()
+
+
+def legacy_data_url(data: bytes, min_size: int = 300, max_side: int = 0, min_pixels: int = 0) -> str:
+    """旧实现：总是完整解码、按原格式重新编码（缩放后变为 PNG）"""
+    img = Image.open(io.BytesIO(data))
+    if min_pixels and img.width * img.height < min_pixels:
+        scale = (min_pixels / (img.width * img.height)) ** 0.5
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+    elif img.width < min_size or img.height < min_size:
+        scale = max(min_size / img.width, min_size / img.height)
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+    elif max_side and max(img.size) > max_side:
+        scale = max_side / max(img.size)
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+    buffered = io.BytesIO()
+    img_format = img.format or "PNG"
+    img.save(buffered, format=img_format)
+    return f"data:image/{img_format.lower()};base64,{base64.b64encode(buffered.getvalue()).decode()}"
+
+
+def timed(label: str, func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<20} {elapsed:8.2f} ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="每项重复次数")
+    args = parser.parse_args()
+    logging.getLogger("media.images").setLevel(logging.WARNING)
+
+    cases = [
+        ("JPEG 1920x1080（透传）", make_image((1920, 1080), "JPEG"), SEEDANCE_RULE),
+        ("PNG 1920x1080（过大，重新编码）", make_image((1920, 1080), "PNG"), SEEDANCE_RULE),
+        ("JPEG 200x150（放大）", make_image((200, 150), "JPEG"), SEEDANCE_RULE),
+        ("JPEG 4000x3000（缩小）", make_image((4000, 3000), "JPEG"), ImageRule(max_side=1024)),
+        ("PNG 1024x1024（Seedream 放大）", make_image((1024, 1024), "PNG"), SEEDREAM_I2I_RULE),
+    ]
+    for name, data, rule in cases:
+        print(f"{name}  {len(data) / 1e3:.0f} KB")
+        legacy_bytes = len(legacy_data_url(data, rule.min_side, rule.max_side, rule.min_pixels))
+        legacy = timed(
+            "旧实现",
+            lambda data=data, rule=rule: legacy_data_url(data, rule.min_side, rule.max_side, rule.min_pixels),
+            args.repeat,
+        )
+        cold = timed(
+            "预处理（无缓存）", lambda data=data, rule=rule: (clear_cache(), image_data_url(data, rule)), args.repeat
+        )
+        timed("预处理（命中缓存）", lambda data=data, rule=rule: image_data_url(data, rule), args.repeat)
+        print(f"  {'加速比':<20} {legacy / cold:8.2f}x")
+        print(f"  {'data URL（旧 → 新）':<20} {legacy_bytes / 1e3:8.0f} KB → {len(image_data_url(data, rule)) / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
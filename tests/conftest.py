@@ -0,0 +1,15 @@
+"""Shared pytest fixtures"""
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def fake_download():
+    """Factory for a download() stand-in that writes data to the destination like the streaming downloader"""
+    def factory(data):
+        def fake(url, dest, **kwargs):
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            Path(dest).write_bytes(data)
+        return fake
+    return factory
@@ -0,0 +1,113 @@
+"""Tests for content-addressed cache"""
+import os
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from videoclaw.cache import ContentCache, file_digest, parse_size
+
+
+def test_parse_size():
+    """Test human readable cache sizes"""
+    assert parse_size("512MB") == 512 * 1024 ** 2
+    assert parse_size("2G") == 2 * 1024 ** 3
+    assert parse_size(1000) == 1000
+    assert parse_size(None) == 0
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_file_digest_tracks_content(tmp_path):
+    """Test digest changes with content, not with name"""
+    a = tmp_path / "a.mp4"
+    b = tmp_path / "b.mp4"
+    a.write_bytes(b"clip")
+    b.write_bytes(b"clip")
+    assert file_digest(a) == file_digest(b)
+    b.write_bytes(b"regenerated")
+    assert file_digest(a) != file_digest(b)
+
+
+def test_put_and_get(tmp_path):
+    """Test entries are stored by key and moved into the cache"""
+    cache = ContentCache(tmp_path / "cache")
+    src = tmp_path / "encoded.mp4"
+    src.write_bytes(b"x" * 10)
+
+    key = ContentCache.make_key("digest", "1280x720", "fast")
+    assert cache.get(key, ".mp4") is None
+    stored = cache.put(key, src, ".mp4")
+
+    assert not src.exists()
+    assert cache.get(key, ".mp4") == stored
+    assert stored.read_bytes() == b"x" * 10
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    """Test eviction keeps recently used entries within the size limit"""
+    cache = ContentCache(tmp_path / "cache", max_bytes=25)
+    for name in ["old", "mid", "new"]:
+        src = tmp_path / name
+        src.write_bytes(b"x" * 10)
+        path = cache.put(name, src)
+        os.utime(path, (time.time() - 100, time.time() - 100))
+
+    # 访问 old 使其成为最近使用
+    cache.get("old")
+
+    removed, freed = cache.prune()
+    assert (removed, freed) == (1, 10)
+    assert cache.get("mid") is None
+    assert cache.get("old") is not None
+    assert cache.get("new") is not None
+
+
+def test_prune_without_limit_keeps_everything(tmp_path):
+    """Test unlimited cache is only cleared explicitly"""
+    cache = ContentCache(tmp_path / "cache")
+    src = tmp_path / "a"
+    src.write_bytes(b"x")
+    cache.put("a", src)
+    assert cache.prune() == (0, 0)
+    assert cache.prune(0) == (1, 1)
+
+
+def test_cache_prune_command(tmp_path, monkeypatch):
+    """Test videoclaw cache prune --all clears project caches"""
+    from videoclaw.cli.commands import cache as cache_cmd
+
+    monkeypatch.setattr(cache_cmd, "DEFAULT_PROJECTS_DIR", tmp_path)
+    project = tmp_path / "demo"
+    store = ContentCache.for_project(project, "normalized")
+    src = tmp_path / "clip.mp4"
+    src.write_bytes(b"x" * 100)
+    store.put("k", src, ".mp4")
+
+    result = CliRunner().invoke(cache_cmd.cache, ["prune", "-p", "demo", "--all"])
+    assert result.exit_code == 0
+    assert "共删除 1 个文件" in result.output
+    assert store.size() == 0
+
+
+def test_configured_max_bytes_reads_global_config(tmp_path, monkeypatch):
+    """Test global caches (no project) are capped by the global cache.max_size"""
+    from videoclaw.cache import DEFAULT_MAX_SIZE, configured_max_bytes
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert configured_max_bytes() == parse_size(DEFAULT_MAX_SIZE)
+
+    (tmp_path / ".videoclaw").mkdir()
+    (tmp_path / ".videoclaw" / "config.yaml").write_text("cache:\n  max_size: 256MB\n")
+    assert configured_max_bytes() == 256 * 1024 ** 2
+
+
+def test_prune_keeps_requested_entries(tmp_path):
+    """Test prune never deletes entries passed in keep, even over the limit"""
+    cache = ContentCache(tmp_path / "cache", max_bytes=5)
+    src = tmp_path / "big"
+    src.write_bytes(b"y" * 50)
+    stored = cache.put("k", src, ".mp4")
+
+    assert cache.prune(keep=[stored]) == (0, 0)
+    assert stored.exists()
@@ -0,0 +1,165 @@
+"""Tests for streaming, resumable downloads"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from videoclaw.utils import download as download_module
+from videoclaw.utils.download import DownloadError, download
+
+PAYLOAD = bytes(range(256)) * 1024  # 256 KiB
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range/If-Range support; drops the first response after `cut` bytes
+
+    When `unsatisfiable` is not None, the first Range request gets a 416 with that Content-Range
+    (an empty string means no Content-Range header).
+    """
+    cut = None
+    status = 200
+    etag = '"v1"'
+    unsatisfiable = None
+    requests = []
+    if_ranges = []
+
+    def do_GET(self):
+        type(self).requests.append(self.headers.get("Range"))
+        type(self).if_ranges.append(self.headers.get("If-Range"))
+        if type(self).status != 200:
+            self.send_response(type(self).status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start = 0
+        header = self.headers.get("Range")
+        if header and type(self).unsatisfiable is not None:
+            self.send_response(416)
+            if type(self).unsatisfiable:
+                self.send_header("Content-Range", type(self).unsatisfiable)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            type(self).unsatisfiable = None
+            return
+        if header and self.headers.get("If-Range") == type(self).etag:
+            start = int(header.split("=")[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        body = PAYLOAD[start:]
+        self.send_header("ETag", type(self).etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if type(self).cut is not None:
+            self.wfile.write(body[:type(self).cut])
+            type(self).cut = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(download_module, "RETRY_BACKOFF", 0)
+    _Handler.cut, _Handler.status, _Handler.requests, _Handler.if_ranges = None, 200, [], []
+    _Handler.etag, _Handler.unsatisfiable = '"v1"', None
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/video.mp4"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_streams_to_file_atomically(server, tmp_path):
+    """Test the file is written in chunks and only appears once complete"""
+    seen = []
+    result = download(server, tmp_path / "out" / "video.mp4", chunk_size=64 * 1024,
+                      on_progress=lambda done, total: seen.append((done, total)))
+
+    assert result.path.read_bytes() == PAYLOAD
+    assert result.size == result.transferred == len(PAYLOAD)
+    assert seen[-1] == (len(PAYLOAD), len(PAYLOAD))
+    assert len(seen) > 1
+    assert not (tmp_path / "out" / "video.mp4.part").exists()
+
+
+def test_download_resumes_with_range_after_drop(server, tmp_path):
+    """Test a dropped connection resumes from the bytes already written"""
+    _Handler.cut = 100_000
+    result = download(server, tmp_path / "video.mp4", chunk_size=16 * 1024)
+
+    assert result.path.read_bytes() == PAYLOAD
+    assert result.resumed
+    # 只有最后一块未完整读取的数据需要重新传输
+    assert _Handler.requests == [None, f"bytes={6 * 16 * 1024}-"]
+
+
+def test_download_continues_leftover_part_file(server, tmp_path):
+    """Test a .part left by an earlier process is continued, not restarted"""
+    (tmp_path / "video.mp4.part").write_bytes(PAYLOAD[:5000])
+    (tmp_path / "video.mp4.part.validator").write_text('"v1"')
+    result = download(server, tmp_path / "video.mp4")
+
+    assert result.path.read_bytes() == PAYLOAD
+    assert result.transferred == len(PAYLOAD) - 5000
+    assert _Handler.requests == ["bytes=5000-"]
+    assert _Handler.if_ranges == ['"v1"']
+    assert not (tmp_path / "video.mp4.part.validator").exists()
+
+
+def test_download_restarts_when_resource_changed(server, tmp_path):
+    """Test If-Range makes a changed resource come back whole instead of being appended"""
+    (tmp_path / "video.mp4.part").write_bytes(b"x" * 5000)
+    (tmp_path / "video.mp4.part.validator").write_text('"old"')
+    result = download(server, tmp_path / "video.mp4")
+
+    assert result.path.read_bytes() == PAYLOAD
+    assert _Handler.if_ranges == ['"old"']
+
+
+def test_download_discards_part_without_validator(server, tmp_path):
+    """Test a .part whose origin cannot be verified is not resumed"""
+    (tmp_path / "video.mp4.part").write_bytes(b"x" * 5000)
+    result = download(server, tmp_path / "video.mp4")
+
+    assert result.path.read_bytes() == PAYLOAD
+    assert _Handler.requests == [None]
+
+
+def test_download_416_without_total_restarts_in_same_attempt(server, tmp_path, monkeypatch):
+    """Test a 416 lacking bytes */N restarts from byte 0 instead of renaming a missing part"""
+    monkeypatch.setattr(download_module.time, "sleep", lambda s: pytest.fail("retried"))
+    (tmp_path / "video.mp4.part").write_bytes(PAYLOAD[:5000])
+    (tmp_path / "video.mp4.part.validator").write_text('"v1"')
+    _Handler.unsatisfiable = ""
+    result = download(server, tmp_path / "video.mp4")
+
+    assert result.path.read_bytes() == PAYLOAD
+    assert _Handler.requests == ["bytes=5000-", None]
+
+
+def test_download_416_with_matching_total_completes_without_retry(server, tmp_path, monkeypatch):
+    """Test a complete .part confirmed by 416 bytes */N is used without another request or backoff"""
+    monkeypatch.setattr(download_module.time, "sleep", lambda s: pytest.fail("retried"))
+    (tmp_path / "video.mp4.part").write_bytes(PAYLOAD)
+    (tmp_path / "video.mp4.part.validator").write_text('"v1"')
+    _Handler.unsatisfiable = f"bytes */{len(PAYLOAD)}"
+    result = download(server, tmp_path / "video.mp4")
+
+    assert result.path.read_bytes() == PAYLOAD
+    assert result.transferred == 0
+    assert _Handler.requests == [f"bytes={len(PAYLOAD)}-"]
+
+
+def test_download_fails_fast_on_client_error(server, tmp_path):
+    """Test expired URLs (4xx) are not retried"""
+    _Handler.status = 403
+    with pytest.raises(DownloadError, match="HTTP 403"):
+        download(server, tmp_path / "video.mp4")
+    assert len(_Handler.requests) == 1
+    assert not (tmp_path / "video.mp4").exists()
@@ -0,0 +1,78 @@
+"""Tests for GOP-aligned chunked parallel encoding"""
+from pathlib import Path
+
+from videoclaw.ffmpeg.chunked import (
+    build_audio_command,
+    build_chunk_command,
+    build_join_command,
+    plan_chunks,
+)
+from videoclaw.ffmpeg.merge import MergeTarget
+from videoclaw.ffmpeg.probe import MediaInfo
+
+
+def _info(path, duration, audio="aac"):
+    return MediaInfo(
+        path=path, duration=duration, width=1280, height=720, fps="24/1",
+        video_codec="h264", audio_codec=audio, sample_rate=44100 if audio else None,
+    )
+
+
+def test_plan_chunks_are_gop_aligned_and_cover_timeline():
+    """Test chunks start on GOP boundaries and cover every frame once"""
+    infos = [_info("a.mp4", 5.0), _info("b.mp4", 7.0), _info("c.mp4", 3.0)]
+    chunks = plan_chunks(infos, MergeTarget(fps="24"), chunk_seconds=5)
+
+    # 5 秒向上取整到 2 秒 GOP 的整数倍：6 秒 = 144 帧
+    assert [c.start_frame for c in chunks] == [0, 144, 288]
+    assert [c.frames for c in chunks] == [144, 144, 72]
+    assert sum(c.frames for c in chunks) == 15 * 24
+    for chunk in chunks:
+        assert sum(frames for _, _, frames in chunk.segments) == chunk.frames
+    assert chunks[0].segments == [(0, 0, 120), (1, 0, 24)]
+    assert chunks[1].segments == [(1, 24, 144)]
+    assert chunks[2].segments == [(2, 0, 72)]
+
+
+def test_plan_chunks_splits_across_clip_boundaries():
+    """Test a chunk spanning a clip boundary lists both clips"""
+    infos = [_info("a.mp4", 3.0), _info("b.mp4", 3.0)]
+    chunks = plan_chunks(infos, MergeTarget(fps="24"), chunk_seconds=4)
+
+    assert len(chunks) == 2
+    assert chunks[0].segments == [(0, 0, 72), (1, 0, 24)]
+    assert chunks[1].segments == [(1, 24, 48)]
+
+
+def test_build_chunk_command_seeks_and_trims_exact_frames():
+    """Test a chunk seeks into its clips and trims to an exact frame count"""
+    infos = [_info("a.mp4", 3.0), _info("b.mp4", 3.0)]
+    chunk = plan_chunks(infos, MergeTarget(fps="24"), chunk_seconds=4)[1]
+
+    cmd = build_chunk_command(chunk, infos, MergeTarget(fps="24"), Path("out.mp4"), threads=2)
+
+    assert cmd[cmd.index("-ss") + 1] == "1.000000"
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert "trim=end_frame=48" in graph
+    assert "-an" in cmd
+    assert cmd[cmd.index("-g") + 1] == "48"
+    assert cmd[cmd.index("-threads") + 1] == "2"
+
+
+def test_build_audio_command_pads_clips_to_frame_durations():
+    """Test audio is encoded once for the whole timeline with silent gaps"""
+    infos = [_info("a.mp4", 2.0), _info("b.mp4", 1.0, audio=None)]
+    cmd = build_audio_command(infos, MergeTarget(fps="24"), Path("a.m4a"), bgm_file="bgm.mp3")
+
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert "apad=whole_dur=2.000" in graph
+    assert "anullsrc" in graph
+    assert "amix" in graph
+    assert "-vn" in cmd
+
+
+def test_build_join_command_copies_streams():
+    """Test chunks and audio are joined without re-encoding"""
+    cmd = build_join_command(Path("list.txt"), Path("a.m4a"), Path("out.mp4"))
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert cmd[-1] == "out.mp4"
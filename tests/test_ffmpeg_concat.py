@@ -0,0 +1,69 @@
+"""Tests for media probing and stream-copy concat planning"""
+import json
+from unittest.mock import patch, MagicMock
+
+from videoclaw.ffmpeg.concat import match_encode_args, plan_copy_concat
+from videoclaw.ffmpeg.probe import MediaInfo, probe
+
+
+def _info(path="a.mp4", width=1280, height=720, fps="24/1", audio="aac"):
+    return MediaInfo(
+        path=path, duration=5.0, width=width, height=height, fps=fps,
+        video_codec="h264", profile="High", pix_fmt="yuv420p",
+        video_timescale=12288, audio_codec=audio,
+        sample_rate=44100 if audio else None, channels=2 if audio else None,
+    )
+
+
+FFPROBE_OUTPUT = {
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "profile": "High",
+         "width": 1280, "height": 720, "r_frame_rate": "24/1",
+         "pix_fmt": "yuv420p", "sample_aspect_ratio": "1:1", "time_base": "1/12288"},
+        {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100",
+         "channels": 2, "channel_layout": "stereo"},
+    ],
+    "format": {"duration": "5.041667"},
+}
+
+
+def test_probe_parses_ffprobe_json():
+    """Test a single JSON ffprobe call fills MediaInfo"""
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(stdout=json.dumps(FFPROBE_OUTPUT))
+        info = probe("clip.mp4")
+
+    assert mock_run.call_count == 1
+    assert info.width == 1280 and info.height == 720
+    assert info.fps_value == 24.0
+    assert info.video_timescale == 12288
+    assert info.audio_codec == "aac"
+    assert info.sample_rate == 44100
+    assert abs(info.duration - 5.041667) < 1e-6
+
+
+def test_plan_all_compatible():
+    """Test identical clips need no re-encode"""
+    plan = plan_copy_concat([_info("a"), _info("b"), _info("c")])
+    assert plan is not None
+    assert plan.all_compatible
+
+
+def test_plan_reencodes_only_mismatched():
+    """Test the minority clip is re-encoded to match the rest"""
+    plan = plan_copy_concat([_info("a"), _info("b", width=720, height=1280), _info("c")])
+    assert plan.mismatched == [1]
+    assert plan.reference.width == 1280
+
+
+def test_plan_rejects_unprobed_inputs():
+    """Test probe failures fall back to full re-encode"""
+    assert plan_copy_concat([_info("a"), None]) is None
+
+
+def test_match_encode_args_adds_silent_audio_for_mute_clip():
+    """Test a clip without audio maps the anullsrc input"""
+    args = match_encode_args(_info("ref"), _info("mute", audio=None))
+    assert "1:a:0" in args
+    assert "-shortest" in args
+    assert args[args.index("-video_track_timescale") + 1] == "12288"
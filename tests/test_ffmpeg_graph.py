@@ -0,0 +1,98 @@
+"""Tests for the composable filter-graph compiler"""
+import io
+
+import pytest
+
+from videoclaw.ffmpeg.graph import AUDIO, FilterGraph, GraphError, escape_value
+
+
+def test_linear_chain_collapses_into_one_statement():
+    """Test consecutive single-input filters are joined with commas"""
+    graph = FilterGraph()
+    clip = graph.input("in.mp4")
+    video = clip.video.scale(1280, 720).fps(24).fade("in", 0, 0.5)
+    graph.output("out.mp4", video, clip.audio, args=["-c:a", "copy"])
+
+    cmd = graph.compile()
+
+    assert cmd[cmd.index("-filter_complex") + 1] == "[0:v:0]scale=1280:720,fps=24,fade=t=in:st=0:d=0.5[v0]"
+    assert cmd[-7:] == ["-map", "[v0]", "-map", "0:a:0", "-c:a", "copy", "out.mp4"]
+    assert cmd[:2] == ["ffmpeg", "-y"]
+
+
+def test_stream_used_twice_gets_automatic_split():
+    """Test a filter output consumed by two outputs is split"""
+    graph = FilterGraph()
+    clip = graph.input("in.mp4")
+    scaled = clip.video.scale(640, 360)
+    graph.output("a.mp4", scaled)
+    graph.output("b.mp4", scaled.filter("hflip"))
+
+    filters = graph.compile_filter()
+
+    assert filters == "[0:v:0]scale=640:360,split=2[v0][v1];[v0]hflip[v2]"
+    cmd = graph.compile()
+    assert cmd[cmd.index("a.mp4") - 1] == "[v1]"
+    assert cmd[cmd.index("b.mp4") - 1] == "[v2]"
+
+
+def test_labels_and_concat():
+    """Test explicit labels are kept and end a chain"""
+    graph = FilterGraph()
+    clips = [graph.input(f"{i}.mp4") for i in range(2)]
+    joined = graph.concat([[c.video, c.audio] for c in clips])
+    video = joined[0].label("vout")
+    audio = joined[1].label("aout").volume(2)
+    graph.output("out.mp4", video, audio)
+
+    filters = graph.compile_filter()
+
+    assert filters == "[0:v:0][0:a:0][1:v:0][1:a:0]concat=n=2:v=1:a=1[vout][aout];[aout]volume=2[a0]"
+
+
+def test_source_filter_and_audio_kind():
+    """Test source filters have no input pads"""
+    graph = FilterGraph()
+    silence = graph.source("anullsrc", kind=AUDIO, r=44100, cl="stereo").trim(duration=1)
+    graph.output("silence.m4a", silence)
+
+    assert graph.compile_filter() == "anullsrc=r=44100:cl=stereo,atrim=duration=1[a0]"
+
+
+def test_escape_value():
+    """Test option values are escaped for both option and graph parsing"""
+    assert escape_value("min(360,ih)") == "min(360\\,ih)"
+    assert escape_value("a:b") == "a\\\\:b"
+    assert escape_value("it's") == "it\\\\\\'s"
+    assert escape_value(True) == "1"
+
+
+def test_input_args_and_dry_run():
+    """Test input options precede -i and dry-run prints a shell-ready command"""
+    graph = FilterGraph()
+    clip = graph.input("my clip.mp4", args=["-ss", "1.5"])
+    graph.output("out.mp4", clip.video.subtitles("subs.srt"), args=["-an"])
+    out = io.StringIO()
+
+    command = graph.dry_run(file=out)
+
+    assert command.startswith("ffmpeg -y -ss 1.5 -i 'my clip.mp4' -filter_complex")
+    assert out.getvalue().strip() == command
+
+
+def test_invalid_graphs_raise():
+    """Test unused outputs, foreign streams and missing outputs are rejected"""
+    graph = FilterGraph()
+    clip = graph.input("in.mp4")
+    clip.video.scale(640, 360)
+    graph.output("out.mp4", clip.audio)
+    with pytest.raises(GraphError):
+        graph.compile()
+
+    other = FilterGraph()
+    with pytest.raises(GraphError):
+        other.output("out.mp4", clip.video)
+        other.compile()
+
+    with pytest.raises(GraphError):
+        FilterGraph().compile()
@@ -0,0 +1,120 @@
+"""Tests for cached two-pass loudness normalization"""
+import sys
+from pathlib import Path
+
+from videoclaw.cache import ContentCache
+from videoclaw.ffmpeg import loudness
+from videoclaw.ffmpeg.loudness import LoudnessPlan, Measurement, measure, measure_cached, plan_loudness
+from videoclaw.ffmpeg.merge import build_audio_remix_graph, build_filter_merge_command
+from videoclaw.ffmpeg.probe import MediaInfo
+
+LOUDNORM_OUTPUT = """
+[Parsed_loudnorm_1 @ 0x1]
+{
+	"input_i" : "-23.51",
+	"input_tp" : "-6.02",
+	"input_lra" : "4.30",
+	"input_thresh" : "-33.71",
+	"output_i" : "-16.02",
+	"target_offset" : "0.02"
+}
+"""
+
+
+def _info(path, audio="aac"):
+    return MediaInfo(
+        path=path, duration=4.0, width=1280, height=720, fps="24/1",
+        video_codec="h264", pix_fmt="yuv420p", audio_codec=audio,
+        sample_rate=44100 if audio else None, channels=2 if audio else None,
+    )
+
+
+def test_measurement_parses_loudnorm_json():
+    """Test first-pass values are read from the JSON block in stderr"""
+    m = Measurement.from_output("frame=1\n" + LOUDNORM_OUTPUT)
+
+    assert (m.input_i, m.input_tp, m.input_lra, m.input_thresh) == (-23.51, -6.02, 4.3, -33.71)
+    assert not m.silent
+    assert Measurement.from_output(LOUDNORM_OUTPUT.replace('"-23.51"', '"-inf"')).silent
+
+
+def test_measure_cached_reuses_result_by_content(tmp_path, monkeypatch):
+    """Test identical content is measured once even under another name"""
+    calls = []
+
+    def fake_measure(path, target=None, timeout=None, ffmpeg_path="ffmpeg", **kwargs):
+        calls.append(path)
+        return Measurement(-20.0, -3.0, 5.0, -30.0)
+
+    monkeypatch.setattr(loudness, "measure", fake_measure)
+    cache = ContentCache(tmp_path / "cache")
+    a, b = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    a.write_bytes(b"same audio")
+    b.write_bytes(b"same audio")
+
+    assert measure_cached(str(a), cache) == measure_cached(str(b), cache)
+    assert calls == [str(a)]
+
+
+def test_measure_runs_through_ffmpeg_runner(tmp_path):
+    """Test measurement parses the bounded stderr tail returned by run_ffmpeg"""
+    script = tmp_path / "ffmpeg"
+    stats = "size=N/A time=00:00:01.00\\r" * 2000
+    script.write_text(
+        f"#!{sys.executable}\nimport sys\nassert '-nostats' in sys.argv\n"
+        f"sys.stderr.write('{stats}')\nsys.stderr.write({LOUDNORM_OUTPUT!r})\n"
+    )
+    script.chmod(0o755)
+
+    assert measure("a.mp4", ffmpeg_path=str(script)).input_i == -23.51
+
+
+def test_plan_loudness_dry_run_prints_commands_without_decoding(tmp_path, capsys):
+    """Test dry-run uses cached measurements and prints measure commands for misses"""
+    cache = ContentCache(tmp_path / "cache")
+    a, b = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    a.write_bytes(b"cached")
+    b.write_bytes(b"missing")
+    loudness.write_json(
+        cache.path_for(loudness._measurement_key(str(a)), ".json"),
+        {"input_i": -20.0, "input_tp": -3.0, "input_lra": 5.0, "input_thresh": -30.0},
+    )
+
+    plan = plan_loudness(
+        [_info(str(a)), _info(str(b))], cache=cache, ffmpeg_path=str(tmp_path / "no-ffmpeg"), dry_run=True
+    )
+
+    assert plan.clips[0].input_i == -20.0
+    assert plan.clips[1] is None
+    printed = capsys.readouterr().out.splitlines()
+    assert len(printed) == 1 and str(b) in printed[0] and "loudnorm" in printed[0]
+
+
+def test_second_pass_is_folded_into_merge_graph():
+    """Test linear loudnorm with measured values runs inside the single encode"""
+    plan = LoudnessPlan(
+        clips=[Measurement(-23.5, -6.0, 4.3, -33.7), None],
+        bgm=Measurement(-12.0, -1.0, 3.0, -22.0),
+    )
+    cmd = build_filter_merge_command(
+        [_info("a.mp4"), _info("mute.mp4", audio=None)], Path("out.mp4"),
+        bgm_file="bgm.mp3", loudness=plan,
+    )
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert graph.count("loudnorm=") == 2
+    assert "measured_I=-23.5:measured_TP=-6.0" in graph
+    assert "linear=true" in graph
+    assert cmd.count("-filter_complex") == 1
+
+
+def test_remix_graph_copies_video():
+    """Test stream-copy merges rebuild only the audio track"""
+    plan = LoudnessPlan(clips=[Measurement(-23.5, -6.0, 4.3, -33.7)] * 2)
+    cmd = build_audio_remix_graph(
+        Path("list.txt"), [_info("a.mp4"), _info("b.mp4")], Path("out.mp4"), loudness=plan
+    ).compile()
+
+    assert cmd[cmd.index("-f") + 1] == "concat"
+    assert cmd[cmd.index("-c:v") + 1] == "copy"
+    assert "concat=n=2:v=0:a=1" in cmd[cmd.index("-filter_complex") + 1]
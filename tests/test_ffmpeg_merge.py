@@ -0,0 +1,222 @@
+"""Tests for single-pass filter_complex merge"""
+from pathlib import Path
+
+import pytest
+
+from videoclaw.ffmpeg.merge import (
+    FRAGMENTED_MP4_FLAGS,
+    Dialogue,
+    MergeTarget,
+    audio_copy_compatible,
+    build_audio_remix_graph,
+    build_draft_command,
+    build_filter_merge_command,
+    draft_target,
+    parse_aspect,
+    plan_variants,
+)
+from videoclaw.ffmpeg.probe import MediaInfo
+
+
+def _info(path, width=1280, height=720, audio="aac"):
+    return MediaInfo(
+        path=path, duration=4.0, width=width, height=height, fps="24/1",
+        video_codec="h264", pix_fmt="yuv420p", audio_codec=audio,
+        sample_rate=44100 if audio else None, channels=2 if audio else None,
+    )
+
+
+def test_target_from_first_probed_clip():
+    """Test target parameters follow the first clip"""
+    target = MergeTarget.from_infos([None, _info("a.mp4", 720, 1280)])
+    assert (target.width, target.height, target.fps) == (720, 1280, "24/1")
+
+
+def test_filter_merge_is_single_invocation():
+    """Test normalization and concat share one filter graph"""
+    cmd = build_filter_merge_command([_info("a.mp4"), _info("b.mp4", 720, 1280)], Path("out.mp4"))
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert cmd.count("-i") == 2
+    assert graph.count("scale=1280:720") == 2
+    assert "concat=n=2:v=1:a=1[vout][aout]" in graph
+    assert cmd[-1] == "out.mp4"
+
+
+def test_filter_merge_fills_silence_and_mixes_bgm():
+    """Test mute clips get silence and BGM is mixed in the same graph"""
+    cmd = build_filter_merge_command(
+        [_info("a.mp4"), _info("mute.mp4", audio=None)], Path("out.mp4"), bgm_file="bgm.mp3"
+    )
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert "anullsrc" in graph
+    assert "[2:a:0]" in graph
+    assert "amix=inputs=2" in graph
+    assert cmd[cmd.index("-stream_loop") + 3] == "bgm.mp3"
+    assert "[amixed]" in cmd
+
+
+def test_plan_variants_keeps_short_edge_and_reuses_main_output():
+    """Test variant sizes follow the main short edge; same size reuses the main file"""
+    variants = plan_variants(["9:16", "16:9", "1:1"], MergeTarget(1280, 720), Path("videos/final.mp4"))
+
+    assert [(v.width, v.height) for v in variants] == [(720, 1280), (1280, 720), (720, 720)]
+    assert variants[0].output_path == Path("videos/final_9x16.mp4")
+    assert variants[1].output_path == Path("videos/final.mp4")
+
+
+def test_parse_aspect_rejects_invalid_ratio():
+    """Test malformed aspect ratios raise ValueError"""
+    assert parse_aspect(" 9:16 ") == (9, 16)
+    for text in ("9x16", "0:1", "a:b"):
+        with pytest.raises(ValueError):
+            parse_aspect(text)
+
+
+def test_filter_merge_splits_variants_in_one_invocation():
+    """Test every aspect variant is an extra output of the same graph"""
+    output = Path("final.mp4")
+    variants = plan_variants(["9:16", "16:9", "1:1"], MergeTarget(1280, 720), output)
+    cmd = build_filter_merge_command(
+        [_info("a.mp4"), _info("b.mp4")], output, target=MergeTarget(1280, 720), variants=variants
+    )
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert cmd.count("-i") == 2
+    assert "[vout]split=3[vmain][vsplit0][vsplit1]" in graph
+    assert "asplit=3" in graph
+    assert "pad=720:1280" in graph and "pad=720:720" in graph
+    assert cmd.count("-c:v") == 3
+    assert "final.mp4" in cmd and "final_9x16.mp4" in cmd and "final_1x1.mp4" in cmd
+
+
+def test_draft_target_downscales_to_360p():
+    """Test the draft target keeps aspect, shrinks to 360p and never upscales"""
+    assert (draft_target([_info("a.mp4")]).width, draft_target([_info("a.mp4")]).height) == (640, 360)
+    vertical = draft_target([_info("a.mp4", 1080, 1920)])
+    assert (vertical.width, vertical.height) == (360, 640)
+    small = draft_target([_info("a.mp4", 320, 240)])
+    assert (small.width, small.height) == (320, 240)
+
+
+def test_audio_copy_requires_matching_audio():
+    """Test audio is only copied when every clip has identical audio parameters"""
+    assert audio_copy_compatible([_info("a.mp4"), _info("b.mp4")])
+    assert not audio_copy_compatible([_info("a.mp4"), _info("b.mp4", audio=None)])
+    assert not audio_copy_compatible([_info("a.mp4"), _info("b.mp4", audio="mp3")])
+
+
+def test_draft_command_copies_audio_into_fragmented_mp4():
+    """Test the draft encodes video ultrafast and stream-copies audio from a concat list"""
+    infos = [_info("a.mp4"), _info("b.mp4")]
+    cmd = build_draft_command(infos, Path("draft.mp4"), audio_list=Path("list.txt"))
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert "scale=640:360:force_original_aspect_ratio=decrease:flags=fast_bilinear" in graph
+    assert "concat=n=2:v=1:a=0[vout]" in graph
+    assert cmd[cmd.index("-preset") + 1] == "ultrafast"
+    assert cmd[cmd.index("-c:a") + 1] == "copy"
+    assert "2:a:0" in cmd
+    assert cmd[cmd.index("-movflags") + 1] == FRAGMENTED_MP4_FLAGS
+
+
+def test_draft_command_reencodes_audio_with_bgm():
+    """Test BGM forces in-graph audio mixing instead of copy"""
+    infos = [_info("a.mp4"), _info("b.mp4")]
+    cmd = build_draft_command(infos, Path("draft.mp4"), audio_list=Path("list.txt"), bgm_file="bgm.mp3")
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert "list.txt" not in cmd
+    assert "amix" in graph
+    assert cmd[cmd.index("-c:a") + 1] == "aac"
+
+
+def test_dialogues_duck_bgm_in_the_same_encode():
+    """Test dialogue lines are delayed, sidechain the bed and mix in one graph"""
+    cmd = build_filter_merge_command(
+        [_info("a.mp4"), _info("b.mp4")], Path("out.mp4"), bgm_file="bgm.mp3",
+        dialogues=[Dialogue("d1.mp3", 0.5), Dialogue("d2.mp3", 4.0)],
+    )
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert cmd.count("-filter_complex") == 1
+    assert "adelay=delays=500:all=1" in graph
+    assert "adelay=delays=4000:all=1" in graph
+    assert "apad=whole_dur=8.000" in graph
+    assert "sidechaincompress=" in graph
+    assert cmd[cmd.index("[amixed]") - 1] == "-map"
+
+    no_duck = build_filter_merge_command(
+        [_info("a.mp4")], Path("out.mp4"), dialogues=[Dialogue("d1.mp3")], duck=False
+    )
+    assert "sidechaincompress" not in no_duck[no_duck.index("-filter_complex") + 1]
+
+
+def test_remix_existing_render_copies_video():
+    """Test a soundtrack change only re-encodes audio on top of the old render"""
+    cmd = build_audio_remix_graph(
+        Path("final.mp4"), [_info("a.mp4")], Path("new.mp4"), bgm_file="bgm.mp3", concat_list=False
+    ).compile()
+
+    assert cmd[cmd.index("-i") + 1] == "final.mp4"
+    assert "concat" not in cmd[:cmd.index("-filter_complex")]
+    assert cmd[cmd.index("-c:v") + 1] == "copy"
+    assert cmd[cmd.index("-map") + 1] == "0:v:0"
+
+
+def test_find_dialogues_uses_storyboard_then_clip_offsets(tmp_path):
+    """Test dialogue_N starts at shot N, falling back to clip N's offset"""
+    from videoclaw.cli.commands.merge import find_dialogues
+
+    (tmp_path / "audio").mkdir()
+    for name in ("dialogue_001.mp3", "dialogue_002.mp3", "dialogue_003.mp3", "dialogue_009.mp3"):
+        (tmp_path / "audio" / name).write_bytes(b"")
+    (tmp_path / "storyboard").mkdir()
+    (tmp_path / "storyboard" / "text_storyboard.md").write_text(
+        "【开场】（0-3秒）\n【拔剑】（3-7.5秒）\n", encoding="utf-8"
+    )
+
+    dialogues = find_dialogues(tmp_path, [_info("a.mp4"), _info("b.mp4"), _info("c.mp4")])
+
+    assert [(Path(d.path).name, d.start) for d in dialogues] == [
+        ("dialogue_001.mp3", 0.0), ("dialogue_002.mp3", 3.0), ("dialogue_003.mp3", 8.0),
+    ]
+
+
+def test_failed_merge_keeps_existing_render(tmp_path, monkeypatch):
+    """Test a failed re-render exits non-zero and leaves the previous output untouched"""
+    from click.testing import CliRunner
+
+    from videoclaw.cli.commands import merge as merge_cmd
+
+    monkeypatch.setattr(merge_cmd, "DEFAULT_PROJECTS_DIR", tmp_path)
+    monkeypatch.setattr(merge_cmd, "check_ffmpeg", lambda: True)
+    monkeypatch.setattr(merge_cmd, "merge_with_ffmpeg", lambda *args, **kwargs: False)
+    monkeypatch.setattr(merge_cmd, "find_dialogues", lambda *args: [])
+    (tmp_path / "demo" / "videos").mkdir(parents=True)
+    final = tmp_path / "demo" / "videos" / "final.mp4"
+    final.write_bytes(b"good render")
+    clip = tmp_path / "a.mp4"
+    clip.write_bytes(b"clip")
+
+    result = CliRunner().invoke(merge_cmd.merge, ["-p", "demo", "-v", str(clip), "--no-loudnorm"])
+
+    assert result.exit_code == 1
+    assert final.read_bytes() == b"good render"
+
+
+def test_remux_soundtrack_keeps_file_mode(tmp_path, monkeypatch):
+    """Test the remuxed render keeps the permissions of the file it replaces"""
+    import stat
+
+    from videoclaw.cli.commands import merge as merge_cmd
+
+    monkeypatch.setattr(merge_cmd, "run_ffmpeg", lambda cmd, **kwargs: Path(cmd[-1]).write_bytes(b"new"))
+    final = tmp_path / "final.mp4"
+    final.write_bytes(b"old")
+    final.chmod(0o644)
+
+    assert merge_cmd.remux_soundtrack([_info("a.mp4")], "bgm.mp3", final)
+    assert final.read_bytes() == b"new"
+    assert stat.S_IMODE(final.stat().st_mode) == 0o644
@@ -0,0 +1,61 @@
+"""Tests for parallel ffmpeg job runner"""
+import sys
+import time
+
+import pytest
+
+from videoclaw.ffmpeg.parallel import (
+    JobFailedError,
+    resolve_jobs,
+    run_parallel,
+    threads_per_job,
+)
+
+
+def _py(code: str) -> list:
+    return [sys.executable, "-c", code]
+
+
+def test_resolve_jobs_caps_to_total():
+    """Test jobs never exceed number of tasks"""
+    assert resolve_jobs(8, 3) == 3
+    assert resolve_jobs(2, 10) == 2
+    assert resolve_jobs(0, 5, budget=4) == 4
+    assert resolve_jobs(0, 2, budget=16) == 2
+
+
+def test_threads_per_job_splits_budget():
+    """Test CPU budget is split across parallel processes"""
+    assert threads_per_job(4, budget=16) == 4
+    assert threads_per_job(3, budget=8) == 2
+    assert threads_per_job(16, budget=4) == 1
+
+
+def test_run_parallel_writes_all_outputs(tmp_path):
+    """Test every command runs and results keep their index"""
+    commands = [
+        _py(f"open(r'{tmp_path / f'out_{i}.txt'}', 'w').write('{i}')")
+        for i in range(5)
+    ]
+    run_parallel(commands, jobs=3)
+    for i in range(5):
+        assert (tmp_path / f"out_{i}.txt").read_text() == str(i)
+
+
+def test_run_parallel_reports_failed_job_and_cancels_others(tmp_path):
+    """Test a failing command cancels the rest and names the failed job"""
+    marker = tmp_path / "slow_finished"
+    commands = [
+        _py(f"import time; time.sleep(5); open(r'{marker}', 'w')"),
+        _py("import sys; sys.stderr.write('boom'); sys.exit(1)"),
+        _py(f"import time; time.sleep(5); open(r'{marker}', 'w')"),
+    ]
+    start = time.time()
+    with pytest.raises(JobFailedError) as exc_info:
+        run_parallel(commands, jobs=2, labels=["a.mp4", "b.mp4", "c.mp4"])
+
+    assert exc_info.value.index == 1
+    assert exc_info.value.label == "b.mp4"
+    assert "boom" in exc_info.value.stderr
+    assert time.time() - start < 4
+    assert not marker.exists()
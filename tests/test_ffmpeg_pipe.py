@@ -0,0 +1,69 @@
+"""Tests for the named-pipe streaming merge"""
+from videoclaw.ffmpeg.merge import MergeTarget
+from videoclaw.ffmpeg.pipe import PIPE_FORMAT, build_pipe_commands, default_temp_root, fallback_temp_root
+from videoclaw.ffmpeg.probe import MediaInfo
+
+
+def _info(path, audio="aac"):
+    return MediaInfo(
+        path=path, duration=4.0, width=640, height=360, fps="24/1",
+        video_codec="h264", profile="High", pix_fmt="yuv420p", audio_codec=audio,
+        sample_rate=44100 if audio else None, channels=2 if audio else None,
+    )
+
+
+def test_build_pipe_commands_writers_stream_to_fifos(tmp_path):
+    """Test each writer normalizes its clip into its own fifo"""
+    infos = [_info("a.mp4"), _info("b.mp4", audio=None)]
+    fifos = [tmp_path / "0", tmp_path / "1"]
+    reference = MergeTarget(640, 360).as_reference()
+
+    writers, muxer = build_pipe_commands(
+        infos, reference, fifos, tmp_path / "list.txt", tmp_path / "out.mp4"
+    )
+
+    assert len(writers) == 2
+    for cmd, fifo in zip(writers, fifos):
+        assert cmd[-3:] == ["-f", PIPE_FORMAT, str(fifo)]
+    # 无音轨的片段补一路静音输入
+    assert "anullsrc=r=44100:cl=stereo" in writers[1]
+    assert "anullsrc=r=44100:cl=stereo" not in writers[0]
+    assert muxer[muxer.index("-f") + 1] == "concat"
+    assert muxer[muxer.index("-c") + 1] == "copy"
+    assert muxer[-1] == str(tmp_path / "out.mp4")
+
+
+def test_build_pipe_commands_mixes_bgm_in_muxer(tmp_path):
+    """Test BGM is mixed in the muxer while video is still copied"""
+    reference = MergeTarget(640, 360).as_reference()
+    _, muxer = build_pipe_commands(
+        [_info("a.mp4")], reference, [tmp_path / "0"], tmp_path / "list.txt",
+        tmp_path / "out.mp4", bgm_file="bgm.mp3",
+    )
+
+    assert "bgm.mp3" in muxer
+    assert muxer[muxer.index("-c:v") + 1] == "copy"
+    assert "amix" in muxer[muxer.index("-filter_complex") + 1]
+
+
+def test_default_temp_root_prefers_configured_dir(tmp_path):
+    """Test a configured temp dir is created and used"""
+    configured = tmp_path / "ram"
+    assert default_temp_root(str(configured)) == configured
+    assert configured.is_dir()
+
+
+def test_default_temp_root_uses_system_temp(tmp_path, monkeypatch):
+    """Test intermediates default to the system temp dir even when a RAM disk exists"""
+    monkeypatch.setattr("videoclaw.ffmpeg.pipe.RAM_DISK_CANDIDATES", [str(tmp_path)])
+    assert default_temp_root() is None
+
+
+def test_fallback_temp_root_prefers_ram_disk(tmp_path, monkeypatch):
+    """Test the pipe fallback uses the configured dir, then a RAM disk, then the system temp dir"""
+    monkeypatch.setattr("videoclaw.ffmpeg.pipe.RAM_DISK_CANDIDATES", [str(tmp_path)])
+    assert fallback_temp_root(tmp_path / "conf") == tmp_path / "conf"
+    assert fallback_temp_root() == tmp_path
+
+    monkeypatch.setattr("videoclaw.ffmpeg.pipe.RAM_DISK_CANDIDATES", ["/nonexistent-videoclaw"])
+    assert fallback_temp_root() is None
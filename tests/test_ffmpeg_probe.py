@@ -0,0 +1,78 @@
+"""Tests for cached media probe service"""
+import json
+from unittest.mock import patch, MagicMock
+
+from videoclaw.ffmpeg.probe import MediaInfo, ProbeService
+
+
+FFPROBE_OUTPUT = {
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1280,
+         "height": 720, "r_frame_rate": "24/1", "pix_fmt": "yuv420p"},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac", "sample_rate": "44100"},
+    ],
+    "packets": [
+        {"stream_index": 0, "pts_time": "0.000000", "flags": "K__"},
+        {"stream_index": 1, "pts_time": "0.000000", "flags": "K__"},
+        {"stream_index": 0, "pts_time": "0.041667", "flags": "___"},
+        {"stream_index": 0, "pts_time": "2.000000", "flags": "K__"},
+    ],
+    "format": {"duration": "5.0"},
+}
+
+
+def _ffprobe_result():
+    return MagicMock(stdout=json.dumps(FFPROBE_OUTPUT))
+
+
+def test_keyframes_only_from_video_stream():
+    """Test keyframe list ignores audio packets"""
+    info = MediaInfo.from_ffprobe("a.mp4", FFPROBE_OUTPUT)
+    assert info.keyframes == [0.0, 2.0]
+    assert [s["codec_type"] for s in info.streams] == ["video", "audio"]
+
+
+def test_probe_cache_hits_skip_ffprobe(tmp_path):
+    """Test a second service on the same project reuses SQLite results"""
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"data")
+
+    with patch("subprocess.run", return_value=_ffprobe_result()) as mock_run:
+        first = ProbeService.for_project(tmp_path).probe(clip)
+    assert mock_run.call_count == 1
+
+    with patch("subprocess.run", return_value=_ffprobe_result()) as mock_run:
+        second = ProbeService.for_project(tmp_path).probe(clip)
+    assert mock_run.call_count == 0
+    assert second.keyframes == first.keyframes
+    assert (tmp_path / ".videoclaw" / "cache" / "probe.sqlite").exists()
+
+
+def test_probe_cache_invalidated_when_file_changes(tmp_path):
+    """Test changing size/mtime triggers a new probe"""
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"data")
+    service = ProbeService.for_project(tmp_path)
+
+    with patch("subprocess.run", return_value=_ffprobe_result()) as mock_run:
+        service.probe(clip)
+        clip.write_bytes(b"regenerated clip")
+        service.probe(clip)
+    assert mock_run.call_count == 2
+
+
+def test_probe_many_keeps_order_and_marks_failures(tmp_path):
+    """Test parallel probing keeps input order and returns None on failure"""
+    import subprocess
+
+    def fake_run(cmd, **kwargs):
+        if cmd[-1].endswith("bad.mp4"):
+            raise subprocess.CalledProcessError(1, cmd, stderr="invalid data")
+        return _ffprobe_result()
+
+    with patch("subprocess.run", side_effect=fake_run):
+        infos = ProbeService().probe_many(["a.mp4", "bad.mp4", "c.mp4"])
+
+    assert infos[0].path == "a.mp4"
+    assert infos[1] is None
+    assert infos[2].path == "c.mp4"
@@ -0,0 +1,99 @@
+"""Tests for low-res preview proxies"""
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from videoclaw.cache import ContentCache
+from videoclaw.ffmpeg.proxy import (
+    ProxyWatcher,
+    build_video_proxy_command,
+    open_command,
+    proxy_for,
+    proxy_kind,
+)
+
+
+def test_proxy_kind_by_suffix():
+    """Test videos and images are recognised by extension"""
+    assert proxy_kind(Path("a.MP4")) == "video"
+    assert proxy_kind(Path("a.png")) == "image"
+    assert proxy_kind(Path("a.mp3")) is None
+
+
+def test_video_proxy_command_downscales_only():
+    """Test video proxies cap height without upscaling and keep optional audio"""
+    cmd = build_video_proxy_command(Path("in.mp4"), Path("out.mp4"))
+    assert "scale=-2:'min(360,ih)'" in cmd
+    assert "0:a:0?" in cmd
+    assert cmd[cmd.index("-c:v") + 1] == "libx264"
+
+
+def test_image_proxy_is_cached_webp(tmp_path):
+    """Test image proxies are small WebP files generated once per content"""
+    source = tmp_path / "big.png"
+    Image.new("RGB", (2000, 1000), "blue").save(source)
+    cache = ContentCache(tmp_path / "proxies")
+
+    proxy = proxy_for(source, cache)
+    with Image.open(proxy) as img:
+        assert img.format == "WEBP"
+        assert img.size == (640, 320)
+
+    mtime = proxy.stat().st_mtime_ns
+    with patch("videoclaw.ffmpeg.proxy.make_image_proxy") as mock_make:
+        assert proxy_for(source, cache) == proxy
+    mock_make.assert_not_called()
+    assert proxy.stat().st_mtime_ns >= mtime
+
+
+def test_watcher_waits_for_stable_files(tmp_path):
+    """Test the watcher only generates proxies once a file stops changing"""
+    (tmp_path / "videos").mkdir()
+    clip = tmp_path / "videos" / "shot.mp4"
+    clip.write_bytes(b"partial")
+    watcher = ProxyWatcher(tmp_path, ContentCache(tmp_path / "proxies"))
+
+    with patch("videoclaw.ffmpeg.proxy.proxy_for", return_value=tmp_path / "p.mp4") as mock_proxy:
+        assert watcher.poll() == []
+        clip.write_bytes(b"partial plus more")
+        assert watcher.poll() == []
+        assert watcher.poll() == [tmp_path / "p.mp4"]
+        assert watcher.poll() == []
+
+    assert mock_proxy.call_count == 1
+
+
+def test_open_command_is_cross_platform(monkeypatch):
+    """Test the opener per platform and the headless fallback"""
+    assert open_command(Path("a.mp4"), "darwin") == ["open", "a.mp4"]
+    assert open_command(Path("a.mp4"), "win32")[:3] == ["cmd", "/c", "start"]
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    assert open_command(Path("a.mp4"), "linux") is None
+
+
+def test_serve_file_only_exposes_the_previewed_file(tmp_path):
+    """Test the preview server returns 404 for sibling files and directory listings"""
+    import threading
+    import urllib.error
+    import urllib.request
+    from http.server import ThreadingHTTPServer
+
+    from videoclaw.cli.commands.preview import file_handler
+
+    (tmp_path / "final.mp4").write_bytes(b"video")
+    (tmp_path / "secret.mp4").write_bytes(b"other")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), file_handler(tmp_path / "final.mp4"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert urllib.request.urlopen(f"{base}/final.mp4").read() == b"video"
+        for path in ("/", "/secret.mp4", "/../final.mp4x"):
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                urllib.request.urlopen(base + path)
+            assert exc.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
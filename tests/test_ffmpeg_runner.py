@@ -0,0 +1,94 @@
+"""Tests for streaming ffmpeg runner"""
+import sys
+import threading
+import time
+
+import pytest
+
+from videoclaw.ffmpeg.runner import (
+    FFmpegCancelledError,
+    FFmpegRunError,
+    FFmpegTimeoutError,
+    Progress,
+    run_ffmpeg,
+)
+
+
+def _fake_ffmpeg(tmp_path, body: str):
+    """Write an executable stand-in for ffmpeg"""
+    script = tmp_path / "fake_ffmpeg"
+    script.write_text(f"#!{sys.executable}\nimport sys, time\n{body}\n")
+    script.chmod(0o755)
+    return str(script)
+
+
+PROGRESS_BODY = '''
+assert sys.argv[1:4] == ["-progress", "pipe:1", "-nostats"]
+for i in (1, 2):
+    print(f"frame={i * 24}\\nfps=48.0\\nout_time_us={i * 1000000}\\ntotal_size=1024\\nspeed=2.0x")
+    print("progress=continue" if i == 1 else "progress=end", flush=True)
+'''
+
+
+def test_progress_update_and_eta():
+    """Test key=value progress fields"""
+    progress = Progress(duration=10.0)
+    progress.update({"frame": "48", "fps": "24.5", "out_time_us": "2000000", "speed": "2.0x"})
+    assert progress.frame == 48
+    assert progress.out_time == 2.0
+    assert progress.percent == 20.0
+    assert progress.eta == 4.0
+
+
+def test_run_ffmpeg_reports_progress(tmp_path):
+    """Test -progress pipe:1 blocks reach the callback"""
+    updates = []
+    run_ffmpeg(
+        [_fake_ffmpeg(tmp_path, PROGRESS_BODY), "-i", "in.mp4", "out.mp4"],
+        on_progress=lambda p: updates.append((p.frame, p.out_time, p.speed, p.finished)),
+        duration=2.0,
+    )
+    assert updates == [(24, 1.0, 2.0, False), (48, 2.0, 2.0, True)]
+
+
+def test_run_ffmpeg_keeps_only_stderr_tail(tmp_path):
+    """Test large stderr is not buffered in full"""
+    body = "for i in range(5000):\n    sys.stderr.write(f'line {i}\\n')\nsys.exit(3)"
+    with pytest.raises(FFmpegRunError) as exc_info:
+        run_ffmpeg([_fake_ffmpeg(tmp_path, body)], stderr_lines=10)
+
+    lines = exc_info.value.stderr.splitlines()
+    assert exc_info.value.returncode == 3
+    assert len(lines) == 10
+    assert lines[-1] == "line 4999"
+
+
+def test_run_ffmpeg_timeout(tmp_path):
+    """Test a stuck encode is killed after the wall-clock timeout"""
+    start = time.time()
+    with pytest.raises(FFmpegTimeoutError):
+        run_ffmpeg([_fake_ffmpeg(tmp_path, "time.sleep(30)")], timeout=0.5)
+    assert time.time() - start < 10
+
+
+def test_run_ffmpeg_cancel(tmp_path):
+    """Test setting the cancel event terminates the process"""
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    with pytest.raises(FFmpegCancelledError):
+        run_ffmpeg([_fake_ffmpeg(tmp_path, "time.sleep(30)")], cancel_event=cancel)
+
+
+def test_run_ffmpeg_bounds_carriage_return_stats(tmp_path):
+    """Test -nostats is always passed and \\r-terminated stats lines stay bounded"""
+    body = (
+        "assert sys.argv[1] == '-nostats'\n"
+        "for i in range(5000):\n    sys.stderr.write(f'frame={i}\\r')\n"
+        "sys.stderr.write('boom\\n')\nsys.exit(1)"
+    )
+    with pytest.raises(FFmpegRunError) as exc_info:
+        run_ffmpeg([_fake_ffmpeg(tmp_path, body)], stderr_lines=5)
+
+    lines = exc_info.value.stderr.splitlines()
+    assert len(lines) == 5
+    assert lines[-1] == "boom"
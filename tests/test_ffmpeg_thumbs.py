@@ -0,0 +1,100 @@
+"""Tests for single-pass cover/thumbnail/contact-sheet extraction"""
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from videoclaw.cache import ContentCache
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.ffmpeg.thumbs import build_thumbs_command, cover_time, extract_thumbs, find_cover, thumbs_cache
+
+
+def _info(path="clip.mp4", duration=18.0):
+    return MediaInfo(path=path, duration=duration, width=1280, height=720, fps="24/1", video_codec="h264")
+
+
+def _fake_ffmpeg(cmd, **kwargs):
+    """按命令中的输出路径写出假图片"""
+    for arg in cmd:
+        if arg.endswith(".jpg"):
+            if "%02d" in arg:
+                count = int(cmd[cmd.index(arg) - 3])
+                for i in range(1, count + 1):
+                    Path(arg % i).write_bytes(b"jpg")
+            else:
+                Path(arg).write_bytes(b"jpg")
+
+
+def test_cover_time_defaults_and_clamps():
+    """Test cover window defaults to a third and stays inside the video"""
+    assert cover_time(30.0) == 10.0
+    assert cover_time(30.0, cover_at=100.0) == 29.0
+    assert cover_time(0.5) == 0.0
+
+
+def test_build_thumbs_command_has_one_input_and_three_outputs(tmp_path):
+    """Test a single decode feeds cover, thumbnails and sheet outputs"""
+    cmd = build_thumbs_command(_info(), tmp_path, count=6, width=240, columns=3)
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert cmd.count("-i") == 1
+    assert "split=2[cover_in][thumb_in]" in graph
+    assert "thumbnail=n=24" in graph
+    assert "trim=start=1.500" in graph  # 18 秒 6 张，取每个区间的中点
+    assert "fps=6/18.000" in graph
+    assert "tile=3x2" in graph
+    assert cmd.count("-map") == 3
+    assert str(tmp_path / "thumb_%02d.jpg") in cmd
+
+
+def test_extract_thumbs_is_cached_by_content(tmp_path):
+    """Test re-running on the same content does not invoke ffmpeg"""
+    video = tmp_path / "final.mp4"
+    video.write_bytes(b"video")
+    cache = ContentCache(tmp_path / "cache")
+
+    with patch("videoclaw.ffmpeg.thumbs.probe", return_value=_info(str(video))), \
+         patch("videoclaw.ffmpeg.thumbs.run_ffmpeg", side_effect=_fake_ffmpeg) as mock_run:
+        first = extract_thumbs(video, count=4, cache=cache)
+        second = extract_thumbs(video, count=4, cache=cache)
+
+    assert mock_run.call_count == 1
+    assert len(first.thumbnails) == 4
+    assert first == second
+    assert first.cover.exists() and first.sheet.exists()
+
+
+def test_find_cover_uses_cached_cover(tmp_path):
+    """Test the publisher cover lookup finds the extracted cover by content"""
+    video = tmp_path / "final.mp4"
+    video.write_bytes(b"video")
+    cache = ContentCache(tmp_path / "cache")
+
+    assert find_cover(video, cache=cache, generate=False) is None
+    with patch("videoclaw.ffmpeg.thumbs.probe", return_value=_info(str(video))), \
+         patch("videoclaw.ffmpeg.thumbs.run_ffmpeg", side_effect=_fake_ffmpeg):
+        extract_thumbs(video, cache=cache, cover_at=5.0)
+
+    # 同样内容换个文件名也能找到封面
+    copy = tmp_path / "renamed.mp4"
+    copy.write_bytes(b"video")
+    cover = find_cover(copy, cache=cache, generate=False)
+    assert cover is not None and cover.read_bytes() == b"jpg"
+
+
+def test_extract_thumbs_prunes_bounded_cache(tmp_path):
+    """Test the global thumbs cache is size-limited and evicts older videos first"""
+    cache = ContentCache(tmp_path / "cache", max_bytes=20)
+    videos = [tmp_path / "a.mp4", tmp_path / "b.mp4"]
+    with patch("videoclaw.ffmpeg.thumbs.probe", side_effect=lambda path, *a: _info(path)), \
+         patch("videoclaw.ffmpeg.thumbs.run_ffmpeg", side_effect=_fake_ffmpeg):
+        videos[0].write_bytes(b"first")
+        old = extract_thumbs(videos[0], count=2, cache=cache)
+        for _, _, path in cache.entries():
+            os.utime(path, (1, 1))
+        videos[1].write_bytes(b"second")
+        new = extract_thumbs(videos[1], count=2, cache=cache)
+
+    assert cache.size() <= 20
+    assert not old.cover.exists()
+    assert new.cover.exists() and new.sheet.exists()
+    assert thumbs_cache("1KB").max_bytes == 1024
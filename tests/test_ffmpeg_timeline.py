@@ -0,0 +1,71 @@
+"""Tests for compiling a timeline into one ffmpeg graph"""
+from pathlib import Path
+
+import pytest
+
+from videoclaw.ffmpeg.merge import MergeTarget
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.ffmpeg.timeline import build_timeline_graph, timeline_duration
+from videoclaw.project.timeline import AudioItem, AudioLane, Gap, Timeline, TimelineClip, Transition
+
+
+def _media(*names, duration=6.0):
+    return {
+        name: MediaInfo(path=name, duration=duration, width=1280, height=720, fps="24/1",
+                        video_codec="h264", audio_codec="aac", sample_rate=44100, channels=2)
+        for name in names
+    }
+
+
+def _compile(timeline, media):
+    graph = build_timeline_graph(
+        timeline, media, {name: f"/cache/{name}" for name in media}, Path("out.mp4"),
+        MergeTarget(1280, 720, "24/1"), resolve=lambda s: f"/project/{s}",
+    )
+    cmd = graph.compile()
+    return cmd, cmd[cmd.index("-filter_complex") + 1]
+
+
+def test_clips_trim_on_input_and_concat_without_transitions():
+    """Test in/out points become input seeks and adjacent clips concat"""
+    timeline = Timeline(clips=[TimelineClip("a.mp4", 1.0, 3.0), TimelineClip("b.mp4"), Gap(1.0)])
+
+    cmd, graph = _compile(timeline, _media("a.mp4", "b.mp4"))
+
+    assert cmd[cmd.index("/cache/a.mp4") - 5:cmd.index("/cache/a.mp4")] == ["-ss", "1.000", "-t", "2.000", "-i"]
+    assert "concat=n=3:v=1:a=1" in graph
+    assert "color=c=black:s=1280x720" in graph
+    assert "xfade" not in graph
+    assert timeline_duration(timeline, _media("a.mp4", "b.mp4")) == 9.0
+
+
+def test_transitions_use_xfade_offsets_and_audio_lanes_mix():
+    """Test xfade offsets account for earlier overlaps and lanes are delayed and mixed"""
+    timeline = Timeline(
+        clips=[
+            TimelineClip("a.mp4", 0, 4),
+            TimelineClip("b.mp4", 0, 4, transition=Transition("dissolve", 1.0)),
+            TimelineClip("a.mp4", 4, 6, transition=Transition("fade", 0.5)),
+        ],
+        audio_lanes=[AudioLane("voice", [AudioItem("voice.mp3", start=2.5, volume=0.5)], volume=0.8)],
+    )
+
+    cmd, graph = _compile(timeline, _media("a.mp4", "b.mp4"))
+
+    assert "xfade=transition=dissolve:duration=1.0:offset=3.000" in graph
+    assert "xfade=transition=fade:duration=0.5:offset=6.500" in graph
+    assert graph.count("acrossfade") == 2
+    assert "volume=0.4,adelay=delays=2500:all=1" in graph
+    assert "amix=inputs=2:duration=first" in graph
+    assert "/project/voice.mp3" in cmd
+
+
+def test_invalid_transitions_are_rejected():
+    """Test transitions on the first item or longer than a neighbour fail"""
+    media = _media("a.mp4", "b.mp4")
+    first = Timeline(clips=[TimelineClip("a.mp4", transition=Transition())])
+    too_long = Timeline(clips=[TimelineClip("a.mp4", 0, 1), TimelineClip("b.mp4", transition=Transition("fade", 2))])
+
+    for timeline in (first, too_long):
+        with pytest.raises(ValueError):
+            _compile(timeline, media)
@@ -0,0 +1,55 @@
+"""Tests for keyframe-aware smart trimming"""
+import pytest
+
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.ffmpeg.trim import build_trim_commands, plan_trim
+
+
+def _info(keyframes=(0.0, 1.0, 2.0, 3.0, 4.0), duration=5.0, codec="h264", audio="aac"):
+    return MediaInfo(
+        path="clip.mp4", duration=duration, width=1280, height=720, fps="24/1",
+        video_codec=codec, profile="High", pix_fmt="yuv420p", audio_codec=audio,
+        sample_rate=44100 if audio else None, channels=2 if audio else None,
+        keyframes=list(keyframes),
+    )
+
+
+def test_plan_copies_full_gops_and_reencodes_edges():
+    """Test only the partial GOPs at the cut points are re-encoded"""
+    plan = plan_trim(_info(), 0.3, 4.2)
+
+    assert plan.head == (0.3, 1.0)
+    assert plan.copy == (1.0, 4.0)
+    assert plan.tail == (4.0, 4.2)
+    assert plan.copied == 3.0
+
+
+def test_plan_cut_on_keyframes_is_pure_copy():
+    """Test ranges aligned to keyframes or the clip end need no re-encode"""
+    assert plan_trim(_info(), 0, 4).parts == [("copy", (0.0, 4.0))]
+    assert plan_trim(_info(), 2.0).parts == [("copy", (2.0, 5.0))]
+
+
+def test_plan_falls_back_to_full_reencode():
+    """Test short ranges, missing keyframes and unknown codecs re-encode everything"""
+    assert plan_trim(_info(), 0.2, 0.9).parts == [("head", (0.2, 0.9))]
+    assert plan_trim(_info(keyframes=()), 0, 4).parts == [("head", (0, 4))]
+    assert plan_trim(_info(codec="vp9"), 0, 4).parts == [("head", (0, 4))]
+    with pytest.raises(ValueError):
+        plan_trim(_info(), 4.5, 4.5)
+
+
+def test_build_trim_commands_copy_by_frame_count(tmp_path):
+    """Test the copied part is stream-copied by frame count and audio is cut once"""
+    info = _info()
+    commands, parts, audio = build_trim_commands(info, plan_trim(info, 0.5, 4.0), tmp_path)
+
+    head, copy, audio_cmd = commands
+    assert parts == [tmp_path / "head.mp4", tmp_path / "copy.mp4"]
+    assert head[head.index("-frames:v") + 1] == "12"
+    assert head[head.index("-c:v") + 1] == "libx264" and "-an" in head
+    assert copy[copy.index("-ss") + 1] == "1.000000"
+    assert copy[copy.index("-c") + 1] == "copy"
+    assert copy[copy.index("-frames:v") + 1] == "72"
+    assert audio_cmd[audio_cmd.index("-t") + 1] == "3.500000"
+    assert audio == tmp_path / "audio.m4a"
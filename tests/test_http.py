@@ -0,0 +1,37 @@
+"""Tests for the shared HTTP connection pool"""
+import threading
+
+from videoclaw.utils import http
+
+
+def test_threads_share_one_connection_pool():
+    """Test each thread gets its own session mounted on the same adapter"""
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(http.get_session()))
+    thread.start()
+    thread.join()
+
+    main = http.get_session()
+    assert main is http.get_session()
+    assert sessions[0] is not main
+    assert sessions[0].get_adapter("https://a") is main.get_adapter("https://b")
+
+
+def test_only_connection_errors_are_retried():
+    """Test the adapter retries connects but leaves reads and statuses to callers"""
+    adapter = http.get_session().get_adapter("https://example.com")
+    retry = adapter.max_retries
+
+    assert retry.connect == http.CONNECT_RETRIES
+    assert retry.read == 0 and retry.status == 0
+    assert adapter._pool_maxsize == http.POOL_MAXSIZE
+
+
+def test_close_sessions_rebuilds_pool():
+    """Test sessions are remounted on a fresh adapter after closing the pool"""
+    before = http.get_session()
+    http.close_sessions()
+    after = http.get_session()
+
+    assert after is not before
+    assert after.get_adapter("https://x") is not before.get_adapter("https://x")
@@ -0,0 +1,110 @@
+"""Tests for reference image preprocessing"""
+import io
+
+from PIL import Image, ImageFilter
+
+from videoclaw.media import images
+from videoclaw.media.images import (
+    ImageRule,
+    encode_optimized,
+    image_data_url,
+    prepare_image,
+    ssim,
+    target_size,
+)
+
+
+def _encode(size, fmt="JPEG", mode="RGB"):
+    buffered = io.BytesIO()
+    Image.new(mode, size, "red").save(buffered, format=fmt)
+    return buffered.getvalue()
+
+
+def _photo(size=(512, 512)):
+    """Noisy gradient that does not compress trivially"""
+    noise = Image.effect_noise(size, 40).filter(ImageFilter.GaussianBlur(1))
+    return Image.merge("RGB", [Image.linear_gradient("L").resize(size), noise, noise.rotate(90)])
+
+
+def test_compliant_image_passes_through_unchanged():
+    """Test bytes that already meet the rule are not decoded or re-encoded"""
+    data = _encode((640, 360))
+    prepared = prepare_image(data, ImageRule(min_side=300, max_side=6000))
+
+    assert prepared.data is data
+    assert prepared.mime == "image/jpeg"
+    assert not prepared.resized
+
+
+def test_target_size_applies_min_and_max_bounds():
+    """Test upscaling to the minimum side/pixels and downscaling to the maximum side"""
+    assert target_size((200, 100), ImageRule(min_side=300)) == (600, 300)
+    assert target_size((1000, 1000), ImageRule(min_pixels=3686400)) == (1920, 1920)
+    assert target_size((8000, 4000), ImageRule(max_side=6000)) == (6000, 3000)
+    assert target_size((800, 600), ImageRule(min_side=300, max_side=6000)) is None
+
+
+def test_resized_image_uses_allowed_lossy_format():
+    """Test resized input is re-encoded in an accepted lossy format instead of PNG"""
+    prepared = prepare_image(_encode((4000, 2000)), ImageRule(max_side=1000, formats=("JPEG", "PNG")))
+
+    assert prepared.resized
+    assert prepared.mime == "image/jpeg"
+    assert Image.open(io.BytesIO(prepared.data)).size == (1000, 500)
+
+
+def test_ssim_scores_identity_and_degradation():
+    """Test SSIM is 1 for identical images and drops with blur"""
+    img = _photo()
+
+    assert abs(ssim(img, img) - 1.0) < 1e-6
+    assert ssim(img, img.filter(ImageFilter.GaussianBlur(2))) < 0.9
+
+
+def test_encode_optimized_meets_target_with_fewer_bytes():
+    """Test the chosen encoding reaches the target SSIM and beats lossless PNG"""
+    img = _photo()
+    png = io.BytesIO()
+    img.save(png, format="PNG")
+
+    prepared = encode_optimized(img, ("JPEG", "WEBP"), target_ssim=0.98)
+    decoded = Image.open(io.BytesIO(prepared.data))
+
+    assert prepared.format in ("JPEG", "WEBP")
+    assert len(prepared.data) < len(png.getvalue())
+    assert ssim(img, decoded) >= 0.98
+
+
+def test_transparent_image_without_webp_falls_back_to_png():
+    """Test alpha is kept losslessly when the provider only takes JPEG or PNG"""
+    img = Image.new("RGBA", (64, 64), (255, 0, 0, 0))
+
+    assert encode_optimized(img, ("JPEG", "PNG")).format == "PNG"
+    assert encode_optimized(img, ("JPEG", "WEBP")).format == "WEBP"
+
+
+def test_large_lossless_input_is_reencoded():
+    """Test a compliant but oversized PNG is compressed while small ones pass through"""
+    buffered = io.BytesIO()
+    _photo((1024, 1024)).save(buffered, format="PNG")
+    data = buffered.getvalue()
+    assert len(data) > images.OPTIMIZE_MIN_BYTES
+
+    prepared = prepare_image(data, ImageRule(formats=("JPEG", "PNG")))
+    small = _encode((64, 64), fmt="PNG")
+
+    assert prepared.mime == "image/jpeg" and len(prepared.data) < len(data)
+    assert prepare_image(small).data is small
+
+
+def test_data_url_is_cached_by_content_and_rule():
+    """Test the same image under the same rule is encoded once"""
+    images.clear_cache()
+    data = _encode((100, 100), fmt="BMP")
+    rule = ImageRule(min_side=300)
+
+    first = image_data_url(data, rule)
+    assert image_data_url(bytes(data), rule) is first
+    assert image_data_url(data, ImageRule(min_side=400)) != first
+    assert first.startswith("data:image/webp;base64,")
+    assert (images._cache.hits, images._cache.misses) == (1, 2)
@@ -0,0 +1,95 @@
+"""Tests for reference media compaction"""
+import os
+from pathlib import Path
+
+from videoclaw.cache import ContentCache
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.media import references
+from videoclaw.media.references import (
+    build_audio_reference_command,
+    build_video_reference_command,
+    compact_reference,
+)
+
+
+def test_video_reference_command_caps_size_rate_and_duration():
+    """Test the video reference is trimmed, downscaled, rate-capped and mono"""
+    cmd = build_video_reference_command(Path("in.mov"), Path("out.mp4"))
+
+    assert cmd[cmd.index("-t") + 1] == str(references.MAX_REFERENCE_SECONDS)
+    assert "min(ih,480)" in cmd[cmd.index("-vf") + 1]
+    assert cmd[cmd.index("-fpsmax") + 1] == "24"
+    assert cmd[cmd.index("-g") + 1] == "24"
+    assert cmd[cmd.index("-ac") + 1] == "1"
+
+
+def test_audio_reference_command_is_mono_mp3():
+    """Test audio references become low-bitrate mono MP3"""
+    cmd = build_audio_reference_command(Path("in.wav"), Path("out.mp3"))
+
+    assert cmd[cmd.index("-c:a") + 1] == "libmp3lame"
+    assert cmd[cmd.index("-ac") + 1] == "1"
+    assert "-vn" in cmd
+
+
+def test_compact_reference_is_cached_by_content(tmp_path, monkeypatch):
+    """Test identical sources are transcoded once and served from the cache"""
+    calls = []
+
+    def fake_run(cmd, timeout=None):
+        calls.append(cmd)
+        Path(cmd[-1]).write_bytes(b"small")
+
+    monkeypatch.setattr(references, "run_ffmpeg", fake_run)
+    cache = ContentCache(tmp_path / "cache")
+    a, b = tmp_path / "a.mov", tmp_path / "b.mov"
+    a.write_bytes(b"large camera original" * 100)
+    b.write_bytes(a.read_bytes())
+
+    first = compact_reference(a, "video", cache)
+    second = compact_reference(b, "video", cache)
+
+    assert len(calls) == 1
+    assert second.cached and second.path == first.path
+    assert first.bytes == 5 and first.original_bytes == a.stat().st_size
+    assert second.data_url().startswith("data:video/mp4;base64,")
+
+
+def test_compact_reference_keeps_smaller_original(tmp_path, monkeypatch):
+    """Test the source is used when transcoding fails or does not shrink it"""
+    source = tmp_path / "voice.mp3"
+    source.write_bytes(b"tiny")
+    cache = ContentCache(tmp_path / "cache")
+
+    monkeypatch.setattr(references, "run_ffmpeg", lambda cmd, timeout=None: Path(cmd[-1]).write_bytes(b"bigger output"))
+    kept = compact_reference(source, "audio", cache)
+    assert kept.path.read_bytes() == b"tiny"
+
+    def failing(cmd, timeout=None):
+        raise FFmpegError("boom")
+
+    monkeypatch.setattr(references, "run_ffmpeg", failing)
+    other = tmp_path / "other.wav"
+    other.write_bytes(b"pcm")
+    assert compact_reference(other, "audio", cache).path == other
+
+
+def test_compact_reference_prunes_bounded_cache(tmp_path, monkeypatch):
+    """Test the reference cache is pruned after each put but keeps the entry just written"""
+    def fake_run(cmd, timeout=None):
+        Path(cmd[-1]).write_bytes(b"x" * 10)
+
+    monkeypatch.setattr(references, "run_ffmpeg", fake_run)
+    cache = ContentCache(tmp_path / "cache", max_bytes=15)
+    a, b = tmp_path / "a.mov", tmp_path / "b.mov"
+    a.write_bytes(b"first original" * 10)
+    b.write_bytes(b"second original" * 10)
+
+    first = compact_reference(a, "video", cache)
+    os.utime(first.path, (1, 1))
+    second = compact_reference(b, "video", cache)
+
+    assert not first.path.exists()
+    assert second.path.exists()
+    assert cache.size() <= 15
+
@@ -0,0 +1,31 @@
+"""Tests for the SDK client registry"""
+from videoclaw.models import clients
+from videoclaw.models.volcengine.seedance import VolcEngineSeedance
+from videoclaw.models.volcengine.seedream import VolcEngineSeedream
+
+
+def test_get_client_reuses_by_provider_region_and_key():
+    """Test one client is built per (provider, region, api_key)"""
+    clients.clear_clients()
+    built = []
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    a = clients.get_client("volcengine", "cn-beijing", "k1", factory)
+    assert clients.get_client("volcengine", "cn-beijing", "k1", factory) is a
+    assert clients.get_client("volcengine", "cn-shanghai", "k1", factory) is not a
+    assert clients.get_client("volcengine", "cn-beijing", "k2", factory) is not a
+    assert len(built) == 3
+
+
+def test_ark_backends_share_client():
+    """Test Seedream and Seedance with the same credentials reuse one Ark client"""
+    clients.clear_clients()
+    image = VolcEngineSeedream("doubao-seedream-4-5-251128", {"api_key": "shared-key"})
+    video = VolcEngineSeedance("doubao-seedance-1-5-pro-251215", {"api_key": "shared-key"})
+    other = VolcEngineSeedance("doubao-seedance-1-5-pro-251215", {"api_key": "other-key"})
+
+    assert image.client is video.client
+    assert other.client is not video.client
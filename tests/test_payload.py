@@ -0,0 +1,108 @@
+"""Tests for the streaming JSON request body"""
+import base64
+import gzip
+import json
+import os
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from videoclaw.utils.payload import Base64File, JsonBody, post_json
+
+
+def _value(path):
+    return {
+        "model": "m",
+        "content": [
+            {"type": "text", "text": "宇航员 \"走路\""},
+            {"type": "video_url", "video_url": {"url": Base64File(path, "video/mp4")}},
+        ],
+        "duration": 5,
+        "watermark": False,
+    }
+
+
+def _expected(path):
+    data = base64.b64encode(path.read_bytes()).decode()
+    value = _value(path)
+    value["content"][1]["video_url"]["url"] = f"data:video/mp4;base64,{data}"
+    return value
+
+
+def test_body_matches_json_and_declared_length(tmp_path):
+    """Test the streamed body decodes to the same JSON and matches content_length"""
+    path = tmp_path / "ref.mp4"
+    path.write_bytes(os.urandom(500_001))
+    body = JsonBody(_value(path), read_size=3 * 1024)
+
+    raw = b"".join(body)
+    assert json.loads(raw) == _expected(path)
+    assert body.content_length() == len(raw)
+    assert b"".join(body) == raw  # re-iterable for retries
+
+
+def test_gzip_body_round_trips(tmp_path):
+    """Test the gzip body decompresses to the plain body and has no fixed length"""
+    path = tmp_path / "ref.mp4"
+    path.write_bytes(b"\0" * 200_000)
+    body = JsonBody(_value(path), gzip=True)
+
+    assert json.loads(gzip.decompress(b"".join(body))) == _expected(path)
+    assert body.content_length() is None
+    assert body.headers()["Content-Encoding"] == "gzip"
+
+
+def test_peak_memory_stays_flat_as_reference_grows(tmp_path):
+    """Test encoding a 16x larger reference does not raise peak Python memory"""
+    peaks = []
+    for size in (1_000_000, 16_000_000):
+        path = tmp_path / f"ref_{size}.mp4"
+        with open(path, "wb") as f:
+            f.truncate(size)
+        body = JsonBody(_value(path))
+        tracemalloc.start()
+        for _ in body:
+            pass
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    assert peaks[1] < 2 * 1024 * 1024
+    assert peaks[1] < peaks[0] * 1.5
+
+
+class _Echo(BaseHTTPRequestHandler):
+    received = {}
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        type(self).received = {"body": self.rfile.read(length), "headers": dict(self.headers)}
+        payload = b'{"id": "cgt-1"}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_post_json_sends_content_length(tmp_path):
+    """Test post_json streams the body with an exact Content-Length"""
+    path = tmp_path / "ref.mp3"
+    path.write_bytes(os.urandom(300_000))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Echo)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        response = post_json(
+            f"http://127.0.0.1:{httpd.server_address[1]}/tasks", _value(path),
+            headers={"Authorization": "Bearer k"},
+        )
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert response.json() == {"id": "cgt-1"}
+    assert json.loads(_Echo.received["body"]) == _expected(path)
+    assert _Echo.received["headers"]["Authorization"] == "Bearer k"
+    assert "Transfer-Encoding" not in _Echo.received["headers"]
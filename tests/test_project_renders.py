@@ -0,0 +1,73 @@
+"""Tests for the project render log"""
+import json
+
+from videoclaw.project import RenderLog
+
+
+def test_record_uses_project_relative_keys(tmp_path):
+    """Test renders are keyed by path relative to the project"""
+    log = RenderLog.for_project(tmp_path)
+    log.record(tmp_path / "videos" / "final.mp4", engine="graph", variants=["videos/final_9x16.mp4"])
+    log.record(tmp_path / "videos" / "final_9x16.mp4", variant_of="videos/final.mp4", aspect="9:16")
+
+    data = json.loads((tmp_path / ".videoclaw" / "renders.json").read_text())
+    assert set(data["renders"]) == {"videos/final.mp4", "videos/final_9x16.mp4"}
+    assert log.get(tmp_path / "videos" / "final_9x16.mp4")["aspect"] == "9:16"
+
+
+def test_record_updates_existing_entry(tmp_path):
+    """Test re-recording merges new fields into the entry"""
+    log = RenderLog.for_project(tmp_path)
+    output = tmp_path / "videos" / "final.mp4"
+    log.record(output, engine="graph", width=1280)
+    log.record(output, engine="chunked")
+
+    entry = log.get(output)
+    assert entry["engine"] == "chunked"
+    assert entry["width"] == 1280
+
+
+def test_load_tolerates_corrupt_file(tmp_path):
+    """Test a corrupt renders.json is treated as empty"""
+    log = RenderLog.for_project(tmp_path)
+    log.path.parent.mkdir(parents=True)
+    log.path.write_text("{not json")
+    assert log.load() == {}
+    log.record(tmp_path / "final.mp4", engine="graph")
+    assert "final.mp4" in log.load()
+
+
+def test_changed_sections_compares_manifest_and_output(tmp_path):
+    """Test only changed manifest sections are reported while the output is untouched"""
+    from videoclaw.project.renders import file_fingerprint
+
+    log = RenderLog.for_project(tmp_path)
+    output = tmp_path / "videos" / "final.mp4"
+    output.parent.mkdir()
+    output.write_bytes(b"video")
+    manifest = {"video": {"clips": ["a"]}, "audio": {"bgm": "x"}}
+    assert log.changed_sections(output, manifest) is None
+
+    log.record(output, manifest=manifest, fingerprint=file_fingerprint(output))
+    assert log.changed_sections(output, manifest) == []
+    assert log.changed_sections(output, dict(manifest, audio={"bgm": "y"})) == ["audio"]
+
+    output.write_bytes(b"edited elsewhere")
+    assert log.changed_sections(output, manifest) is None
+
+
+def test_render_manifest_splits_clips_from_soundtrack(tmp_path):
+    """Test clip content is in the video section and BGM/dialogue in the audio section"""
+    from videoclaw.cli.commands.merge import render_manifest
+    from videoclaw.ffmpeg.merge import Dialogue
+
+    clip, bgm, line = tmp_path / "clip.mp4", tmp_path / "bgm.mp3", tmp_path / "line.mp3"
+    for path in (clip, bgm, line):
+        path.write_bytes(path.name.encode())
+
+    first = render_manifest([str(clip)], str(bgm), [Dialogue(str(line), 2.0)], None, True, "graph")
+    line.write_bytes(b"regenerated")
+    second = render_manifest([str(clip)], str(bgm), [Dialogue(str(line), 2.0)], None, True, "graph")
+
+    assert first["video"] == second["video"]
+    assert first["audio"] != second["audio"]
@@ -0,0 +1,64 @@
+"""Tests for the project timeline model"""
+import pytest
+
+from videoclaw.project.timeline import (
+    AudioItem,
+    AudioLane,
+    Gap,
+    Timeline,
+    TimelineClip,
+    Transition,
+    parse_storyboard,
+)
+
+STORYBOARD = """【分镜】：
+【特写圣剑】（0-4秒）
+画面：特写冰封圣剑
+【拔剑】（4-8秒）
+画面：镜头后拉
+【登基定格】(8-12.5秒)
+画面：全景
+"""
+
+
+def test_parse_storyboard_extracts_shot_ranges():
+    """Test shot titles and time ranges are parsed with both bracket styles"""
+    shots = parse_storyboard(STORYBOARD)
+
+    assert [s.title for s in shots] == ["特写圣剑", "拔剑", "登基定格"]
+    assert [(s.start, s.end) for s in shots] == [(0, 4), (4, 8), (8, 12.5)]
+
+
+def test_from_storyboard_slices_single_video_or_maps_per_shot():
+    """Test one video is sliced by range and N videos map one per shot"""
+    shots = parse_storyboard(STORYBOARD)
+
+    single = Timeline.from_storyboard(shots, ["videos/video_001.mp4"])
+    assert [(c.in_point, c.out_point) for c in single.clips] == [(0, 4), (4, 8), (8, 12.5)]
+
+    per_shot = Timeline.from_storyboard(shots, ["a.mp4", "b.mp4", "c.mp4"])
+    assert [(c.source, c.in_point, c.out_point) for c in per_shot.clips][2] == ("c.mp4", 0, 4.5)
+
+    with pytest.raises(ValueError):
+        Timeline.from_storyboard(shots, ["a.mp4", "b.mp4"])
+
+
+def test_timeline_round_trips_through_json(tmp_path):
+    """Test clips, gaps, transitions and audio lanes survive save/load"""
+    timeline = Timeline(
+        clips=[
+            TimelineClip("a.mp4", 1.0, 3.0, "开场"),
+            Gap(0.5, Transition("fade", 0.25)),
+            TimelineClip("b.mp4", transition=Transition("wipeleft", 0.4)),
+        ],
+        audio_lanes=[AudioLane("bgm", [AudioItem("bgm.mp3", loop=True)], volume=0.3)],
+    )
+    path = Timeline.path_for(tmp_path)
+
+    timeline.save(path)
+    loaded = Timeline.load(path)
+
+    assert loaded == timeline
+    assert loaded.sources() == ["a.mp4", "b.mp4"]
+    path.write_text("{broken")
+    assert Timeline.load(path) is None
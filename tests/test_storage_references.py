@@ -0,0 +1,149 @@
+"""Tests for the upload-once reference store"""
+import io
+import sys
+import time
+
+import pytest
+import requests
+from PIL import Image
+
+from videoclaw.storage import references
+from videoclaw.storage.objects import LocalHTTPStore, S3Store
+from videoclaw.storage.references import ReferenceStore, get_reference_store
+
+
+class _CountingStore(LocalHTTPStore):
+    """Local HTTP store that counts uploads and can hand out short-lived URLs"""
+
+    def __init__(self, root, lifetime=None):
+        super().__init__(root)
+        self.puts = []
+        self.lifetime = lifetime
+
+    def put(self, name, source, content_type):
+        self.puts.append(name)
+        super().put(name, source, content_type)
+
+    def url(self, name):
+        url, _ = super().url(name)
+        return url, (time.time() + self.lifetime if self.lifetime is not None else None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    backend = _CountingStore(tmp_path / "objects")
+    yield backend
+    backend.close()
+
+
+def test_reference_uploaded_once_and_served(store, tmp_path):
+    """Test repeated shots reuse the URL and identical payloads share one object"""
+    refs = ReferenceStore(store, index_path=tmp_path / "index.json")
+    calls = []
+
+    def produce():
+        calls.append(1)
+        return b"\xff\xd8 character image", "image/jpeg"
+
+    first = refs.url_for("img1", produce)
+    assert refs.url_for("img1", produce) == first
+    assert refs.url_for("img1-other-name", produce) == first
+
+    assert len(calls) == 2
+    assert len(store.puts) == 1 and first.endswith(".jpg")
+    assert requests.get(first).content == b"\xff\xd8 character image"
+
+
+def test_index_persists_across_processes(store, tmp_path):
+    """Test a new store instance reuses URLs recorded in the index file"""
+    index = tmp_path / "index.json"
+    url = ReferenceStore(store, index_path=index).url_for("scene", lambda: (b"scene", "image/png"))
+
+    again = ReferenceStore(store, index_path=index).url_for("scene", lambda: pytest.fail("re-encoded"))
+    assert again == url
+
+
+def test_index_drops_expired_and_oldest_entries(store, tmp_path, monkeypatch):
+    """Test writing the index removes expired URLs and caps the number of entries"""
+    import json
+
+    monkeypatch.setattr(references, "MAX_INDEX_ENTRIES", 2)
+    index = tmp_path / "index.json"
+    index.write_text(json.dumps({"|stale": {"object": "o", "url": "u", "expires": time.time() - 10}}))
+    refs = ReferenceStore(store, index_path=index)
+    for name in ("a", "b", "c"):
+        refs.url_for(name, lambda name=name: (name.encode(), "image/png"))
+
+    assert list(json.loads(index.read_text())) == ["|b", "|c"]
+
+
+def test_expiring_url_is_resigned_without_reupload(tmp_path):
+    """Test URLs close to expiry are refreshed from the existing object"""
+    backend = _CountingStore(tmp_path / "objects", lifetime=60)
+    try:
+        refs = ReferenceStore(backend, index_path=None)
+        refs.url_for("clip", lambda: (b"clip", "video/mp4"))
+        refs.url_for("clip", lambda: pytest.fail("re-encoded"))
+    finally:
+        backend.close()
+
+    assert len(backend.puts) == 1
+
+
+def test_get_reference_store_from_settings(tmp_path, monkeypatch):
+    """Test inline disables uploads, http is shared per settings and s3 needs boto3"""
+    assert get_reference_store({}) is None
+    assert get_reference_store({"provider": "inline"}) is None
+
+    settings = {"provider": "http", "root": str(tmp_path / "refs")}
+    refs = get_reference_store(settings)
+    assert isinstance(refs, ReferenceStore) and get_reference_store(dict(settings)) is refs
+    refs.store.close()
+
+    with pytest.raises(ValueError):
+        get_reference_store({"provider": "ftp"})
+    monkeypatch.setitem(sys.modules, "boto3", None)
+    with pytest.raises(RuntimeError, match="boto3"):
+        S3Store("bucket")
+
+
+def test_seedance_uploads_each_image_once(tmp_path, monkeypatch):
+    """Test Seedance passes URLs and uploads a shared image once across shots"""
+    from videoclaw.models.volcengine.seedance import VolcEngineSeedance
+
+    monkeypatch.setattr(references, "_stores", {})
+    buffered = io.BytesIO()
+    Image.new("RGB", (640, 360), "blue").save(buffered, format="PNG")
+    config = {"api_key": "k", "storage": {"references": {"provider": "http", "root": str(tmp_path / "refs")}}}
+    backend = VolcEngineSeedance("doubao-seedance-1-5-pro-251215", config)
+
+    urls = {backend._image_url(buffered.getvalue()) for _ in range(3)}
+    uploaded = list((tmp_path / "refs").rglob("*.png"))
+    backend.reference_store.store.close()
+
+    assert len(urls) == 1 and next(iter(urls)).startswith("http://127.0.0.1:")
+    assert len(uploaded) == 1
+
+
+def test_seedance_reference_key_tracks_compaction_params(tmp_path, monkeypatch):
+    """Test changing a compaction parameter gives a new store key, so stale uploads are not reused"""
+    from videoclaw.media import references as media_references
+    from videoclaw.models.volcengine.seedance import VolcEngineSeedance
+
+    keys = []
+
+    class _Recorder:
+        def url_for(self, key, produce):
+            keys.append(key)
+            return f"https://cdn.example.com/{len(keys)}"
+
+    backend = VolcEngineSeedance("doubao-seedance-1-5-pro-251215", {"api_key": "k"})
+    backend.reference_store = _Recorder()
+    clip = tmp_path / "clip.mov"
+    clip.write_bytes(b"clip")
+
+    backend._reference_url(str(clip), "video")
+    monkeypatch.setattr(media_references, "MAX_VIDEO_SHORT_SIDE", 720)
+    backend._reference_url(str(clip), "video")
+
+    assert keys[0] != keys[1]
@@ -1,11 +1,19 @@
 """Tests for VolcEngine image backend"""
+import io
 import pytest
-from pathlib import Path
 from unittest.mock import patch, MagicMock
+from PIL import Image
 from videoclaw.models.volcengine.seedream import VolcEngineSeedream
 
 
-def test_volcengine_seedream_text_to_image():
+def _png_bytes(size=(64, 64)):
+    """A tiny real PNG input image"""
+    buffered = io.BytesIO()
+    Image.new("RGB", size, (200, 80, 40)).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def test_volcengine_seedream_text_to_image(fake_download):
     """Test Seedream text to image with mock"""
     backend = VolcEngineSeedream("doubao-seedream-4-5-251128", {"api_key": "test-key"})
 
@@ -14,8 +22,7 @@ def test_volcengine_seedream_text_to_image():
     mock_response.data = [MagicMock(url="https://example.com/image.png")]
 
     with patch.object(backend.client.images, 'generate', return_value=mock_response):
-        with patch('requests.get') as mock_get:
-            mock_get.return_value = MagicMock(content=b"fake_image_data")
+        with patch('videoclaw.models.volcengine.seedream.download', side_effect=fake_download(b"fake_image_data")):
             result = backend.text_to_image("宇航员在火星")
 
     assert result.local_path.exists()
@@ -24,7 +31,7 @@ def test_volcengine_seedream_text_to_image():
     assert result.metadata.get("model") == "doubao-seedream-4-5-251128"
 
 
-def test_volcengine_seedream_image_to_image():
+def test_volcengine_seedream_image_to_image(fake_download):
     """Test Seedream image to image with mock"""
     backend = VolcEngineSeedream("doubao-seedream-4-5-251128", {"api_key": "test-key"})
 
@@ -33,9 +40,8 @@ def test_volcengine_seedream_image_to_image():
     mock_response.data = [MagicMock(url="https://example.com/image.png")]
 
     with patch.object(backend.client.images, 'generate', return_value=mock_response):
-        with patch('requests.get') as mock_get:
-            mock_get.return_value = MagicMock(content=b"fake_image_data")
-            result = backend.image_to_image(b"fake_input_image", "宇航员穿红色衣服")
+        with patch('videoclaw.models.volcengine.seedream.download', side_effect=fake_download(b"fake_image_data")):
+            result = backend.image_to_image(_png_bytes(), "宇航员穿红色衣服")
 
     assert result.local_path.exists()
     assert result.local_path.suffix == ".png"
@@ -50,7 +56,6 @@ def test_volcengine_seedream_requires_api_key():
 
 def test_volcengine_seedream_with_env_api_key():
     """Test Seedream uses ARK_API_KEY from config"""
-    import os
     # Test that api_key can be passed via config
     backend = VolcEngineSeedream("doubao-seedream-4-5-251128", {"api_key": "env-test-key"})
     assert backend.api_key == "env-test-key"
@@ -1,12 +1,18 @@
 """Tests for VolcEngine video backend"""
-import io
 import pytest
-from pathlib import Path
 from unittest.mock import patch, MagicMock
+from PIL import Image
 from videoclaw.models.volcengine.seedance import VolcEngineSeedance
 
 
-def test_volcengine_seedance_image_to_video():
+def _jpeg_bytes(tmp_path, size=(480, 320)):
+    """A tiny real JPEG input image"""
+    path = tmp_path / "input.jpg"
+    Image.new("RGB", size, (40, 80, 200)).save(path, format="JPEG")
+    return path.read_bytes()
+
+
+def test_volcengine_seedance_image_to_video(tmp_path, fake_download):
     """Test Seedance image to video with mock"""
     backend = VolcEngineSeedance("doubao-seedance-1-5-pro-251215", {"api_key": "test-key"})
 
@@ -16,18 +22,13 @@ def test_volcengine_seedance_image_to_video():
     mock_task.status = "succeeded"
     mock_task.video = MagicMock(url="https://example.com/video.mp4")
 
-    # Mock PIL Image to avoid needing real image data
-    mock_img = MagicMock()
-    mock_img.format = "PNG"
-    mock_img.save = MagicMock()
-
-    with patch('PIL.Image.open', return_value=mock_img):
-        with patch.object(backend.client.content_generation.tasks, 'create', return_value=mock_task):
-            with patch.object(backend.client.content_generation.tasks, 'get', return_value=mock_task):
-                with patch('requests.get') as mock_get:
-                    mock_get.return_value = MagicMock(content=b"fake_video_data")
-                    result = backend.image_to_video(b"fake_image_data", "宇航员走路")
+    with patch.object(backend.client.content_generation.tasks, 'create', return_value=mock_task) as create:
+        with patch.object(backend.client.content_generation.tasks, 'get', return_value=mock_task):
+            with patch('videoclaw.models.volcengine.seedance.download', side_effect=fake_download(b"fake_video_data")):
+                result = backend.image_to_video(_jpeg_bytes(tmp_path), "宇航员走路")
 
+    image_part = next(part for part in create.call_args.kwargs["content"] if part["type"] == "image_url")
+    assert image_part["image_url"]["url"].startswith("data:image/jpeg;base64,")
     assert result.local_path.exists()
     assert result.local_path.suffix == ".mp4"
     assert result.metadata.get("provider") == "volcengine"
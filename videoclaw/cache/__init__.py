@@ -0,0 +1,10 @@
+"""内容寻址缓存模块"""
+from videoclaw.cache.store import (
+    DEFAULT_MAX_SIZE,
+    ContentCache,
+    configured_max_bytes,
+    file_digest,
+    parse_size,
+)
+
+__all__ = ["DEFAULT_MAX_SIZE", "ContentCache", "configured_max_bytes", "file_digest", "parse_size"]
@@ -0,0 +1,158 @@
+"""内容寻址缓存"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+# 项目缓存默认容量上限（配置项 cache.max_size）
+DEFAULT_MAX_SIZE = "5GB"
+
+# 读取文件计算摘要时的块大小
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def file_digest(path: Union[str, Path], algorithm: str = "sha256") -> str:
+    """按块读取文件计算内容摘要"""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_size(value: Union[str, int, None]) -> int:
+    """解析容量配置，如 512MB、2G、1073741824；空值返回 0（不限制）"""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, int):
+        return value
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)I?B?\s*", str(value).upper())
+    if not match:
+        raise ValueError(f"无法解析容量: {value}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def configured_max_bytes(project_path: Optional[Path] = None) -> int:
+    """配置项 cache.max_size（未设置时为 DEFAULT_MAX_SIZE）对应的字节数
+
+    project_path 为空时只读全局配置，用于 ~/.videoclaw/cache 下的跨项目缓存。
+    """
+    from videoclaw.config import Config
+
+    return parse_size(Config(project_path).get("cache.max_size", DEFAULT_MAX_SIZE))
+
+
+class ContentCache:
+    """按内容键存放文件的缓存目录，超出容量时按最近使用时间淘汰
+
+    每次命中都会刷新文件的修改时间，淘汰时从最久未使用的条目开始删除。
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 0):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_project(cls, project_path: Path, name: str, max_bytes: int = 0) -> "ContentCache":
+        """项目级缓存，位于 <project>/.videoclaw/cache/<name>"""
+        return cls(Path(project_path) / ".videoclaw" / "cache" / name, max_bytes)
+
+    @classmethod
+    def global_cache(cls, name: str, max_bytes: int = 0) -> "ContentCache":
+        """跨项目共享的缓存，位于 ~/.videoclaw/cache/<name>"""
+        return cls(Path.home() / ".videoclaw" / "cache" / name, max_bytes)
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """把内容摘要和参数组合成缓存键"""
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def path_for(self, key: str, suffix: str = "") -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str = "") -> Optional[Path]:
+        """查找缓存条目，命中时刷新使用时间"""
+        path = self.path_for(key, suffix)
+        if not path.exists():
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, source: Path, suffix: str = "", move: bool = True) -> Path:
+        """把文件放入缓存（先写临时文件再原子重命名）
+
+        不会自动淘汰，调用方在使用完本次结果后调用 prune()。
+        """
+        target = self.path_for(key, suffix)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            if move:
+                shutil.move(str(source), tmp_name)
+            else:
+                shutil.copyfile(source, tmp_name)
+            os.replace(tmp_name, target)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+        return target
+
+    def entries(self):
+        """所有缓存条目，按最近使用时间从旧到新排序"""
+        if not self.root.exists():
+            return []
+        items = []
+        for path in self.root.rglob("*"):
+            if path.is_file() and not path.name.endswith(".tmp"):
+                stat = path.stat()
+                items.append((stat.st_mtime, stat.st_size, path))
+        items.sort(key=lambda item: item[0])
+        return items
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def prune(self, max_bytes: Optional[int] = None, keep: Sequence[Path] = ()) -> Tuple[int, int]:
+        """淘汰最久未使用的条目直到总大小不超过 max_bytes
+
+        不传 max_bytes 时使用缓存自身的容量上限（未设置上限则不淘汰）；
+        显式传入 0 时清空缓存。keep 中的条目（通常是刚写入、调用方还要使用的）不会被删除。
+        返回 (删除条目数, 释放字节数)。
+        """
+        if max_bytes is None:
+            if not self.max_bytes:
+                return 0, 0
+            limit = self.max_bytes
+        else:
+            limit = max_bytes
+        with self._lock:
+            items = self.entries()
+            total = sum(size for _, size, _ in items)
+            removed = freed = 0
+            kept = {Path(p) for p in keep}
+            for _, size, path in items:
+                if limit > 0 and total <= limit:
+                    break
+                if path in kept:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+                freed += size
+        return removed, freed
@@ -0,0 +1,93 @@
+"""cache 命令"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from videoclaw.cache import DEFAULT_MAX_SIZE, ContentCache, parse_size
+from videoclaw.config import Config
+
+DEFAULT_PROJECTS_DIR = Path.home() / "videoclaw-projects"
+
+
+def _format_size(size: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def _project_caches(project_path: Path, max_bytes: int):
+    """项目下所有内容缓存目录"""
+    cache_root = project_path / ".videoclaw" / "cache"
+    if not cache_root.exists():
+        return []
+    return [
+        ContentCache(path, max_bytes)
+        for path in sorted(cache_root.iterdir())
+        if path.is_dir()
+    ]
+
+
+@click.group()
+def cache():
+    """缓存管理"""
+    pass
+
+
+@cache.command()
+@click.option("--project", "-p", required=True, help="项目名称")
+def info(project: str):
+    """查看缓存占用"""
+    project_path = DEFAULT_PROJECTS_DIR / project
+    if not project_path.exists():
+        click.echo(f"错误: 项目 {project} 不存在", err=True)
+        return
+
+    caches = _project_caches(project_path, 0)
+    if not caches:
+        click.echo("没有缓存")
+        return
+    for c in caches:
+        click.echo(f"{c.root.name}: {len(c.entries())} 个文件, {_format_size(c.size())}")
+
+
+@cache.command()
+@click.option("--project", "-p", required=True, help="项目名称")
+@click.option("--max-size", default=None, help="每个缓存保留的最大容量，如 2GB（默认使用配置 cache.max_size）")
+@click.option("--all", "clear_all", is_flag=True, help="清空所有缓存")
+def prune(project: str, max_size: Optional[str], clear_all: bool):
+    """按最近使用时间淘汰缓存
+
+    示例:
+        videoclaw cache prune -p my-project
+        videoclaw cache prune -p my-project --max-size 1GB
+        videoclaw cache prune -p my-project --all
+    """
+    project_path = DEFAULT_PROJECTS_DIR / project
+    if not project_path.exists():
+        click.echo(f"错误: 项目 {project} 不存在", err=True)
+        return
+
+    config = Config(project_path)
+    try:
+        max_bytes = 0 if clear_all else parse_size(max_size or config.get("cache.max_size", DEFAULT_MAX_SIZE))
+    except ValueError as e:
+        click.echo(f"错误: {e}", err=True)
+        return
+    if not clear_all and max_bytes == 0:
+        click.echo("未设置缓存容量上限，如需清空请使用 --all")
+        return
+
+    total_removed = total_freed = 0
+    for c in _project_caches(project_path, max_bytes):
+        removed, freed = c.prune(max_bytes)
+        total_removed += removed
+        total_freed += freed
+        if removed:
+            click.echo(f"{c.root.name}: 删除 {removed} 个文件, 释放 {_format_size(freed)}")
+
+    click.echo(f"共删除 {total_removed} 个文件, 释放 {_format_size(total_freed)}")
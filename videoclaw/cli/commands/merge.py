@@ -2,16 +2,61 @@
 from __future__ import annotations
 
 import click
+import os
+import re
 import subprocess
+import sys
+import tempfile
+from dataclasses import asdict
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
 
+from videoclaw.cache import DEFAULT_MAX_SIZE, ContentCache, file_digest, parse_size
 from videoclaw.config import Config
+from videoclaw.ffmpeg.chunked import DEFAULT_CHUNK_SECONDS, chunked_encode
+from videoclaw.ffmpeg.concat import CopyPlan, concat_list_entry, match_encode_args, plan_copy_concat
+from videoclaw.ffmpeg.loudness import LoudnessPlan, LoudnessTarget, plan_loudness
+from videoclaw.ffmpeg.merge import (
+    DEFAULT_BGM_VOLUME,
+    Dialogue,
+    MergeTarget,
+    Variant,
+    audio_copy_compatible,
+    build_audio_remix_graph,
+    build_draft_command,
+    build_draft_graph,
+    build_filter_merge_command,
+    build_filter_merge_graph,
+    draft_target,
+    parse_aspect,
+    plan_variants,
+)
+from videoclaw.ffmpeg.probe import MediaInfo, ProbeService
+from videoclaw.ffmpeg.processor import FFmpegError, FFmpegProcessor
+from videoclaw.ffmpeg.pipe import (
+    PipeMergeError,
+    default_temp_root,
+    fallback_temp_root,
+    pipe_merge,
+    pipes_supported,
+)
+from videoclaw.ffmpeg.parallel import JobFailedError, resolve_jobs, run_parallel, threads_per_job
+from videoclaw.ffmpeg.runner import run_ffmpeg
+from videoclaw.cli.progress import ProgressReporter
+from videoclaw.project import RenderLog
+from videoclaw.project.renders import file_fingerprint
+from videoclaw.project.timeline import parse_storyboard
 from videoclaw.utils.logging import get_logger
 from videoclaw.storage.uploader import upload_to_cloud
 
 
 DEFAULT_PROJECTS_DIR = Path.home() / "videoclaw-projects"
 
+STORYBOARD_FILE = Path("storyboard") / "text_storyboard.md"
+
+# audio 命令生成的配音文件，编号对应分镜中的第几个镜头
+DIALOGUE_PATTERN = re.compile(r"^dialogue_(\d+)")
+
 
 def check_ffmpeg():
     """检查 FFmpeg 是否可用"""
@@ -22,84 +67,731 @@ def check_ffmpeg():
         return False
 
 
-def merge_with_ffmpeg(video_files: list, audio_files: list, bgm_file: str, output_path: Path) -> bool:
-    """使用 FFmpeg 合并视频和音频"""
+MERGE_ENGINES = ["graph", "concat", "pipe", "chunked"]
+
+
+def merge_with_ffmpeg(
+    video_files: list,
+    audio_files: list,
+    bgm_file: str,
+    output_path: Path,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    engine: str = "graph",
+    project_path: Optional[Path] = None,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+    temp_root: Optional[Path] = None,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    variants: Sequence[str] = (),
+    renders: Optional[RenderLog] = None,
+    draft: bool = False,
+    dry_run: bool = False,
+    loudness: Optional[LoudnessTarget] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+    remux_audio: bool = False,
+    force: bool = False,
+) -> bool:
+    """使用 FFmpeg 合并视频和音频
+
+    jobs 为并行归一化的进程数（0 表示按 CPU 预算自动选择），
+    cpu_budget 为所有 ffmpeg 进程共享的线程总数。
+    engine 为 graph 时使用单次 filter_complex 编码，为 concat 时先逐个归一化
+    片段（结果存入 cache，再次合并时只重新编码有变化的片段）再流复制拼接；
+    为 pipe 时各片段经命名管道以 NUT 流入最终封装，不写中间文件，
+    不支持管道时退回到两阶段流程，中间文件放在 temp_root，未配置时放在内存文件系统（如 /dev/shm）；
+    为 chunked 时把时间线切成约 chunk_seconds 秒的 GOP 对齐分段并行编码后流复制拼接。
+    variants 为额外导出的画幅（如 9:16），与主输出在同一次解码中 split 生成；
+    成功后写入 renders（项目的 renders.json）。
+    draft 为真时只生成低分辨率的分片 MP4 草稿，忽略 engine 和 variants，也不写入 renders。
+    dry_run 为真时只打印单次编码（graph 引擎或草稿）编译出的 ffmpeg 命令，不执行。
+    loudness 为响度归一化目标：各片段首遍测量（按内容缓存）后，第二遍 loudnorm
+    并入最终编码的滤镜图，草稿不做归一化。
+    dialogues 为按时间点放置的配音，与背景音乐在同一次编码中混音，duck 为真时配音压低其余声音。
+    remux_audio 为真时不重新编码视频：从已有的 output_path 流复制视频，只重建音轨。
+    有 renders 时把输入清单与上次渲染比较：输入都没变则跳过，只有音频输入变化时
+    自动只重建音轨；force 为真时忽略记录，完整渲染。
+    project_path 用于定位项目级的探测缓存；timeout 为单个 ffmpeg 进程的墙钟时限（秒）。
+    """
     if not video_files:
         return False
 
-    # 先获取所有视频的分辨率，选择第一个视频的分辨率作为目标分辨率
-    target_width = None
-    target_height = None
+    # 一次性并行探测所有输入（命中项目缓存时不启动 ffprobe）
+    infos = probe_inputs(video_files, ProbeService.for_project(project_path))
 
-    for video in video_files:
-        try:
-            result = subprocess.run(
-                ["ffprobe", "-v", "error", "-select_streams", "v:0",
-                 "-show_entries", "stream=width,height", "-of", "csv=s=,:p=0", video],
-                capture_output=True, text=True, check=True
+    if draft:
+        if dry_run:
+            return print_merge_command(
+                infos, bgm_file, output_path, cpu_budget, variants, draft, dialogues=dialogues
+            )
+        if not all(info is not None for info in infos):
+            click.echo("部分片段无法探测，无法生成草稿")
+            return False
+        return merge_draft(infos, bgm_file, output_path, cpu_budget, timeout, temp_root, dialogues)
+
+    manifest = None
+    if renders is not None and not dry_run:
+        manifest = render_manifest(video_files, bgm_file, dialogues, loudness, duck, engine, variants)
+        changed = None if force else renders.changed_sections(output_path, manifest)
+        if changed == []:
+            click.echo(f"输入没有变化，成片已是最新: {output_path}（使用 --force 重新渲染）")
+            return True
+        if changed == ["audio"] and not variants and not remux_audio:
+            click.echo("只有音频输入有变化，视频流复制，只重建音轨")
+            remux_audio = True
+
+    plan_levels = None
+    if loudness is not None:
+        plan_levels = measure_loudness(
+            infos, bgm_file, loudness, project_path, jobs, cpu_budget, timeout, dialogues, dry_run
+        )
+
+    if dry_run:
+        return print_merge_command(
+            infos, bgm_file, output_path, cpu_budget, variants,
+            loudness=plan_levels, dialogues=dialogues, duck=duck,
+        )
+
+    if remux_audio:
+        if not all(info is not None for info in infos):
+            click.echo("部分片段无法探测，无法重建音轨")
+            return False
+        merged = remux_soundtrack(
+            infos, bgm_file, output_path, timeout, plan_levels, dialogues, duck, temp_root
+        )
+        if merged and renders is not None:
+            fields = {"remuxed": True}
+            if manifest is not None:
+                # 视频部分沿用上次渲染的记录（--remux-audio 时画面来自已有成片）
+                previous = (renders.get(output_path) or {}).get("manifest") or {}
+                manifest = dict(manifest, video=previous.get("video", manifest["video"]))
+                fields.update(manifest=manifest, fingerprint=file_fingerprint(output_path))
+            renders.record(output_path, **fields)
+        return merged
+
+    planned: List[Variant] = []
+    try:
+        if variants and all(info is not None for info in infos):
+            # 多画幅只解码一次，必须走单图编码
+            planned = plan_variants(variants, MergeTarget.from_infos(infos), output_path)
+            engine = "graph"
+            merged = merge_filter_graph(
+                infos, bgm_file, output_path, cpu_budget, timeout, planned, plan_levels, dialogues, duck
+            )
+        else:
+            if variants:
+                click.echo("部分片段无法探测，忽略 --variants")
+            merged = merge_by_engine(
+                video_files, infos, bgm_file, output_path, jobs, cpu_budget,
+                engine, cache, timeout, temp_root, chunk_seconds, plan_levels, dialogues, duck,
             )
-            if result.stdout.strip():
-                w, h = map(int, result.stdout.strip().split(','))
-                if target_width is None:
-                    target_width, target_height = w, h
-                break
-        except Exception:
+    finally:
+        if cache is not None:
+            cache.prune()
+
+    if merged and renders is not None:
+        record_renders(renders, output_path, engine, planned, manifest)
+    return merged
+
+
+def merge_by_engine(
+    video_files: list,
+    infos: List[Optional[MediaInfo]],
+    bgm_file: Optional[str],
+    output_path: Path,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    engine: str = "graph",
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+    temp_root: Optional[Path] = None,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> bool:
+    """按参数一致性和 engine 选择合并方式"""
+    # 流参数一致（或只有少数片段不一致）时使用 concat -c copy
+    plan = plan_copy_concat(infos)
+    if engine in ("pipe", "chunked") and plan is not None and not plan.all_compatible:
+        plan = None  # 管道模式不为少数片段写中间文件，分段模式整体并行编码
+    if plan is not None and (plan.reference.has_audio or not bgm_file):
+        return merge_stream_copy(
+            video_files, infos, plan, output_path, jobs, cpu_budget, bgm_file, cache, timeout, temp_root,
+            loudness, dialogues, duck,
+        )
+
+    if engine == "pipe" and all(info is not None for info in infos):
+        if loudness is not None or dialogues:
+            click.echo("pipe 引擎不支持响度归一化和配音混音，已跳过")
+        if pipes_supported(temp_root):
+            return merge_pipe(infos, bgm_file, output_path, cpu_budget, timeout, temp_root)
+        fallback_root = fallback_temp_root(temp_root)
+        click.echo(f"当前环境不支持命名管道，改用临时目录 {fallback_root or tempfile.gettempdir()}")
+        return merge_two_stage(
+            video_files, infos, bgm_file, output_path, jobs, cpu_budget, None, timeout, fallback_root
+        )
+
+    if engine == "chunked" and all(info is not None for info in infos):
+        return merge_chunked(
+            infos, bgm_file, output_path, jobs, cpu_budget, timeout, temp_root, chunk_seconds,
+            loudness, dialogues, duck,
+        )
+
+    if engine == "graph" and all(info is not None for info in infos):
+        return merge_filter_graph(
+            infos, bgm_file, output_path, cpu_budget, timeout,
+            loudness=loudness, dialogues=dialogues, duck=duck,
+        )
+
+    return merge_two_stage(
+        video_files, infos, bgm_file, output_path, jobs, cpu_budget, cache, timeout, temp_root,
+        loudness, dialogues, duck,
+    )
+
+
+def measure_loudness(
+    infos: List[Optional[MediaInfo]],
+    bgm_file: Optional[str],
+    target: LoudnessTarget,
+    project_path: Optional[Path] = None,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    dialogues: Sequence[Dialogue] = (),
+    dry_run: bool = False,
+) -> LoudnessPlan:
+    """首遍响度测量，结果存入项目的 loudness 缓存，未变化的片段不再解码
+
+    dry_run 为真时不解码，只使用缓存并打印未命中文件的测量命令。
+    """
+    cache = ContentCache.for_project(project_path, "loudness") if project_path is not None else None
+    if dry_run:
+        click.echo("# 首遍响度测量（缓存未命中的文件，未测量的文件不做归一化）")
+        return plan_loudness(
+            infos, bgm_file, target, cache, dialogue_files=[d.path for d in dialogues], dry_run=True
+        )
+    click.echo(f"测量响度（目标 {target.integrated:g} LUFS）")
+    durations = [info.duration if info is not None and info.has_audio else 0.0 for info in infos]
+    reporter = ProgressReporter("响度测量", durations)
+    try:
+        return plan_loudness(
+            infos, bgm_file, target, cache, jobs, cpu_budget, timeout,
+            on_error=lambda path, e: click.echo(f"响度测量失败，不做归一化: {path}"),
+            dialogue_files=[d.path for d in dialogues],
+            on_progress=reporter,
+        )
+    finally:
+        reporter.close()
+
+
+def find_dialogues(project_path: Path, infos: Sequence[Optional[MediaInfo]]) -> List[Dialogue]:
+    """查找项目 audio/ 下的 dialogue_NNN*.mp3，第 N 段配音放在第 N 个镜头开始处
+
+    有文本分镜时使用镜头的开始时间，否则使用第 N 个片段在成片中的开始时间；
+    同一编号有多个文件时使用文件名排序最后的一个（最新生成的）。
+    """
+    files: Dict[int, Path] = {}
+    for path in sorted((Path(project_path) / "audio").glob("dialogue_*.mp3")):
+        match = DIALOGUE_PATTERN.match(path.name)
+        if match:
+            files[int(match.group(1))] = path
+    if not files:
+        return []
+
+    storyboard_path = Path(project_path) / STORYBOARD_FILE
+    shots = parse_storyboard(storyboard_path.read_text(encoding="utf-8")) if storyboard_path.exists() else []
+    offsets = [0.0]
+    for info in infos:
+        offsets.append(offsets[-1] + (info.duration if info is not None else 0.0))
+
+    dialogues = []
+    for number, path in sorted(files.items()):
+        if 1 <= number <= len(shots):
+            start = shots[number - 1].start
+        elif 1 <= number <= len(infos):
+            start = offsets[number - 1]
+        else:
+            click.echo(f"配音 {path.name} 没有对应的镜头，已跳过")
             continue
+        dialogues.append(Dialogue(path=str(path), start=start))
+    return dialogues
+
+
+def render_manifest(
+    video_files: Sequence[str],
+    bgm_file: Optional[str],
+    dialogues: Sequence[Dialogue],
+    loudness: Optional[LoudnessTarget],
+    duck: bool,
+    engine: str,
+    variants: Sequence[str] = (),
+) -> Dict[str, Any]:
+    """成片的输入清单：视频部分（片段内容、引擎、画幅）和音频部分（背景音乐、配音、响度）
 
-    if target_width is None:
-        target_width, target_height = 1280, 720  # 默认分辨率
+    片段同时提供画面和原声，片段内容变化属于视频部分；只有音频部分变化时可以只重建音轨。
+    """
+    bgm_digest = file_digest(bgm_file) if bgm_file and Path(bgm_file).exists() else None
+    return {
+        "video": {
+            "clips": [file_digest(path) for path in video_files],
+            "engine": engine,
+            "variants": list(variants),
+        },
+        "audio": {
+            "bgm": bgm_digest,
+            "bgm_volume": DEFAULT_BGM_VOLUME,
+            "dialogues": [[file_digest(d.path), d.start, d.volume] for d in dialogues],
+            "loudness": asdict(loudness) if loudness is not None else None,
+            "duck": duck and bool(dialogues),
+        },
+    }
+
+
+def record_renders(
+    renders: RenderLog,
+    output_path: Path,
+    engine: str,
+    variants: List[Variant],
+    manifest: Optional[Dict[str, Any]] = None,
+) -> None:
+    """把成片和各画幅版本写入项目的 renders.json
+
+    manifest 为本次渲染的输入清单，与成片的大小和修改时间一起记录，供下次合并比较。
+    """
+    extra = [v for v in variants if v.output_path != output_path]
+    main = next((v for v in variants if v.output_path == output_path), None)
+    fields = {"engine": engine, "variants": [renders.key(v.output_path) for v in extra], "remuxed": False}
+    if manifest is not None:
+        fields.update(manifest=manifest, fingerprint=file_fingerprint(output_path))
+    if main is not None:
+        fields.update(aspect=main.aspect, width=main.width, height=main.height)
+    renders.record(output_path, **fields)
+    for variant in extra:
+        renders.record(
+            variant.output_path, engine=engine, variant_of=renders.key(output_path),
+            aspect=variant.aspect, width=variant.width, height=variant.height,
+        )
+
+
+def print_merge_command(
+    infos: List[Optional[MediaInfo]],
+    bgm_file: Optional[str],
+    output_path: Path,
+    cpu_budget: Optional[int] = None,
+    variants: Sequence[str] = (),
+    draft: bool = False,
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> bool:
+    """打印单次编码的合并命令（可直接在 shell 中执行），不运行 ffmpeg"""
+    if not all(info is not None for info in infos):
+        click.echo("部分片段无法探测，无法编译合并命令")
+        return False
+    threads = cpu_budget or 0
+    if draft:
+        audio_list = None
+        if not bgm_file and not dialogues and audio_copy_compatible(infos):
+            audio_list = output_path.with_name("audio_list.txt")
+            click.echo(f"# {audio_list.name} 在执行时生成，内容为各片段的 concat 列表")
+        graph = build_draft_graph(
+            infos, output_path, audio_list, bgm_file=bgm_file, threads=threads, dialogues=dialogues
+        )
+    else:
+        planned = plan_variants(variants, MergeTarget.from_infos(infos), output_path) if variants else []
+        graph = build_filter_merge_graph(
+            infos, output_path, bgm_file=bgm_file, threads=threads, variants=planned,
+            loudness=loudness, dialogues=dialogues, duck=duck,
+        )
+    graph.dry_run()
+    return True
 
-    # 创建临时目录用于处理后的视频
-    import tempfile
-    temp_dir = Path(tempfile.mkdtemp())
-    processed_files = []
 
+def merge_draft(
+    infos: List[MediaInfo],
+    bgm_file: Optional[str],
+    output_path: Path,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    temp_root: Optional[Path] = None,
+    dialogues: Sequence[Dialogue] = (),
+) -> bool:
+    """低分辨率 ultrafast 草稿，音频参数一致时直接复制，输出分片 MP4 可边编码边播放"""
+    import shutil
+
+    target = draft_target(infos)
+    copy_audio = not bgm_file and not dialogues and audio_copy_compatible(infos)
+    click.echo(f"生成草稿预览 {target.width}x{target.height}" + ("，音频直接复制" if copy_audio else ""))
+    temp_dir = Path(tempfile.mkdtemp(prefix="videoclaw-draft-", dir=temp_root))
+    total = sum(info.duration for info in infos)
+    try:
+        audio_list = None
+        if copy_audio:
+            audio_list = temp_dir / "audio_list.txt"
+            audio_list.write_text("".join(concat_list_entry(info.path) for info in infos))
+        cmd = build_draft_command(
+            infos, output_path, audio_list, target, bgm_file, threads=cpu_budget or 0, dialogues=dialogues
+        )
+        with ProgressReporter("草稿", [total]) as reporter:
+            run_ffmpeg(cmd, on_progress=reporter, duration=total, timeout=timeout)
+        return True
+    except FFmpegError as e:
+        click.echo(f"FFmpeg 错误: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def merge_filter_graph(
+    infos: List[MediaInfo],
+    bgm_file: Optional[str],
+    output_path: Path,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    variants: Sequence[Variant] = (),
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> bool:
+    """单个 filter_complex 完成归一化、拼接、响度归一化和背景音乐、配音混音，只编码一次"""
+    click.echo("使用单次 filter_complex 编码合并")
+    extra = [v for v in variants if v.output_path != output_path]
+    if extra:
+        click.echo("同时导出画幅: " + ", ".join(f"{v.aspect} ({v.width}x{v.height})" for v in extra))
+    cmd = build_filter_merge_command(
+        infos, output_path, bgm_file=bgm_file, threads=cpu_budget or 0, variants=variants,
+        loudness=loudness, dialogues=dialogues, duck=duck,
+    )
+    total = sum(info.duration for info in infos)
     try:
-        # 1. 将所有视频重新编码为目标分辨率
-        for i, video in enumerate(video_files):
-            processed_path = temp_dir / f"video_{i:03d}.mp4"
-
-            # 使用 scale 滤镜统一分辨率，同时使用 pad 保持纵横比
-            cmd = [
-                "ffmpeg", "-y", "-i", video,
-                "-vf", f"scale={target_width}:{target_height}:force_original_aspect_ratio=decrease,pad={target_width}:{target_height}:(ow-iw)/2:(oh-ih)/2",
-                "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-                "-c:a", "aac", "-b:a", "128k",
-                str(processed_path)
-            ]
-            subprocess.run(cmd, capture_output=True, check=True)
-            processed_files.append(str(processed_path))
-
-        # 2. 使用 concat 合并处理后的视频
-        concat_list = temp_dir / "concat_list.txt"
-        with open(concat_list, "w") as f:
-            for video in processed_files:
-                f.write(f"file '{video}'\n")
-
-        cmd = [
-            "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(concat_list),
-            "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-            "-c:a", "aac", "-b:a", "128k",
-            str(output_path)
-        ]
-        subprocess.run(cmd, capture_output=True, check=True)
+        with ProgressReporter("编码", [total]) as reporter:
+            run_ffmpeg(cmd, on_progress=reporter, duration=total, timeout=timeout)
         return True
+    except FFmpegError as e:
+        click.echo(f"FFmpeg 错误: {e}")
+        return False
+
 
-    except subprocess.CalledProcessError as e:
-        click.echo(f"FFmpeg 错误: {e.stderr.decode() if e.stderr else str(e)}")
+def merge_pipe(
+    infos: List[MediaInfo],
+    bgm_file: Optional[str],
+    output_path: Path,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    temp_root: Optional[Path] = None,
+) -> bool:
+    """各片段归一化后经命名管道直接流入最终封装，不写中间文件"""
+    click.echo("使用命名管道流式合并")
+    reference = MergeTarget.from_infos(infos).as_reference()
+    try:
+        with ProgressReporter("合并", [sum(info.duration for info in infos)]) as reporter:
+            pipe_merge(
+                infos, reference, output_path, bgm_file=bgm_file, fifo_root=temp_root,
+                threads=cpu_budget or 0, timeout=timeout, on_progress=reporter,
+            )
+        return True
+    except PipeMergeError as e:
+        click.echo(f"{e.label} 处理失败")
+        click.echo(f"FFmpeg 错误: {e.stderr}")
+        return False
+
+
+def merge_chunked(
+    infos: List[MediaInfo],
+    bgm_file: Optional[str],
+    output_path: Path,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    temp_root: Optional[Path] = None,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> bool:
+    """按 GOP 对齐分段，多进程并行编码后流复制拼接，适合较长的成片"""
+    click.echo(f"使用分段并行编码合并（每段约 {chunk_seconds:g} 秒）")
+    total = sum(info.duration for info in infos)
+    # 音轨和所有视频分段各覆盖一遍完整时间线
+    try:
+        with ProgressReporter("分段编码", [total, total]) as reporter:
+            chunked_encode(
+                infos, output_path, bgm_file=bgm_file, chunk_seconds=chunk_seconds,
+                jobs=jobs, cpu_budget=cpu_budget, timeout=timeout,
+                on_progress=reporter, temp_root=temp_root,
+                loudness=loudness, dialogues=dialogues, duck=duck,
+            )
+        return True
+    except JobFailedError as e:
+        click.echo(f"{e.label} 编码失败")
+        click.echo(f"FFmpeg 错误: {e.stderr}")
+        return False
+    except FFmpegError as e:
+        click.echo(f"FFmpeg 错误: {e}")
+        return False
+
+
+def merge_two_stage(
+    video_files: list,
+    infos: List[Optional[MediaInfo]],
+    bgm_file: Optional[str],
+    output_path: Path,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+    temp_root: Optional[Path] = None,
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> bool:
+    """两阶段合并：先并行把每个片段归一化为统一参数，再 concat 流复制拼接"""
+    reference = MergeTarget.from_infos(infos).as_reference()
+    return merge_stream_copy(
+        video_files, infos, CopyPlan(reference, list(range(len(video_files)))),
+        output_path, jobs, cpu_budget, bgm_file, cache, timeout, temp_root, loudness, dialogues, duck,
+    )
+
+
+def probe_inputs(video_files: list, service: Optional[ProbeService] = None) -> List[Optional[MediaInfo]]:
+    """探测所有输入，探测失败的片段返回 None"""
+    service = service or ProbeService()
+    return service.probe_many(video_files)
+
+
+def reencode_clips(
+    video_files: list,
+    infos: List[Optional[MediaInfo]],
+    indices: List[int],
+    reference: MediaInfo,
+    temp_dir: Path,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+) -> Dict[int, str]:
+    """并行把指定片段重新编码为与 reference 一致的流参数
+
+    有缓存时以“输入内容摘要 + 编码参数”为键，命中的片段直接复用。
+    返回 {片段索引: 处理后的文件路径}。
+    """
+    results: Dict[int, str] = {}
+    pending = []
+    for i in indices:
+        # 探测失败的片段按有音轨处理
+        source = infos[i] or MediaInfo(path=video_files[i], audio_codec="unknown")
+        encode_args = match_encode_args(reference, source)
+        key = None
+        if cache is not None:
+            key = ContentCache.make_key(file_digest(video_files[i]), "normalize", *encode_args)
+            hit = cache.get(key, ".mp4")
+            if hit is not None:
+                results[i] = str(hit)
+                continue
+        pending.append((i, source, key))
+
+    if cache is not None:
+        click.echo(f"复用缓存片段 {len(results)} 个，重新编码 {len(pending)} 个")
+    if not pending:
+        return results
+
+    workers = resolve_jobs(jobs, len(pending), cpu_budget)
+    threads = threads_per_job(workers, cpu_budget)
+    commands = []
+    for i, source, _ in pending:
+        cmd = ["ffmpeg", "-y", "-i", video_files[i]]
+        if reference.has_audio and not source.has_audio:
+            layout = reference.channel_layout or ("stereo" if reference.channels == 2 else "mono")
+            cmd += ["-f", "lavfi", "-i", f"anullsrc=r={reference.sample_rate or 44100}:cl={layout}"]
+        cmd += match_encode_args(reference, source, threads) + [str(temp_dir / f"video_{i:03d}.mp4")]
+        commands.append(cmd)
+
+    durations = [source.duration for _, source, _ in pending]
+    reporter = ProgressReporter("归一化", durations)
+    try:
+        run_parallel(
+            commands, workers,
+            labels=[video_files[i] for i, _, _ in pending],
+            budget=cpu_budget,
+            on_progress=reporter,
+            durations=durations,
+            timeout=timeout,
+        )
+    except JobFailedError as e:
+        # 把任务序号换算回片段序号
+        raise JobFailedError(pending[e.index][0], e.label, e.stderr) from e
+    finally:
+        reporter.close()
+
+    for i, _, key in pending:
+        encoded = temp_dir / f"video_{i:03d}.mp4"
+        results[i] = str(cache.put(key, encoded, ".mp4") if cache is not None else encoded)
+    return results
+
+
+def merge_stream_copy(
+    video_files: list,
+    infos: List[Optional[MediaInfo]],
+    plan: CopyPlan,
+    output_path: Path,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    bgm_file: Optional[str] = None,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+    temp_root: Optional[Path] = None,
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> bool:
+    """使用 concat -c copy 合并，只重新编码与参考片段不一致的片段
+
+    需要响度归一化或配音时视频仍然流复制，音轨从原始片段读取，在图内重建后重新编码。
+    """
+    import shutil
+
+    temp_dir = Path(tempfile.mkdtemp(prefix="videoclaw-merge-", dir=temp_root))
+    inputs = [str(Path(v).resolve()) for v in video_files]
+
+    try:
+        if plan.mismatched:
+            if len(plan.mismatched) < len(video_files):
+                click.echo(f"{len(plan.mismatched)} 个片段参数不一致，重新编码以匹配其余片段")
+            encoded = reencode_clips(
+                video_files, infos, plan.mismatched, plan.reference,
+                temp_dir, jobs, cpu_budget, cache, timeout,
+            )
+            for i, path in encoded.items():
+                inputs[i] = path
+        else:
+            click.echo("所有片段参数一致，直接流复制合并")
+
+        if (loudness is not None or dialogues) and all(info is not None for info in infos):
+            list_file = temp_dir / "concat_list.txt"
+            list_file.write_text("".join(concat_list_entry(path) for path in inputs))
+            graph = build_audio_remix_graph(
+                list_file, infos, output_path, bgm_file=bgm_file,
+                loudness=loudness, dialogues=dialogues, duck=duck,
+            )
+            run_ffmpeg(graph.compile(), timeout=timeout)
+        else:
+            FFmpegProcessor(timeout=timeout).merge(inputs, str(output_path), bgm_file=bgm_file)
+        return True
+
+    except JobFailedError as e:
+        click.echo(f"片段 {e.index + 1} 处理失败: {e.label}")
+        click.echo(f"FFmpeg 错误: {e.stderr}")
+        return False
+    except FFmpegError as e:
+        click.echo(f"FFmpeg 错误: {e}")
         return False
     finally:
-        # 清理临时文件
-        import shutil
         shutil.rmtree(temp_dir, ignore_errors=True)
 
 
+def remux_soundtrack(
+    infos: List[MediaInfo],
+    bgm_file: Optional[str],
+    output_path: Path,
+    timeout: Optional[float] = None,
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+    temp_root: Optional[Path] = None,
+) -> bool:
+    """从已有成片流复制视频，只重新混音和编码音轨，写入临时文件后原子替换"""
+    import shutil
+
+    if not output_path.exists():
+        click.echo(f"成片不存在，无法只重建音轨: {output_path}")
+        return False
+    click.echo("只重建音轨，视频流复制")
+    fd, temp_name = tempfile.mkstemp(
+        prefix=f".{output_path.stem}-", suffix=output_path.suffix, dir=output_path.parent
+    )
+    os.close(fd)
+    try:
+        graph = build_audio_remix_graph(
+            output_path, infos, Path(temp_name), bgm_file=bgm_file,
+            loudness=loudness, dialogues=dialogues, duck=duck, concat_list=False,
+        )
+        run_ffmpeg(graph.compile(), timeout=timeout)
+        # mkstemp 创建的文件权限是 0600，沿用原成片的权限
+        shutil.copymode(output_path, temp_name)
+        os.replace(temp_name, output_path)
+        return True
+    except FFmpegError as e:
+        click.echo(f"FFmpeg 错误: {e}")
+        return False
+    finally:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+
+
+def config_flag(value) -> bool:
+    """解析布尔配置项（兼容字符串形式的 false/0/off）"""
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(value)
+
+
+def loudness_target(config: Config) -> LoudnessTarget:
+    """从配置读取响度归一化目标"""
+    target = LoudnessTarget()
+    target.integrated = float(config.get("merge.loudness_target", target.integrated))
+    target.true_peak = float(config.get("merge.true_peak", target.true_peak))
+    return target
+
+
+def parse_variants_option(ctx, param, value: Optional[str]) -> List[str]:
+    """解析 --variants 参数"""
+    if not value:
+        return []
+    aspects = [part.strip() for part in value.split(",") if part.strip()]
+    for aspect in aspects:
+        try:
+            parse_aspect(aspect)
+        except ValueError as e:
+            raise click.BadParameter(str(e)) from e
+    return aspects
+
+
 @click.command()
 @click.option("--project", "-p", required=True, help="项目名称")
 @click.option("--videos", "-v", multiple=True, required=True, help="视频文件路径（可多次指定）")
 @click.option("--audio", "-a", help="背景音乐文件路径")
-@click.option("--output", "-o", default="final.mp4", help="输出文件名")
-def merge(project: str, videos: tuple, audio: str, output: str):
+@click.option("--output", "-o", help="输出文件名（默认 final.mp4，草稿为 draft.mp4）")
+@click.option("--jobs", "-j", default=0, type=int, help="并行处理片段的进程数，0 表示按 CPU 核心数自动选择")
+@click.option("--engine", type=click.Choice(MERGE_ENGINES), default="graph",
+              help="合并引擎：graph 单次 filter_complex 编码；concat 逐片段归一化（带缓存）后流复制拼接；"
+                   "pipe 经命名管道流式合并，不写中间文件；chunked 分段并行编码，适合较长的成片")
+@click.option("--variants", callback=parse_variants_option,
+              help="同时导出的画幅比例，逗号分隔，如 9:16,16:9,1:1（一次解码生成全部版本）")
+@click.option("--draft", is_flag=True, help="快速生成 360p 草稿预览（分片 MP4，编码过程中即可播放），不上传")
+@click.option("--dry-run", is_flag=True, help="只打印单次编码（graph 引擎或草稿）的 ffmpeg 命令，不执行")
+@click.option("--loudnorm/--no-loudnorm", default=None,
+              help="EBU R128 响度归一化（默认开启，可用配置 merge.loudnorm 关闭）")
+@click.option("--dialogues/--no-dialogues", default=True,
+              help="混入项目 audio/dialogue_*.mp3 配音，按分镜时间点放置（默认开启）")
+@click.option("--remux-audio", is_flag=True, help="只重建音轨：从已有成片流复制视频，不重新编码")
+@click.option("--force", is_flag=True, help="忽略上次渲染记录，完整重新渲染")
+def merge(
+    project: str,
+    videos: tuple,
+    audio: str,
+    output: Optional[str],
+    jobs: int,
+    engine: str,
+    variants: List[str],
+    draft: bool,
+    dry_run: bool,
+    loudnorm: Optional[bool],
+    dialogues: bool,
+    remux_audio: bool,
+    force: bool,
+):
     """合并视频片段"""
     project_path = DEFAULT_PROJECTS_DIR / project
     logger = get_logger(project_path)
@@ -119,6 +811,7 @@ def merge(project: str, videos: tuple, audio: str, output: str):
 
     videos_dir = project_path / "videos"
     videos_dir.mkdir(exist_ok=True)
+    output = output or ("draft.mp4" if draft else "final.mp4")
     output_path = videos_dir / output
 
     click.echo(f"找到 {len(video_files)} 个视频片段")
@@ -128,13 +821,57 @@ def merge(project: str, videos: tuple, audio: str, output: str):
     # 检查 FFmpeg
     has_ffmpeg = check_ffmpeg()
 
+    if loudnorm is None:
+        loudnorm = config_flag(config.get("merge.loudnorm", True))
+    loudness = loudness_target(config) if loudnorm else None
+    duck = config_flag(config.get("merge.ducking", True))
+    placed: List[Dialogue] = []
+    if dialogues:
+        placed = find_dialogues(project_path, probe_inputs(video_files, ProbeService.for_project(project_path)))
+        if placed:
+            click.echo(f"配音: {len(placed)} 段" + ("（配音时压低其余声音）" if duck else ""))
+
+    if dry_run:
+        if not all(Path(v).exists() for v in video_files):
+            click.echo("错误: 部分视频文件不存在", err=True)
+            return
+        if engine != "graph" and not draft and not variants:
+            click.echo(f"# --dry-run 打印的是 graph 引擎的命令（{engine} 引擎由多个 ffmpeg 进程组成）")
+        merge_with_ffmpeg(
+            video_files, [], bgm_file, output_path,
+            cpu_budget=int(config.get("ffmpeg.cpu_budget", 0) or 0),
+            project_path=project_path, variants=variants, draft=draft, dry_run=True, loudness=loudness,
+            dialogues=placed, duck=duck,
+        )
+        return
+
     if has_ffmpeg and all(Path(v).exists() for v in video_files):
         # 使用 FFmpeg 合并
         click.echo("使用 FFmpeg 合并视频...")
 
         # 尝试合并
-        if merge_with_ffmpeg(video_files, [], bgm_file, output_path):
+        cpu_budget = int(config.get("ffmpeg.cpu_budget", 0) or 0)
+        timeout = float(config.get("ffmpeg.timeout", 0) or 0) or None
+        temp_root = default_temp_root(config.get("merge.temp_dir"))
+        chunk_seconds = float(config.get("merge.chunk_seconds", 0) or 0) or DEFAULT_CHUNK_SECONDS
+        cache = ContentCache.for_project(
+            project_path, "normalized", parse_size(config.get("cache.max_size", DEFAULT_MAX_SIZE))
+        )
+        # 已有成片（包括只重建音轨的情况）合并失败时保留原文件和渲染记录，不写占位文件
+        had_output = output_path.exists()
+        merged = merge_with_ffmpeg(
+            video_files, [], bgm_file, output_path,
+            jobs=jobs, cpu_budget=cpu_budget, engine=engine,
+            project_path=project_path, cache=cache, timeout=timeout, temp_root=temp_root,
+            chunk_seconds=chunk_seconds, variants=variants,
+            renders=RenderLog.for_project(project_path), draft=draft, loudness=loudness,
+            dialogues=placed, duck=duck, remux_audio=remux_audio, force=force,
+        )
+        if merged:
             click.echo(f"视频已合并: {output_path}")
+        elif had_output or remux_audio:
+            click.echo(f"错误: FFmpeg 合并失败，保留原有成片: {output_path}", err=True)
+            sys.exit(1)
         else:
             click.echo("FFmpeg 合并失败，创建占位文件")
             output_path.write_bytes(b"merged video placeholder")
@@ -149,6 +886,10 @@ def merge(project: str, videos: tuple, audio: str, output: str):
         else:
             output_path.write_bytes(b"merged video placeholder")
 
+    if draft:
+        click.echo(f"\n草稿已生成: {output_path}")
+        return
+
     # 上传到云盘
     cloud_url = upload_to_cloud(
         output_path,
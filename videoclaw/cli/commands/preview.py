@@ -1,33 +1,136 @@
 """preview 命令"""
 from __future__ import annotations
 
+import functools
 import subprocess
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Optional
+from urllib.parse import quote, unquote
 
 import click
 
+from videoclaw.cache import ContentCache, configured_max_bytes
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.proxy import CACHE_NAME, ProxyWatcher, open_command, proxy_for, proxy_kind
+
 DEFAULT_PROJECTS_DIR = Path.home() / "videoclaw-projects"
 
 
-@click.command()
-@click.argument("file_path")
-@click.option("--project", "-p", help="项目名称")
-def preview(file_path: str, project: Optional[str]):
-    """预览图片或视频"""
-    path = Path(file_path)
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """不在终端打印每个请求"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SingleFileHandler(_QuietHandler):
+    """只提供 file_name 这一个文件，其余路径（包括目录列表）一律 404"""
+
+    file_name = ""
+
+    def translate_path(self, path):
+        requested = unquote(path.split("?", 1)[0].split("#", 1)[0])
+        if requested != f"/{self.file_name}":
+            # 返回不存在的路径，send_head 会回应 404
+            return str(Path(self.directory) / ".videoclaw-not-found" / "missing")
+        return str(Path(self.directory) / self.file_name)
+
+
+def file_handler(path: Path):
+    """只提供 path 这一个文件的请求处理器"""
+    handler_class = type("_PreviewHandler", (_SingleFileHandler,), {"file_name": path.name})
+    return functools.partial(handler_class, directory=str(path.parent))
+
 
-    # 如果是相对路径，结合项目目录
-    if project and not path.is_absolute():
-        path = DEFAULT_PROJECTS_DIR / project / path
+def serve_file(path: Path, host: str, port: int) -> None:
+    """在本地 HTTP 服务上只提供这一个文件，直到 Ctrl+C"""
+    with ThreadingHTTPServer((host, port), file_handler(path)) as server:
+        click.echo(f"预览地址: http://{host}:{server.server_address[1]}/{quote(path.name)}")
+        click.echo("按 Ctrl+C 停止")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
 
-    if not path.exists():
-        click.echo(f"错误: 文件 {path} 不存在", err=True)
+
+@click.command()
+@click.argument("file_path", required=False)
+@click.option("--project", "-p", help="项目名称")
+@click.option("--original", is_flag=True, help="直接打开原文件，不使用低分辨率代理")
+@click.option("--serve", is_flag=True, help="通过本地 HTTP 服务提供预览，适合远程桌面和无图形界面的主机")
+@click.option("--host", default="127.0.0.1", help="--serve 监听地址")
+@click.option("--port", default=8000, type=int, help="--serve 端口，0 表示随机端口")
+@click.option("--watch", is_flag=True, help="后台为项目 videos/ 和 assets/ 中新增的文件生成代理")
+def preview(
+    file_path: Optional[str],
+    project: Optional[str],
+    original: bool,
+    serve: bool,
+    host: str,
+    port: int,
+    watch: bool,
+):
+    """预览图片或视频（默认打开缓存的低分辨率代理）"""
+    if not file_path and not watch:
+        click.echo("错误: 需要指定文件路径或使用 --watch", err=True)
         return
+    if watch and not project:
+        click.echo("错误: --watch 需要指定 --project", err=True)
+        return
+
+    project_path = DEFAULT_PROJECTS_DIR / project if project else None
+    # 没有项目时代理放在全局缓存，同样按 cache.max_size 淘汰
+    max_bytes = configured_max_bytes(project_path)
+    if project_path is not None:
+        cache = ContentCache.for_project(project_path, CACHE_NAME, max_bytes)
+    else:
+        cache = ContentCache.global_cache(CACHE_NAME, max_bytes)
 
-    # 使用系统默认应用打开
+    watcher = ProxyWatcher(project_path, cache).start() if watch else None
     try:
-        subprocess.run(["open", str(path)], check=True)
-        click.echo(f"已打开: {path}")
-    except Exception as e:
-        click.echo(f"打开失败: {e}", err=True)
+        if file_path:
+            path = Path(file_path)
+
+            # 如果是相对路径，结合项目目录
+            if project_path is not None and not path.is_absolute():
+                path = project_path / path
+
+            if not path.exists():
+                click.echo(f"错误: 文件 {path} 不存在", err=True)
+                return
+
+            target = path
+            if not original and proxy_kind(path) is not None:
+                try:
+                    target = proxy_for(path, cache)
+                except (OSError, ValueError, FFmpegError) as e:
+                    click.echo(f"生成预览代理失败，打开原文件: {e}", err=True)
+
+            if serve:
+                serve_file(target, host, port)
+                return
+
+            cmd = open_command(target)
+            if cmd is None:
+                click.echo("当前环境没有可用的打开方式，请使用 --serve 通过浏览器预览", err=True)
+            else:
+                # 使用系统默认应用打开
+                try:
+                    subprocess.run(cmd, check=True)
+                    click.echo(f"已打开: {target}")
+                except Exception as e:
+                    click.echo(f"打开失败: {e}", err=True)
+
+        if watcher is not None:
+            click.echo(f"正在后台为 {project} 生成预览代理，按 Ctrl+C 停止")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        cache.prune()
@@ -0,0 +1,77 @@
+"""thumbs 命令"""
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from videoclaw.cache import configured_max_bytes
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.thumbs import (
+    DEFAULT_SHEET_COLUMNS,
+    DEFAULT_THUMB_COUNT,
+    DEFAULT_THUMB_WIDTH,
+    extract_thumbs,
+    thumbs_cache,
+)
+
+DEFAULT_PROJECTS_DIR = Path.home() / "videoclaw-projects"
+
+
+@click.command()
+@click.argument("file_path")
+@click.option("--project", "-p", help="项目名称")
+@click.option("--count", "-n", default=DEFAULT_THUMB_COUNT, type=click.IntRange(1, 100), help="缩略图数量")
+@click.option("--width", "-w", default=DEFAULT_THUMB_WIDTH, type=click.IntRange(16), help="缩略图宽度")
+@click.option("--cover-at", type=click.FloatRange(0), help="封面时间点（秒），默认取时长的 1/3 处")
+@click.option("--columns", default=DEFAULT_SHEET_COLUMNS, type=click.IntRange(1), help="拼板列数")
+@click.option("--output-dir", "-o", help="把结果复制到该目录（默认只保存在缓存中）")
+def thumbs(
+    file_path: str,
+    project: Optional[str],
+    count: int,
+    width: int,
+    cover_at: Optional[float],
+    columns: int,
+    output_dir: Optional[str],
+):
+    """一次解码生成封面、缩略图和拼板"""
+    path = Path(file_path)
+
+    # 如果是相对路径，结合项目目录
+    if project and not path.is_absolute():
+        path = DEFAULT_PROJECTS_DIR / project / path
+
+    if not path.exists():
+        click.echo(f"错误: 文件 {path} 不存在", err=True)
+        return
+
+    try:
+        cache = thumbs_cache(configured_max_bytes(DEFAULT_PROJECTS_DIR / project if project else None))
+    except ValueError as e:
+        click.echo(f"错误: {e}", err=True)
+        return
+
+    try:
+        result = extract_thumbs(
+            path, count=count, width=width, cover_at=cover_at, columns=columns, cache=cache
+        )
+    except FFmpegError as e:
+        click.echo(f"提取失败: {e}", err=True)
+        return
+
+    files = [("封面", result.cover), ("拼板", result.sheet)]
+    files += [(f"缩略图 {i}", thumb) for i, thumb in enumerate(result.thumbnails, 1)]
+    if output_dir:
+        target = Path(output_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        names = ["cover.jpg", "sheet.jpg"] + [f"thumb_{i:02d}.jpg" for i in range(1, count + 1)]
+        files = [
+            (label, Path(shutil.copyfile(src, target / name)))
+            for (label, src), name in zip(files, names)
+        ]
+
+    for label, file in files:
+        click.echo(f"{label}: {file}")
@@ -0,0 +1,266 @@
+"""timeline 命令"""
+from __future__ import annotations
+
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+import click
+
+from videoclaw.cache import DEFAULT_MAX_SIZE, ContentCache, parse_size
+from videoclaw.cli.commands.merge import probe_inputs, reencode_clips
+from videoclaw.cli.progress import ProgressReporter
+from videoclaw.config import Config
+from videoclaw.ffmpeg.merge import MergeTarget
+from videoclaw.ffmpeg.parallel import JobFailedError
+from videoclaw.ffmpeg.probe import ProbeService
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.runner import run_ffmpeg
+from videoclaw.ffmpeg.timeline import build_timeline_graph, timeline_duration
+from videoclaw.project import RenderLog
+from videoclaw.project.timeline import Gap, Timeline, Transition, parse_storyboard
+
+DEFAULT_PROJECTS_DIR = Path.home() / "videoclaw-projects"
+
+STORYBOARD_FILE = Path("storyboard") / "text_storyboard.md"
+
+
+def _project_path(project: str) -> Optional[Path]:
+    project_path = DEFAULT_PROJECTS_DIR / project
+    if not project_path.exists():
+        click.echo(f"错误: 项目 {project} 不存在", err=True)
+        return None
+    return project_path
+
+
+def _load(project_path: Path) -> Optional[Timeline]:
+    timeline = Timeline.load(Timeline.path_for(project_path))
+    if timeline is None:
+        click.echo("错误: 时间线不存在，请先运行 videoclaw timeline init", err=True)
+    return timeline
+
+
+def _source_path(project_path: Path, source: str) -> Path:
+    path = Path(source)
+    return path if path.is_absolute() else project_path / path
+
+
+def _relative(project_path: Path, path: Path) -> str:
+    """项目内的文件记录相对路径"""
+    try:
+        return path.resolve().relative_to(project_path.resolve()).as_posix()
+    except ValueError:
+        return str(path.resolve())
+
+
+@click.group()
+def timeline():
+    """时间线编辑与渲染（.videoclaw/timeline.json）"""
+    pass
+
+
+@timeline.command()
+@click.option("--project", "-p", required=True, help="项目名称")
+@click.option("--storyboard", "-s", help="文本分镜文件（默认 storyboard/text_storyboard.md）")
+@click.option("--videos", "-v", multiple=True, help="镜头对应的视频（默认 videos/video_*.mp4）")
+@click.option("--force", is_flag=True, help="覆盖已有的时间线")
+def init(project: str, storyboard: Optional[str], videos: tuple, force: bool):
+    """根据文本分镜的时间段建立时间线
+
+    只有一个视频时按各镜头的时间段截取该视频，
+    视频数与镜头数相同时每个镜头对应一个视频。
+    """
+    project_path = _project_path(project)
+    if project_path is None:
+        return
+    path = Timeline.path_for(project_path)
+    if path.exists() and not force:
+        click.echo(f"错误: 时间线已存在: {path}（使用 --force 覆盖）", err=True)
+        return
+
+    storyboard_path = Path(storyboard) if storyboard else project_path / STORYBOARD_FILE
+    if not storyboard_path.exists():
+        click.echo(f"错误: 分镜文件不存在: {storyboard_path}", err=True)
+        return
+    sources = [Path(v) for v in videos] or sorted((project_path / "videos").glob("video_*.mp4"))
+    if not sources:
+        click.echo("错误: 没有找到视频，请使用 --videos 指定", err=True)
+        return
+
+    shots = parse_storyboard(storyboard_path.read_text(encoding="utf-8"))
+    try:
+        result = Timeline.from_storyboard(shots, [_relative(project_path, s) for s in sources])
+    except ValueError as e:
+        click.echo(f"错误: {e}", err=True)
+        return
+    result.save(path)
+    click.echo(f"时间线已创建: {path}（{len(result.clips)} 个镜头）")
+
+
+@timeline.command()
+@click.option("--project", "-p", required=True, help="项目名称")
+def show(project: str):
+    """显示时间线"""
+    project_path = _project_path(project)
+    if project_path is None:
+        return
+    current = _load(project_path)
+    if current is None:
+        return
+
+    for i, item in enumerate(current.clips, 1):
+        prefix = f"  ~ {item.transition.kind} {item.transition.duration:g}s\n" if item.transition else ""
+        if isinstance(item, Gap):
+            click.echo(f"{prefix}{i}. [空白] {item.duration:g}s")
+            continue
+        out = "结尾" if item.out_point is None else f"{item.out_point:g}s"
+        name = f" {item.name}" if item.name else ""
+        click.echo(f"{prefix}{i}.{name} {item.source} [{item.in_point:g}s - {out}]")
+    for lane in current.audio_lanes:
+        click.echo(f"音轨 {lane.name}（音量 {lane.volume:g}）:")
+        for entry in lane.items:
+            loop = "，循环" if entry.loop else ""
+            click.echo(f"  {entry.source} @ {entry.start:g}s（音量 {entry.volume:g}{loop}）")
+
+
+@timeline.command()
+@click.option("--project", "-p", required=True, help="项目名称")
+@click.argument("index", type=click.IntRange(1))
+@click.option("--in", "in_point", type=click.FloatRange(0), help="入点（秒）")
+@click.option("--out", "out_point", type=click.FloatRange(0), help="出点（秒）")
+def trim(project: str, index: int, in_point: Optional[float], out_point: Optional[float]):
+    """修改第 INDEX 个片段的入点和出点"""
+    project_path = _project_path(project)
+    if project_path is None:
+        return
+    current = _load(project_path)
+    if current is None:
+        return
+    if index > len(current.clips) or isinstance(current.clips[index - 1], Gap):
+        click.echo(f"错误: 第 {index} 项不是片段", err=True)
+        return
+
+    item = current.clips[index - 1]
+    if in_point is not None:
+        item.in_point = in_point
+    if out_point is not None:
+        item.out_point = out_point
+    if item.out_point is not None and item.out_point <= item.in_point:
+        click.echo("错误: 出点必须大于入点", err=True)
+        return
+    current.save(Timeline.path_for(project_path))
+    click.echo(f"已更新第 {index} 项")
+
+
+@timeline.command()
+@click.option("--project", "-p", required=True, help="项目名称")
+@click.argument("index", type=click.IntRange(2))
+@click.option("--type", "kind", default="fade", help="xfade 转场类型，如 fade、dissolve、wipeleft、slideup")
+@click.option("--duration", "-d", default=0.5, type=click.FloatRange(0, min_open=True), help="转场时长（秒）")
+@click.option("--remove", is_flag=True, help="移除转场，改为直接拼接")
+def transition(project: str, index: int, kind: str, duration: float, remove: bool):
+    """设置第 INDEX 项与上一项之间的转场"""
+    project_path = _project_path(project)
+    if project_path is None:
+        return
+    current = _load(project_path)
+    if current is None:
+        return
+    if index > len(current.clips):
+        click.echo(f"错误: 时间线只有 {len(current.clips)} 项", err=True)
+        return
+
+    current.clips[index - 1].transition = None if remove else Transition(kind, duration)
+    current.save(Timeline.path_for(project_path))
+    click.echo(f"已更新第 {index} 项的转场")
+
+
+@timeline.command()
+@click.option("--project", "-p", required=True, help="项目名称")
+@click.option("--output", "-o", default="timeline.mp4", help="输出文件名（保存在 videos/ 下）")
+@click.option("--jobs", "-j", default=0, type=int, help="并行归一化的进程数，0 表示自动选择")
+@click.option("--dry-run", is_flag=True, help="只打印编译出的 ffmpeg 命令，不执行")
+def render(project: str, output: str, jobs: int, dry_run: bool):
+    """渲染时间线：素材归一化（带缓存）后一次编码完成截取、转场和混音"""
+    project_path = _project_path(project)
+    if project_path is None:
+        return
+    current = _load(project_path)
+    if current is None:
+        return
+
+    config = Config(project_path)
+    sources = current.sources()
+    paths = [str(_source_path(project_path, s)) for s in sources]
+    missing = [p for p in paths if not Path(p).exists()]
+    if missing:
+        click.echo(f"错误: 素材不存在: {', '.join(missing)}", err=True)
+        return
+
+    infos = probe_inputs(paths, ProbeService.for_project(project_path))
+    if sources and not all(info is not None for info in infos):
+        click.echo("错误: 部分素材无法探测", err=True)
+        return
+    media = dict(zip(sources, infos))
+    target = MergeTarget.from_infos(infos)
+    reference = target.as_reference()
+    mismatched = [i for i, info in enumerate(infos) if info.stream_signature() != reference.stream_signature()]
+
+    output_path = project_path / "videos" / output
+    output_path.parent.mkdir(exist_ok=True)
+    cpu_budget = int(config.get("ffmpeg.cpu_budget", 0) or 0)
+    timeout = float(config.get("ffmpeg.timeout", 0) or 0) or None
+    cache = ContentCache.for_project(
+        project_path, "normalized", parse_size(config.get("cache.max_size", DEFAULT_MAX_SIZE))
+    )
+
+    def resolve(source):
+        return str(_source_path(project_path, source))
+
+    if dry_run:
+        if mismatched:
+            click.echo(f"# {len(mismatched)} 个素材实际渲染前需要归一化，以下命令直接读取原始素材")
+        try:
+            graph = build_timeline_graph(current, media, dict(zip(sources, paths)), output_path, target, resolve)
+        except ValueError as e:
+            click.echo(f"错误: {e}", err=True)
+            return
+        graph.dry_run()
+        return
+
+    temp_dir = Path(tempfile.mkdtemp(prefix="videoclaw-timeline-"))
+    try:
+        # 归一化整段素材（按内容缓存），入点出点在图内截取
+        inputs: Dict[str, str] = dict(zip(sources, paths))
+        if mismatched:
+            encoded = reencode_clips(paths, infos, mismatched, reference, temp_dir, jobs, cpu_budget, cache, timeout)
+            for i, path in encoded.items():
+                inputs[sources[i]] = path
+        graph = build_timeline_graph(
+            current, media, inputs, output_path, target, resolve, threads=cpu_budget
+        )
+        total = timeline_duration(current, media)
+        click.echo(f"渲染时间线: {len(current.clips)} 项，{total:.1f} 秒")
+        reporter = ProgressReporter("渲染", [total])
+        try:
+            run_ffmpeg(graph.compile(), on_progress=reporter, duration=total, timeout=timeout)
+        finally:
+            reporter.close()
+    except ValueError as e:
+        click.echo(f"错误: {e}", err=True)
+        return
+    except JobFailedError as e:
+        click.echo(f"素材 {e.label} 归一化失败: {e.stderr}", err=True)
+        return
+    except FFmpegError as e:
+        click.echo(f"FFmpeg 错误: {e}", err=True)
+        return
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        cache.prune()
+
+    RenderLog.for_project(project_path).record(
+        output_path, engine="timeline", items=len(current.clips), duration=round(total, 3),
+    )
+    click.echo(f"时间线已渲染: {output_path}")
@@ -0,0 +1,115 @@
+"""trim 命令"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from videoclaw.cli.commands.merge import probe_inputs
+from videoclaw.config import Config
+from videoclaw.ffmpeg.parallel import JobFailedError
+from videoclaw.ffmpeg.probe import ProbeService
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.trim import plan_trim, smart_trim_many
+from videoclaw.project.timeline import parse_storyboard
+
+DEFAULT_PROJECTS_DIR = Path.home() / "videoclaw-projects"
+
+STORYBOARD_FILE = Path("storyboard") / "text_storyboard.md"
+
+
+@click.command()
+@click.argument("files", nargs=-1)
+@click.option("--project", "-p", help="项目名称（未指定文件时截取项目的 videos/video_*.mp4）")
+@click.option("--start", "-s", default=0.0, type=click.FloatRange(0), help="入点（秒）")
+@click.option("--end", "-e", type=click.FloatRange(0, min_open=True), help="出点（秒），默认到结尾")
+@click.option("--duration", "-d", type=click.FloatRange(0, min_open=True), help="截取时长（秒），与 --end 二选一")
+@click.option("--storyboard", is_flag=True, help="按文本分镜中每个镜头的时长截取（视频与镜头一一对应）")
+@click.option("--output-dir", "-o", help="输出目录（默认为素材目录下的 trimmed/）")
+@click.option("--jobs", "-j", default=0, type=int, help="并行进程数，0 表示自动选择")
+def trim(
+    files: tuple,
+    project: Optional[str],
+    start: float,
+    end: Optional[float],
+    duration: Optional[float],
+    storyboard: bool,
+    output_dir: Optional[str],
+    jobs: int,
+):
+    """快速截取视频：完整 GOP 直接复制，只重新编码切点附近的部分
+
+    示例:
+        videoclaw trim -p my-project --duration 4
+        videoclaw trim -p my-project --storyboard
+        videoclaw trim clip.mp4 --start 0.5 --end 4.5 -o out/
+    """
+    if end is not None and duration is not None:
+        raise click.UsageError("--end 和 --duration 只能指定一个")
+
+    project_path = None
+    if project:
+        project_path = DEFAULT_PROJECTS_DIR / project
+        if not project_path.exists():
+            click.echo(f"错误: 项目 {project} 不存在", err=True)
+            return
+    sources = [Path(f) for f in files]
+    if not sources and project_path is not None:
+        sources = sorted((project_path / "videos").glob("video_*.mp4"))
+    if not sources:
+        click.echo("错误: 没有要截取的视频", err=True)
+        return
+    missing = [str(s) for s in sources if not s.exists()]
+    if missing:
+        click.echo(f"错误: 文件不存在: {', '.join(missing)}", err=True)
+        return
+
+    if storyboard:
+        if project_path is None:
+            raise click.UsageError("--storyboard 需要指定 --project")
+        storyboard_path = project_path / STORYBOARD_FILE
+        text = storyboard_path.read_text(encoding="utf-8") if storyboard_path.exists() else ""
+        shots = parse_storyboard(text)
+        if len(shots) != len(sources):
+            click.echo(f"错误: 分镜有 {len(shots)} 个镜头，但有 {len(sources)} 个视频", err=True)
+            return
+        ranges = [(start, start + shot.end - shot.start) for shot in shots]
+    else:
+        stop = start + duration if duration is not None else end
+        ranges = [(start, stop)] * len(sources)
+
+    infos = probe_inputs([str(s) for s in sources], ProbeService.for_project(project_path))
+    failed = [str(s) for s, info in zip(sources, infos) if info is None]
+    if failed:
+        click.echo(f"错误: 无法探测: {', '.join(failed)}", err=True)
+        return
+
+    items = []
+    for source, info, (clip_start, clip_end) in zip(sources, infos, ranges):
+        target_dir = Path(output_dir) if output_dir else source.parent / "trimmed"
+        items.append((info, clip_start, clip_end, target_dir / source.name))
+
+    try:
+        plans = [plan_trim(info, clip_start, clip_end) for info, clip_start, clip_end, _ in items]
+    except ValueError as e:
+        click.echo(f"错误: {e}", err=True)
+        return
+    copied = sum(plan.copied for plan in plans)
+    reencoded = sum(plan.reencoded for plan in plans)
+    click.echo(f"截取 {len(items)} 个视频：流复制 {copied:.1f} 秒，重新编码 {reencoded:.1f} 秒")
+
+    config = Config(project_path) if project_path is not None else None
+    cpu_budget = int(config.get("ffmpeg.cpu_budget", 0) or 0) if config else None
+    timeout = (float(config.get("ffmpeg.timeout", 0) or 0) or None) if config else None
+    try:
+        smart_trim_many(items, jobs=jobs, cpu_budget=cpu_budget or None, timeout=timeout)
+    except JobFailedError as e:
+        click.echo(f"截取失败: {e.stderr}", err=True)
+        return
+    except FFmpegError as e:
+        click.echo(f"FFmpeg 错误: {e}", err=True)
+        return
+
+    for _, _, _, output_path in items:
+        click.echo(f"  {output_path}")
@@ -15,6 +15,10 @@ from videoclaw.cli.commands.t2i import t2i
 from videoclaw.cli.commands.i2i import i2i
 from videoclaw.cli.commands.upload import upload
 from videoclaw.cli.commands.publish import publish
+from videoclaw.cli.commands.cache import cache
+from videoclaw.cli.commands.thumbs import thumbs
+from videoclaw.cli.commands.timeline import timeline
+from videoclaw.cli.commands.trim import trim
 
 
 DEFAULT_PROJECTS_DIR = Path.home() / "videoclaw-projects"
@@ -37,6 +41,10 @@ main.add_command(t2i)
 main.add_command(i2i)
 main.add_command(upload)
 main.add_command(publish)
+main.add_command(cache)
+main.add_command(thumbs)
+main.add_command(timeline)
+main.add_command(trim)
 
 
 @main.command()
@@ -0,0 +1,71 @@
+"""命令行进度显示"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import click
+
+from videoclaw.ffmpeg.runner import Progress
+
+
+class ProgressReporter:
+    """汇总一个或多个 ffmpeg 任务的进度并在同一行刷新显示"""
+
+    def __init__(self, label: str, durations: Sequence[float] = (), interval: float = 0.5):
+        self.label = label
+        self.durations = list(durations)
+        self.interval = interval
+        self._done: Dict[int, float] = {}
+        self._latest: Dict[int, Progress] = {}
+        self._lock = threading.Lock()
+        self._last_print = 0.0
+        self._printed = False
+
+    def __call__(self, index_or_progress, progress: Optional[Progress] = None) -> None:
+        """可作为单任务回调 (progress) 或并行任务回调 (index, progress)"""
+        if progress is None:
+            index, progress = 0, index_or_progress
+        else:
+            index = index_or_progress
+        with self._lock:
+            self._done[index] = progress.out_time
+            self._latest[index] = progress
+            now = time.monotonic()
+            if now - self._last_print < self.interval and not progress.finished:
+                return
+            self._last_print = now
+            click.echo("\r" + self._format(), nl=False)
+            self._printed = True
+
+    def _format(self) -> str:
+        total = sum(self.durations)
+        done = sum(self._done.values())
+        running = [p for p in self._latest.values() if not p.finished]
+        # 并行任务的总吞吐为各任务倍速之和
+        fps = sum(p.fps for p in running)
+        speed = sum(p.speed for p in running)
+        line = f"{self.label}: {done:.1f}s"
+        if total:
+            line += f"/{total:.1f}s ({min(100.0, done / total * 100):.0f}%)"
+        if fps:
+            line += f" {fps:.0f}fps"
+        if speed:
+            line += f" {speed:.2f}x"
+            if total:
+                line += f" ETA {max(0.0, (total - done) / speed):.0f}s"
+        return line
+
+    def close(self) -> None:
+        """结束进度行"""
+        if self._printed:
+            click.echo("")
+            self._printed = False
+
+    def __enter__(self) -> "ProgressReporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        # 在调用方处理异常、打印错误之前结束进度行
+        self.close()
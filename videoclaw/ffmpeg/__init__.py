@@ -1,4 +1,6 @@
 """FFmpeg 视频处理模块"""
+from videoclaw.ffmpeg.graph import FilterGraph
 from videoclaw.ffmpeg.processor import FFmpegProcessor
+from videoclaw.ffmpeg.probe import MediaInfo, ProbeService
 
-__all__ = ["FFmpegProcessor"]
+__all__ = ["FilterGraph", "FFmpegProcessor", "MediaInfo", "ProbeService"]
@@ -0,0 +1,248 @@
+"""分段并行编码：按 GOP 对齐切分时间线，多进程编码后流复制拼接"""
+from __future__ import annotations
+
+import math
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from fractions import Fraction
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from videoclaw.ffmpeg.concat import concat_list_entry
+from videoclaw.ffmpeg.graph import FilterGraph
+from videoclaw.ffmpeg.loudness import LoudnessPlan
+from videoclaw.ffmpeg.merge import (
+    DEFAULT_BGM_VOLUME,
+    Dialogue,
+    MergeTarget,
+    clip_normalizer,
+    mix_soundtrack,
+    normalize_video,
+    segment_audio,
+)
+from videoclaw.ffmpeg.parallel import resolve_jobs, run_parallel, threads_per_job
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.ffmpeg.runner import Progress, run_ffmpeg
+
+# 每个分段的目标时长（秒），实际长度会向上取整到整数个 GOP
+DEFAULT_CHUNK_SECONDS = 10
+
+# 关键帧间隔（秒）
+GOP_SECONDS = 2
+
+# 所有分段使用相同的时间基，保证拼接后时间戳连续
+VIDEO_TIMESCALE = 90000
+
+
+@dataclass
+class Chunk:
+    """时间线上的一个分段"""
+    index: int
+    start_frame: int
+    frames: int
+    # (片段索引, 片段内起始帧, 帧数)
+    segments: List[Tuple[int, int, int]] = field(default_factory=list)
+
+
+def frame_rate(target: MergeTarget) -> Fraction:
+    """目标帧率（支持 24、30000/1001 等写法）"""
+    return Fraction(str(target.fps))
+
+
+def clip_frames(infos: Sequence[MediaInfo], fps: Fraction) -> List[int]:
+    """每个片段在时间线上占用的帧数"""
+    return [max(1, round(info.duration * fps)) for info in infos]
+
+
+def gop_frames(fps: Fraction) -> int:
+    return max(1, round(fps * GOP_SECONDS))
+
+
+def plan_chunks(
+    infos: Sequence[MediaInfo],
+    target: MergeTarget,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+) -> List[Chunk]:
+    """把拼接后的时间线切成若干 GOP 对齐的分段
+
+    分段长度是 GOP 的整数倍，每个分段都从关键帧开始，
+    因此与单进程编码的关键帧位置一致，拼接处不需要重新编码。
+    """
+    fps = frame_rate(target)
+    gop = gop_frames(fps)
+    chunk_len = max(1, math.ceil(Fraction(chunk_seconds) * fps / gop)) * gop
+
+    # 每个片段在时间线上的起止帧
+    spans = []
+    position = 0
+    for frames in clip_frames(infos, fps):
+        spans.append((position, position + frames))
+        position += frames
+    total = position
+
+    chunks = []
+    for start in range(0, total, chunk_len):
+        end = min(start + chunk_len, total)
+        chunk = Chunk(index=len(chunks), start_frame=start, frames=end - start)
+        for i, (clip_start, clip_end) in enumerate(spans):
+            lo, hi = max(start, clip_start), min(end, clip_end)
+            if lo < hi:
+                chunk.segments.append((i, lo - clip_start, hi - lo))
+        chunks.append(chunk)
+    return chunks
+
+
+def video_encode_args(target: MergeTarget, threads: int = 0) -> List[str]:
+    """所有分段共用的视频编码参数，保证码流参数一致可以直接拼接"""
+    gop = gop_frames(frame_rate(target))
+    args = [
+        "-r", str(target.fps),
+        "-c:v", "libx264", "-preset", "fast", "-crf", "23",
+        "-pix_fmt", "yuv420p", "-profile:v", "high",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-video_track_timescale", str(VIDEO_TIMESCALE),
+    ]
+    if threads:
+        args += ["-threads", str(threads)]
+    return args
+
+
+def build_chunk_command(
+    chunk: Chunk,
+    infos: Sequence[MediaInfo],
+    target: MergeTarget,
+    output_path: Path,
+    threads: int = 0,
+    ffmpeg_path: str = "ffmpeg",
+) -> List[str]:
+    """编码一个分段的视频（不含音频）
+
+    每个参与的片段从分段内的起始帧精确 seek，归一化后按帧数截取，
+    不足的部分复制最后一帧补齐，保证分段帧数精确。
+    """
+    fps = frame_rate(target)
+    graph = FilterGraph()
+    segments = []
+    for clip, start, frames in chunk.segments:
+        args = ["-ss", f"{float(start / fps):.6f}"] if start else []
+        source = graph.input(infos[clip].path, args=args)
+        video = (
+            normalize_video(source.video, target)
+            .filter("tpad", stop=-1, stop_mode="clone")
+            .trim(end_frame=frames)
+            .reset_pts()
+        )
+        segments.append([video])
+    video = graph.concat(segments)[0].label("vout")
+    graph.output(output_path, video, args=["-an"] + video_encode_args(target, threads))
+    return graph.compile(ffmpeg_path)
+
+
+def build_audio_command(
+    infos: Sequence[MediaInfo],
+    target: MergeTarget,
+    output_path: Path,
+    bgm_file: Optional[str] = None,
+    bgm_volume: float = DEFAULT_BGM_VOLUME,
+    ffmpeg_path: str = "ffmpeg",
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> List[str]:
+    """一次性编码整条时间线的音轨（音频编码很快，不需要分段）
+
+    每个片段的音轨按其在时间线上的帧数对齐，保证与分段视频等长。
+    """
+    fps = frame_rate(target)
+    graph = FilterGraph()
+    clips = [graph.input(info.path) for info in infos]
+    frames = clip_frames(infos, fps)
+    segments = [
+        [segment_audio(clip, info, target, float(count / fps), clip_normalizer(loudness, i))]
+        for i, (clip, info, count) in enumerate(zip(clips, infos, frames))
+    ]
+    audio = graph.concat(segments)[0].label("aout")
+    audio = mix_soundtrack(
+        graph, audio, target, float(sum(frames) / fps), bgm_file, bgm_volume, dialogues, duck, loudness
+    )
+    graph.output(output_path, audio, args=["-vn", "-c:a", "aac", "-b:a", "128k"])
+    return graph.compile(ffmpeg_path)
+
+
+def build_join_command(
+    list_file: Path,
+    audio_path: Path,
+    output_path: Path,
+    ffmpeg_path: str = "ffmpeg",
+) -> List[str]:
+    """流复制拼接所有视频分段并封装音轨"""
+    return [
+        ffmpeg_path, "-y",
+        "-f", "concat", "-safe", "0", "-i", str(list_file),
+        "-i", str(audio_path),
+        "-map", "0:v", "-map", "1:a", "-c", "copy",
+        "-movflags", "+faststart",
+        str(output_path),
+    ]
+
+
+def chunked_encode(
+    infos: Sequence[MediaInfo],
+    output_path: Path,
+    target: Optional[MergeTarget] = None,
+    bgm_file: Optional[str] = None,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[int, Progress], None]] = None,
+    temp_root: Optional[Path] = None,
+    ffmpeg_path: str = "ffmpeg",
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> List[Chunk]:
+    """分段并行编码整条时间线
+
+    视频分段和整段音轨在同一个进程池中编码，最后用 concat 分离器流复制拼接。
+    on_progress(index, progress) 的 index 0 为音轨，之后依次为各视频分段。
+    loudness 给出时整段音轨在编码时完成响度归一化，dialogues 为按时间点混入的配音。
+    任一任务失败时抛出 JobFailedError。返回实际使用的分段。
+    """
+    target = target or MergeTarget.from_infos(infos)
+    chunks = plan_chunks(infos, target, chunk_seconds)
+    fps = frame_rate(target)
+
+    temp_dir = Path(tempfile.mkdtemp(prefix="videoclaw-chunks-", dir=temp_root))
+    try:
+        audio_path = temp_dir / "audio.m4a"
+        chunk_paths = [temp_dir / f"chunk_{chunk.index:04d}.mp4" for chunk in chunks]
+
+        workers = resolve_jobs(jobs, len(chunks) + 1, cpu_budget)
+        threads = threads_per_job(workers, cpu_budget)
+        commands = [
+            build_audio_command(
+                infos, target, audio_path, bgm_file, ffmpeg_path=ffmpeg_path,
+                loudness=loudness, dialogues=dialogues, duck=duck,
+            )
+        ]
+        commands += [
+            build_chunk_command(chunk, infos, target, path, threads, ffmpeg_path)
+            for chunk, path in zip(chunks, chunk_paths)
+        ]
+        durations = [float(sum(clip_frames(infos, fps)) / fps)]
+        durations += [float(chunk.frames / fps) for chunk in chunks]
+        labels = ["音轨"] + [f"分段 {chunk.index + 1}" for chunk in chunks]
+
+        run_parallel(
+            commands, workers, labels=labels, budget=cpu_budget,
+            on_progress=on_progress, durations=durations, timeout=timeout,
+        )
+
+        list_file = temp_dir / "concat_list.txt"
+        list_file.write_text("".join(concat_list_entry(path) for path in chunk_paths))
+        run_ffmpeg(build_join_command(list_file, audio_path, output_path, ffmpeg_path), timeout=timeout)
+        return chunks
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,116 @@
+"""concat 流复制合并规划"""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from videoclaw.ffmpeg.probe import MediaInfo
+
+# 可以重新编码以匹配参考片段的编码器
+VIDEO_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+AUDIO_ENCODERS = {"aac": "aac", "mp3": "libmp3lame"}
+
+
+@dataclass
+class CopyPlan:
+    """流复制合并计划"""
+    reference: MediaInfo
+    mismatched: List[int] = field(default_factory=list)
+
+    @property
+    def all_compatible(self) -> bool:
+        return not self.mismatched
+
+
+def concat_list_entry(path) -> str:
+    """concat 分离器列表文件中的一行，转义路径中的单引号"""
+    escaped = str(path).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def plan_copy_concat(infos: Sequence[Optional[MediaInfo]]) -> Optional[CopyPlan]:
+    """规划 concat -c copy 合并
+
+    以最常见的流参数作为参考，返回需要重新编码的片段索引。
+    无法用流复制时（探测失败、没有视频流或参考编码无法复现）返回 None。
+    """
+    if not infos or any(info is None or not info.has_video for info in infos):
+        return None
+
+    counts = Counter(info.stream_signature() for info in infos)
+    best = max(counts.values())
+    # 票数相同时取最靠前的片段
+    reference = next(info for info in infos if counts[info.stream_signature()] == best)
+    signature = reference.stream_signature()
+    mismatched = [i for i, info in enumerate(infos) if info.stream_signature() != signature]
+
+    if mismatched and not can_match(reference):
+        return None
+    return CopyPlan(reference=reference, mismatched=mismatched)
+
+
+def can_match(reference: MediaInfo) -> bool:
+    """参考片段的编码参数是否可以被重新编码复现"""
+    if reference.video_codec not in VIDEO_ENCODERS or not reference.fps:
+        return False
+    if reference.has_audio and reference.audio_codec not in AUDIO_ENCODERS:
+        return False
+    return True
+
+
+def match_encode_args(reference: MediaInfo, source: MediaInfo, threads: int = 0) -> List[str]:
+    """生成将 source 重新编码为与 reference 流参数一致的 ffmpeg 参数
+
+    返回的参数位于输入之后、输出路径之前；当 source 没有音频而 reference 有时，
+    调用方需要额外提供一个 anullsrc 输入作为第 1 路输入。
+    """
+    w, h = reference.width, reference.height
+    sar = (reference.sample_aspect_ratio or "1:1").replace(":", "/")
+    args = [
+        "-map", "0:v:0",
+        "-vf", (
+            f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar={sar},fps={reference.fps}"
+        ),
+        "-c:v", VIDEO_ENCODERS[reference.video_codec],
+        "-preset", "fast", "-crf", "23",
+    ]
+    if reference.pix_fmt:
+        args += ["-pix_fmt", reference.pix_fmt]
+    if reference.profile and reference.video_codec == "h264":
+        args += ["-profile:v", _x264_profile(reference.profile)]
+    if reference.video_timescale:
+        args += ["-video_track_timescale", str(reference.video_timescale)]
+
+    if reference.has_audio:
+        args += ["-map", "0:a:0" if source.has_audio else "1:a:0"]
+        args += ["-c:a", AUDIO_ENCODERS[reference.audio_codec], "-b:a", "128k"]
+        if reference.sample_rate:
+            args += ["-ar", str(reference.sample_rate)]
+        if reference.channels:
+            args += ["-ac", str(reference.channels)]
+        if not source.has_audio:
+            args += ["-shortest"]
+    else:
+        args += ["-an"]
+
+    if threads:
+        args += ["-threads", str(threads)]
+    return args
+
+
+def _x264_profile(profile: str) -> str:
+    """ffprobe 的 profile 名称转换为 x264 的 -profile:v 取值"""
+    name = profile.lower()
+    if "4:4:4" in name:
+        return "high444"
+    if "4:2:2" in name:
+        return "high422"
+    if "high 10" in name:
+        return "high10"
+    if "high" in name:
+        return "high"
+    if "main" in name:
+        return "main"
+    return "baseline"
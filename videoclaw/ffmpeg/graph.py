@@ -0,0 +1,372 @@
+"""可组合的 filter_complex 构建器：多个编辑操作编译为一次 ffmpeg 调用"""
+from __future__ import annotations
+
+import shlex
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Tuple
+
+# 流类型：视频 / 音频
+VIDEO = "v"
+AUDIO = "a"
+
+# 同一路滤镜输出被多处使用时自动插入的复制滤镜
+_SPLIT_FILTERS = {VIDEO: "split", AUDIO: "asplit"}
+
+
+class GraphError(ValueError):
+    """滤镜图结构错误"""
+
+
+def escape_value(value: Any) -> str:
+    """转义滤镜参数值
+
+    ffmpeg 对 filter_complex 做两层解析：先按图语法拆分（, ; [ ] 有特殊含义），
+    再按选项语法拆分（: 分隔选项），因此需要依次做两层反斜杠转义。
+    """
+    if isinstance(value, bool):
+        text = "1" if value else "0"
+    else:
+        text = str(value)
+    for char in ("\\", "'", ":"):
+        text = text.replace(char, "\\" + char)
+    for char in ("\\", "'", ",", ";", "[", "]"):
+        text = text.replace(char, "\\" + char)
+    return text
+
+
+class Stream:
+    """滤镜图中的一路流：某个输入文件的流，或某个滤镜的输出"""
+
+    def __init__(self, graph: "FilterGraph", kind: str, spec: Optional[str] = None, label: Optional[str] = None):
+        self.graph = graph
+        self.kind = kind
+        self.spec = spec  # 输入流说明符，如 0:v:0；滤镜输出为 None
+        self.name = label  # 指定的输出标签，未指定时编译时自动分配
+        self.node: Optional[_Node] = None
+
+    @property
+    def is_input(self) -> bool:
+        return self.spec is not None
+
+    def label(self, name: str) -> "Stream":
+        """为滤镜输出指定标签（便于阅读编译结果）"""
+        if self.is_input:
+            raise GraphError("输入流不能重新命名")
+        self.name = name
+        return self
+
+    def filter(self, name: str, /, *args: Any, **options: Any) -> "Stream":
+        """追加一个单输入、单输出、类型不变的滤镜"""
+        return self.graph.filter(name, [self], *args, kinds=self.kind, **options)[0]
+
+    def split(self, count: int, labels: Optional[Sequence[str]] = None) -> List["Stream"]:
+        """显式复制为 count 路"""
+        outputs = self.graph.filter(_SPLIT_FILTERS[self.kind], [self], count, kinds=self.kind * count)
+        for stream, label in zip(outputs, labels or ()):
+            stream.label(label)
+        return outputs
+
+    # 常用操作
+    def scale(self, width: Any, height: Any, **options: Any) -> "Stream":
+        return self.filter("scale", width, height, **options)
+
+    def pad(self, width: Any, height: Any, x: Any = "(ow-iw)/2", y: Any = "(oh-ih)/2", **options: Any) -> "Stream":
+        return self.filter("pad", width, height, x, y, **options)
+
+    def crop(self, width: Any, height: Any, **options: Any) -> "Stream":
+        return self.filter("crop", width, height, **options)
+
+    def fps(self, rate: Any) -> "Stream":
+        return self.filter("fps", rate)
+
+    def setsar(self, ratio: Any = 1) -> "Stream":
+        return self.filter("setsar", ratio)
+
+    def format(self, pix_fmt: str) -> "Stream":
+        return self.filter("format", pix_fmt)
+
+    def fade(self, direction: str, start: float, duration: float) -> "Stream":
+        name = "fade" if self.kind == VIDEO else "afade"
+        return self.filter(name, t=direction, st=start, d=duration)
+
+    def trim(self, **options: Any) -> "Stream":
+        return self.filter("trim" if self.kind == VIDEO else "atrim", **options)
+
+    def reset_pts(self) -> "Stream":
+        return self.filter("setpts" if self.kind == VIDEO else "asetpts", "PTS-STARTPTS")
+
+    def volume(self, level: Any) -> "Stream":
+        return self.filter("volume", level)
+
+    def subtitles(self, path: str, **options: Any) -> "Stream":
+        """烧录字幕"""
+        return self.filter("subtitles", filename=path, **options)
+
+    def loudnorm(self, **options: Any) -> "Stream":
+        return self.filter("loudnorm", **options)
+
+    def __repr__(self) -> str:
+        return f"Stream({self.spec or self.name or 'filter'}, {self.kind})"
+
+
+@dataclass
+class _Node:
+    """一个滤镜实例"""
+    name: str
+    args: Tuple[Any, ...]
+    options: Dict[str, Any]
+    inputs: List[Stream]
+    outputs: List[Stream] = field(default_factory=list)
+
+    def render(self) -> str:
+        params = [escape_value(arg) for arg in self.args]
+        params += [f"{key}={escape_value(value)}" for key, value in self.options.items()]
+        return f"{self.name}={':'.join(params)}" if params else self.name
+
+
+class Input:
+    """一个输入文件（或 lavfi 等输入设备）"""
+
+    def __init__(self, graph: "FilterGraph", index: int, path: str, args: Sequence[str]):
+        self.graph = graph
+        self.index = index
+        self.path = path
+        self.args = list(args)
+
+    def stream(self, kind: str, index: int = 0) -> Stream:
+        return Stream(self.graph, kind, spec=f"{self.index}:{kind}:{index}")
+
+    @property
+    def video(self) -> Stream:
+        return self.stream(VIDEO)
+
+    @property
+    def audio(self) -> Stream:
+        return self.stream(AUDIO)
+
+
+@dataclass
+class Output:
+    """一个输出文件及其映射的流和编码参数"""
+    path: str
+    streams: List[Stream]
+    args: List[str]
+
+
+class FilterGraph:
+    """滤镜图构建器
+
+    用法：
+
+        graph = FilterGraph()
+        clip = graph.input("in.mp4")
+        video = clip.video.scale(1280, 720).fade("in", 0, 0.5)
+        graph.output("out.mp4", video, clip.audio, args=["-c:v", "libx264", "-c:a", "copy"])
+        cmd = graph.compile()
+
+    编译时相邻的单输入单输出滤镜合并为一条链（逗号连接），
+    同一路滤镜输出被多处使用时自动插入 split / asplit。
+    """
+
+    def __init__(self, global_args: Sequence[str] = ()):
+        self.global_args = list(global_args)
+        self.inputs: List[Input] = []
+        self.nodes: List[_Node] = []
+        self.outputs: List[Output] = []
+
+    def input(self, path: str, args: Sequence[str] = ()) -> Input:
+        """添加输入，args 为放在 -i 之前的输入选项（如 -ss、-stream_loop）"""
+        item = Input(self, len(self.inputs), str(path), args)
+        self.inputs.append(item)
+        return item
+
+    def filter(
+        self,
+        name: str,
+        inputs: Sequence[Stream],
+        /,
+        *args: Any,
+        kinds: str = VIDEO,
+        **options: Any,
+    ) -> List[Stream]:
+        """添加任意滤镜，kinds 为输出流类型序列，如 "va" 表示一路视频一路音频
+
+        位置参数按顺序写出，关键字参数写成 key=value，值会自动转义。
+        """
+        for stream in inputs:
+            if stream.graph is not self:
+                raise GraphError("不能混用不同滤镜图中的流")
+        node = _Node(name, args, options, list(inputs))
+        for kind in kinds:
+            stream = Stream(self, kind)
+            stream.node = node
+            node.outputs.append(stream)
+        self.nodes.append(node)
+        return node.outputs
+
+    def source(self, name: str, /, *args: Any, kind: str = VIDEO, **options: Any) -> Stream:
+        """没有输入的源滤镜，如 anullsrc、color"""
+        return self.filter(name, [], *args, kinds=kind, **options)[0]
+
+    def concat(self, segments: Sequence[Sequence[Stream]]) -> List[Stream]:
+        """按顺序拼接若干段，每段的流类型需一致（如 [视频, 音频]）"""
+        if not segments:
+            raise GraphError("concat 至少需要一段")
+        kinds = [s.kind for s in segments[0]]
+        for segment in segments:
+            if [s.kind for s in segment] != kinds:
+                raise GraphError("concat 的每一段流类型必须一致")
+        inputs = [stream for segment in segments for stream in segment]
+        return self.filter(
+            "concat", inputs, kinds="".join(kinds),
+            n=len(segments), v=kinds.count(VIDEO), a=kinds.count(AUDIO),
+        )
+
+    def output(self, path: Any, *streams: Stream, args: Sequence[str] = ()) -> Output:
+        """添加输出，args 为编码等输出选项"""
+        item = Output(str(path), list(streams), list(args))
+        self.outputs.append(item)
+        return item
+
+    # 编译
+
+    def _consumers(self) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for node in self.nodes:
+            for stream in node.inputs:
+                counts[id(stream)] = counts.get(id(stream), 0) + 1
+        for output in self.outputs:
+            for stream in output.streams:
+                counts[id(stream)] = counts.get(id(stream), 0) + 1
+        return counts
+
+    def _insert_splits(self) -> Tuple[List[_Node], Dict[Tuple[int, int], Stream]]:
+        """为被多处使用的滤镜输出插入 split，返回 (节点列表, {(使用者, 序号): 替换流})"""
+        nodes = list(self.nodes)
+        replacements: Dict[Tuple[int, int], Stream] = {}
+        counts = self._consumers()
+        pending: Dict[int, List[Stream]] = {}
+        for node in self.nodes:
+            for stream in node.outputs:
+                uses = counts.get(id(stream), 0)
+                if uses > 1:
+                    split = _Node(_SPLIT_FILTERS[stream.kind], (uses,), {}, [stream])
+                    for _ in range(uses):
+                        copy = Stream(self, stream.kind)
+                        copy.node = split
+                        split.outputs.append(copy)
+                    nodes.insert(nodes.index(node) + 1, split)
+                    pending[id(stream)] = list(split.outputs)
+
+        consumers: List[Tuple[int, List[Stream]]] = [(id(n), n.inputs) for n in self.nodes]
+        consumers += [(id(o), o.streams) for o in self.outputs]
+        for owner, streams in consumers:
+            for i, stream in enumerate(streams):
+                copies = pending.get(id(stream))
+                if copies:
+                    replacements[(owner, i)] = copies.pop(0)
+        return nodes, replacements
+
+    def compile_filter(self) -> str:
+        """编译为 -filter_complex 参数，没有滤镜时返回空字符串"""
+        return self._compile()[0]
+
+    def _compile(self) -> Tuple[str, Dict[int, str]]:
+        for output in self.outputs:
+            for stream in output.streams:
+                if stream.graph is not self:
+                    raise GraphError("不能混用不同滤镜图中的流")
+
+        nodes, replacements = self._insert_splits()
+
+        def resolve(owner: object, index: int, stream: Stream) -> Stream:
+            return replacements.get((id(owner), index), stream)
+
+        # 每路滤镜输出的使用者
+        users: Dict[int, List[_Node]] = {}
+        mapped = set()
+        for node in nodes:
+            for i, stream in enumerate(node.inputs):
+                users.setdefault(id(resolve(node, i, stream)), []).append(node)
+        for output in self.outputs:
+            for i, stream in enumerate(output.streams):
+                mapped.add(id(resolve(output, i, stream)))
+
+        for node in nodes:
+            for stream in node.outputs:
+                if id(stream) not in mapped and id(stream) not in users:
+                    raise GraphError(f"滤镜 {node.name} 的输出没有被使用")
+
+        # 可以并入上一条链：唯一输入来自只有一个输出、未命名且只被本节点使用的滤镜
+        def joins_previous(node: _Node) -> bool:
+            if len(node.inputs) != 1:
+                return False
+            source = resolve(node, 0, node.inputs[0])
+            if source.is_input or source.node is None or source.name or len(source.node.outputs) != 1:
+                return False
+            return id(source) not in mapped and len(users[id(source)]) == 1
+
+        chains: List[List[_Node]] = []
+        chain_of: Dict[int, List[_Node]] = {}
+        for node in nodes:
+            if joins_previous(node):
+                chain = chain_of[id(resolve(node, 0, node.inputs[0]).node)]
+                chain.append(node)
+            else:
+                chain = [node]
+                chains.append(chain)
+            chain_of[id(node)] = chain
+
+        # 只有链尾的输出需要标签；保留显式指定的名称，其余按类型编号
+        taken = {s.name for n in nodes for s in n.outputs if s.name}
+        labels: Dict[int, str] = {}
+        counters = {VIDEO: 0, AUDIO: 0}
+        for chain in chains:
+            for stream in chain[-1].outputs:
+                if stream.name:
+                    labels[id(stream)] = stream.name
+                    continue
+                while f"{stream.kind}{counters[stream.kind]}" in taken:
+                    counters[stream.kind] += 1
+                labels[id(stream)] = f"{stream.kind}{counters[stream.kind]}"
+                counters[stream.kind] += 1
+
+        def pad_label(stream: Stream) -> str:
+            return f"[{stream.spec}]" if stream.is_input else f"[{labels[id(stream)]}]"
+
+        statements = []
+        for chain in chains:
+            head, tail = chain[0], chain[-1]
+            ins = "".join(pad_label(resolve(head, i, s)) for i, s in enumerate(head.inputs))
+            outs = "".join(pad_label(s) for s in tail.outputs)
+            statements.append(ins + ",".join(node.render() for node in chain) + outs)
+
+        maps = {}
+        for output in self.outputs:
+            for i, stream in enumerate(output.streams):
+                resolved = resolve(output, i, stream)
+                maps[(id(output), i)] = resolved.spec if resolved.is_input else pad_label(resolved)
+        return ";".join(statements), maps
+
+    def compile(self, ffmpeg_path: str = "ffmpeg", overwrite: bool = True) -> List[str]:
+        """编译为完整的 ffmpeg 命令"""
+        if not self.outputs:
+            raise GraphError("滤镜图没有输出")
+        graph, maps = self._compile()
+        cmd = [ffmpeg_path] + (["-y"] if overwrite else []) + self.global_args
+        for item in self.inputs:
+            cmd += item.args + ["-i", item.path]
+        if graph:
+            cmd += ["-filter_complex", graph]
+        for output in self.outputs:
+            for i in range(len(output.streams)):
+                cmd += ["-map", maps[(id(output), i)]]
+            cmd += output.args + [output.path]
+        return cmd
+
+    def dry_run(self, ffmpeg_path: str = "ffmpeg", file: Optional[TextIO] = None) -> str:
+        """打印并返回编译后的命令（可直接粘贴到 shell），不执行"""
+        command = shlex.join(self.compile(ffmpeg_path))
+        print(command, file=file or sys.stdout)
+        return command
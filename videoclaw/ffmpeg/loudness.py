@@ -0,0 +1,252 @@
+"""EBU R128 响度归一化：首遍测量按内容缓存，第二遍线性 loudnorm 并入最终编码的滤镜图"""
+from __future__ import annotations
+
+import json
+import re
+import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Callable, List, Optional, Sequence
+
+from videoclaw.cache import ContentCache, file_digest
+from videoclaw.ffmpeg.graph import Stream
+from videoclaw.ffmpeg.parallel import resolve_jobs
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.runner import FFmpegRunError, Progress, run_ffmpeg
+from videoclaw.project.files import read_json, write_json
+
+# 短视频平台常用的目标响度（LUFS），EBU R128 广播标准为 -23
+DEFAULT_INTEGRATED = -16.0
+DEFAULT_TRUE_PEAK = -1.5
+DEFAULT_LRA = 11.0
+
+# 低于该响度视为静音，不做归一化（避免把底噪放大）
+SILENCE_THRESHOLD = -70.0
+
+# 缓存格式变化时递增，使旧条目失效
+MEASUREMENT_VERSION = "1"
+
+# 测量时保留的 stderr 行数，足够容纳末尾的 JSON 测量结果
+MEASURE_TAIL_LINES = 40
+
+# loudnorm 在 stderr 末尾输出的 JSON 测量结果
+_JSON_PATTERN = re.compile(r"\{[^{}]*\"input_i\"[^{}]*\}", re.S)
+
+
+@dataclass
+class LoudnessTarget:
+    """归一化目标：综合响度 (LUFS)、真峰值 (dBTP) 和响度范围 (LU)"""
+    integrated: float = DEFAULT_INTEGRATED
+    true_peak: float = DEFAULT_TRUE_PEAK
+    lra: float = DEFAULT_LRA
+
+    def options(self) -> dict:
+        return {"I": self.integrated, "TP": self.true_peak, "LRA": self.lra}
+
+
+@dataclass
+class Measurement:
+    """loudnorm 首遍测量结果（与目标无关，只取决于音频内容）"""
+    input_i: float
+    input_tp: float
+    input_lra: float
+    input_thresh: float
+
+    @property
+    def silent(self) -> bool:
+        return self.input_i <= SILENCE_THRESHOLD
+
+    @classmethod
+    def from_output(cls, stderr: str) -> "Measurement":
+        """从 loudnorm=print_format=json 的输出中解析测量值"""
+        matches = _JSON_PATTERN.findall(stderr)
+        if not matches:
+            raise ValueError("ffmpeg 输出中没有 loudnorm 测量结果")
+        data = json.loads(matches[-1])
+        # 静音时测量值为 -inf
+        values = {k: float(data[k]) for k in ("input_i", "input_tp", "input_lra", "input_thresh")}
+        return cls(**values)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Measurement":
+        return cls(**{k: float(data[k]) for k in ("input_i", "input_tp", "input_lra", "input_thresh")})
+
+
+def build_measure_command(path: str, target: LoudnessTarget, ffmpeg_path: str = "ffmpeg") -> List[str]:
+    """首遍测量命令：只解码第一条音轨，不写输出
+
+    与合并时一样先转为立体声再测量（单声道复制到两个声道后响度会升高约 3 LU）。
+    """
+    options = ":".join(f"{k}={v}" for k, v in target.options().items())
+    return [
+        ffmpeg_path, "-hide_banner", "-nostats", "-i", path, "-map", "0:a:0",
+        "-af", f"aformat=channel_layouts=stereo,loudnorm={options}:print_format=json",
+        "-f", "null", "-",
+    ]
+
+
+def measure(
+    path: str,
+    target: Optional[LoudnessTarget] = None,
+    timeout: Optional[float] = None,
+    ffmpeg_path: str = "ffmpeg",
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    duration: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Measurement:
+    """测量单个文件第一条音轨的响度（经 run_ffmpeg 执行，只保留 stderr 末尾用于解析）"""
+    cmd = build_measure_command(path, target or LoudnessTarget(), ffmpeg_path)
+    try:
+        stderr = run_ffmpeg(
+            cmd, on_progress=on_progress, duration=duration, timeout=timeout,
+            cancel_event=cancel_event, stderr_lines=MEASURE_TAIL_LINES,
+        )
+    except FFmpegRunError as e:
+        raise ValueError(f"响度测量失败: {path}: {e.stderr[-500:]}") from e
+    return Measurement.from_output(stderr)
+
+
+def _measurement_key(path: str) -> str:
+    return ContentCache.make_key(file_digest(path), "loudnorm", "stereo", MEASUREMENT_VERSION)
+
+
+def cached_measurement(path: str, cache: Optional[ContentCache]) -> Optional[Measurement]:
+    """只查缓存，不解码；没有缓存时返回 None"""
+    if cache is None:
+        return None
+    hit = cache.get(_measurement_key(path), ".json")
+    data = read_json(hit) if hit is not None else None
+    if isinstance(data, dict):
+        try:
+            return Measurement.from_dict(data)
+        except (KeyError, TypeError, ValueError):
+            pass
+    return None
+
+
+def measure_cached(
+    path: str,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+    ffmpeg_path: str = "ffmpeg",
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    duration: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Measurement:
+    """测量响度，以文件内容摘要为键缓存结果（文件改名或移动后仍然命中）"""
+    hit = cached_measurement(path, cache)
+    if hit is not None:
+        return hit
+    result = measure(
+        path, timeout=timeout, ffmpeg_path=ffmpeg_path,
+        on_progress=on_progress, duration=duration, cancel_event=cancel_event,
+    )
+    if cache is not None:
+        write_json(cache.path_for(_measurement_key(path), ".json"), asdict(result))
+    return result
+
+
+@dataclass
+class LoudnessPlan:
+    """一次合并的归一化计划：每个片段、背景音乐和配音的测量结果，None 表示不处理"""
+    target: LoudnessTarget = field(default_factory=LoudnessTarget)
+    clips: List[Optional[Measurement]] = field(default_factory=list)
+    bgm: Optional[Measurement] = None
+    dialogues: List[Optional[Measurement]] = field(default_factory=list)
+
+    def _normalizer(self, measurement: Optional[Measurement]) -> Optional[Callable[[Stream], Stream]]:
+        if measurement is None or measurement.silent:
+            return None
+        return lambda stream: apply_loudnorm(stream, measurement, self.target)
+
+    def for_clip(self, index: int) -> Optional[Callable[[Stream], Stream]]:
+        """第 index 个片段音轨的归一化函数，不需要处理时返回 None"""
+        return self._normalizer(self.clips[index] if index < len(self.clips) else None)
+
+    def for_bgm(self) -> Optional[Callable[[Stream], Stream]]:
+        return self._normalizer(self.bgm)
+
+    def for_dialogue(self, index: int) -> Optional[Callable[[Stream], Stream]]:
+        return self._normalizer(self.dialogues[index] if index < len(self.dialogues) else None)
+
+
+def apply_loudnorm(stream: Stream, measurement: Measurement, target: LoudnessTarget) -> Stream:
+    """第二遍：代入首遍测量值的线性 loudnorm，只是整体增益，不做动态压缩"""
+    return stream.loudnorm(
+        **target.options(),
+        measured_I=measurement.input_i,
+        measured_TP=measurement.input_tp,
+        measured_LRA=measurement.input_lra,
+        measured_thresh=measurement.input_thresh,
+        linear="true",
+        print_format="none",
+    )
+
+
+def plan_loudness(
+    infos: Sequence[Optional[MediaInfo]],
+    bgm_file: Optional[str] = None,
+    target: Optional[LoudnessTarget] = None,
+    cache: Optional[ContentCache] = None,
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    ffmpeg_path: str = "ffmpeg",
+    on_error: Optional[Callable[[str, Exception], None]] = None,
+    dialogue_files: Sequence[str] = (),
+    on_progress: Optional[Callable[[int, Progress], None]] = None,
+    dry_run: bool = False,
+) -> LoudnessPlan:
+    """并行测量所有有音轨的片段、背景音乐和配音，命中缓存的不再解码
+
+    测量失败的文件不做归一化，并通过 on_error(path, error) 通知调用方。
+    on_progress(index, progress) 的 index 依次对应片段、配音和背景音乐。
+    dry_run 为真时只使用缓存，打印未命中文件的测量命令，这些文件不做归一化。
+    """
+    paths = [info.path if info is not None and info.has_audio else None for info in infos]
+    paths += [str(path) for path in dialogue_files]
+    if bgm_file:
+        paths.append(bgm_file)
+    pending = [p for p in paths if p is not None]
+    durations = [info.duration if info is not None else None for info in infos]
+    cancelled = threading.Event()
+
+    def safe_measure(index: int) -> Optional[Measurement]:
+        path = paths[index]
+        if path is None or cancelled.is_set():
+            return None
+        if dry_run:
+            hit = cached_measurement(path, cache)
+            if hit is None:
+                print(shlex.join(build_measure_command(path, target or LoudnessTarget(), ffmpeg_path)))
+            return hit
+        callback = partial(on_progress, index) if on_progress is not None else None
+        try:
+            return measure_cached(
+                path, cache, timeout, ffmpeg_path, on_progress=callback,
+                duration=durations[index] if index < len(durations) else None, cancel_event=cancelled,
+            )
+        except (OSError, ValueError, FFmpegError) as e:
+            if on_error is not None and not cancelled.is_set():
+                on_error(path, e)
+            return None
+
+    workers = 1 if dry_run else resolve_jobs(jobs, max(1, len(pending)), cpu_budget)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            results = list(pool.map(safe_measure, range(len(paths))))
+        except BaseException:
+            # Ctrl+C 等中断时终止正在测量的 ffmpeg 进程
+            cancelled.set()
+            raise
+    plan = LoudnessPlan(
+        target=target or LoudnessTarget(),
+        clips=results[:len(infos)],
+        dialogues=results[len(infos):len(infos) + len(dialogue_files)],
+    )
+    if bgm_file:
+        plan.bgm = results[-1]
+    return plan
@@ -0,0 +1,444 @@
+"""单次编码的 filter_complex 合并（基于 FilterGraph 构建）"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from videoclaw.ffmpeg.graph import AUDIO, FilterGraph, Input, Stream
+from videoclaw.ffmpeg.loudness import LoudnessPlan
+from videoclaw.ffmpeg.probe import MediaInfo
+
+# 背景音乐默认音量（相对于片段原声）
+DEFAULT_BGM_VOLUME = 0.3
+
+# 配音出现时压低其余声音（闪避）：sidechaincompress 的阈值、压缩比、起效/释放时间（毫秒）
+DUCK_THRESHOLD = 0.03
+DUCK_RATIO = 8
+DUCK_ATTACK = 20
+DUCK_RELEASE = 400
+
+# 草稿模式输出的短边长度
+DRAFT_SHORT_EDGE = 360
+
+# 分片 MP4：编码过程中即可播放已写出的部分
+FRAGMENTED_MP4_FLAGS = "frag_keyframe+empty_moov+default_base_moof"
+
+
+@dataclass
+class MergeTarget:
+    """合并输出的统一参数"""
+    width: int = 1280
+    height: int = 720
+    fps: str = "24"
+    sample_rate: int = 44100
+
+    @classmethod
+    def from_infos(cls, infos: Sequence[Optional[MediaInfo]]) -> "MergeTarget":
+        """以第一个可探测片段的参数作为目标"""
+        target = cls()
+        video = next((i for i in infos if i is not None and i.width and i.height), None)
+        if video is not None:
+            target.width, target.height = video.width, video.height
+            if video.fps_value > 0:
+                target.fps = video.fps
+        audio = next((i for i in infos if i is not None and i.sample_rate), None)
+        if audio is not None:
+            target.sample_rate = audio.sample_rate
+        return target
+
+    def as_reference(self) -> MediaInfo:
+        """归一化片段的目标流参数（H.264 yuv420p + AAC 立体声）"""
+        return MediaInfo(
+            path="", width=self.width, height=self.height, fps=self.fps,
+            video_codec="h264", profile="High", pix_fmt="yuv420p",
+            sample_aspect_ratio="1:1", audio_codec="aac",
+            sample_rate=self.sample_rate, channels=2, channel_layout="stereo",
+        )
+
+
+@dataclass
+class Dialogue:
+    """一段配音，从成片的 start 秒开始播放"""
+    path: str
+    start: float = 0.0
+    volume: float = 1.0
+
+
+@dataclass
+class Variant:
+    """同一次编码输出的一个画幅版本"""
+    aspect: str
+    width: int
+    height: int
+    output_path: Path
+
+
+def parse_aspect(text: str) -> Tuple[int, int]:
+    """解析 9:16 这样的画幅比例"""
+    try:
+        w, h = (int(part) for part in text.strip().split(":"))
+    except ValueError as e:
+        raise ValueError(f"无效的画幅比例: {text}") from e
+    if w <= 0 or h <= 0:
+        raise ValueError(f"无效的画幅比例: {text}")
+    return w, h
+
+
+def plan_variants(aspects: Sequence[str], target: MergeTarget, output_path: Path) -> List[Variant]:
+    """按主输出的短边计算各画幅的尺寸和输出路径
+
+    尺寸与主输出相同的画幅直接使用主输出，不再额外编码。
+    """
+    short_edge = min(target.width, target.height)
+    variants = []
+    for aspect in aspects:
+        w, h = parse_aspect(aspect)
+        scale = short_edge / min(w, h)
+        # libx264 要求宽高为偶数
+        width, height = round(w * scale / 2) * 2, round(h * scale / 2) * 2
+        if (width, height) == (target.width, target.height):
+            path = output_path
+        else:
+            path = output_path.with_name(f"{output_path.stem}_{w}x{h}{output_path.suffix}")
+        variants.append(Variant(aspect=f"{w}:{h}", width=width, height=height, output_path=path))
+    return variants
+
+
+def fit(stream: Stream, width: int, height: int) -> Stream:
+    """等比缩放并补边到指定尺寸"""
+    return (
+        stream.scale(width, height, force_original_aspect_ratio="decrease")
+        .pad(width, height)
+        .setsar(1)
+    )
+
+
+def normalize_video(stream: Stream, target: MergeTarget, scale_flags: Optional[str] = None) -> Stream:
+    """缩放 + 补边 + 统一帧率和像素比"""
+    options = {"force_original_aspect_ratio": "decrease"}
+    if scale_flags:
+        options["flags"] = scale_flags
+    return (
+        stream.scale(target.width, target.height, **options)
+        .pad(target.width, target.height)
+        .fps(target.fps)
+        .setsar(1)
+        .format("yuv420p")
+    )
+
+
+def conform_audio(stream: Stream, target: MergeTarget) -> Stream:
+    """统一采样率、采样格式和声道布局"""
+    return (
+        stream.filter("aresample", target.sample_rate)
+        .filter("aformat", sample_fmts="fltp", channel_layouts="stereo")
+    )
+
+
+# 音轨归一化函数（如线性 loudnorm），作用在 conform_audio 之后
+Normalizer = Callable[[Stream], Stream]
+
+
+def conform_normalized(stream: Stream, target: MergeTarget, normalize: Optional[Normalizer] = None) -> Stream:
+    """统一音频参数，再做可选的响度归一化（loudnorm 会改变采样格式，之后重新统一）"""
+    stream = conform_audio(stream, target)
+    if normalize is None:
+        return stream
+    return conform_audio(normalize(stream), target)
+
+
+def segment_audio(
+    clip: Input,
+    info: MediaInfo,
+    target: MergeTarget,
+    duration: float,
+    normalize: Optional[Normalizer] = None,
+) -> Stream:
+    """片段音轨补齐或截断到 duration 秒，没有音轨时生成静音"""
+    length = f"{duration:.3f}"
+    if info.has_audio:
+        audio = conform_normalized(clip.audio, target, normalize)
+        return audio.filter("apad", whole_dur=length).trim(duration=length)
+    silence = clip.graph.source("anullsrc", kind=AUDIO, r=target.sample_rate, cl="stereo")
+    return silence.trim(duration=length)
+
+
+def mix_bgm(main: Stream, bgm: Stream, volume: float = DEFAULT_BGM_VOLUME) -> Stream:
+    """将循环播放的背景音乐混入主音轨，时长以主音轨为准"""
+    return main.graph.filter(
+        "amix", [main, bgm.volume(volume)], kinds=AUDIO,
+        inputs=2, duration="first", dropout_transition=0, normalize=0,
+    )[0]
+
+
+def clip_normalizer(loudness: Optional[LoudnessPlan], index: int) -> Optional[Normalizer]:
+    return loudness.for_clip(index) if loudness is not None else None
+
+
+def bgm_normalizer(loudness: Optional[LoudnessPlan]) -> Optional[Normalizer]:
+    return loudness.for_bgm() if loudness is not None else None
+
+
+def dialogue_normalizer(loudness: Optional[LoudnessPlan], index: int) -> Optional[Normalizer]:
+    return loudness.for_dialogue(index) if loudness is not None else None
+
+
+def mix_soundtrack(
+    graph: FilterGraph,
+    main: Stream,
+    target: MergeTarget,
+    duration: float = 0.0,
+    bgm_file: Optional[str] = None,
+    bgm_volume: float = DEFAULT_BGM_VOLUME,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+    loudness: Optional[LoudnessPlan] = None,
+) -> Stream:
+    """在片段原声上叠加循环的背景音乐和按时间点放置的配音，时长以主音轨为准
+
+    duck 为真时以配音为侧链压低原声和背景音乐；duration 为主音轨时长（有配音时必需）。
+    没有背景音乐和配音时原样返回 main。
+    """
+    bed = main
+    if bgm_file:
+        bgm = graph.input(bgm_file, args=["-stream_loop", "-1"]).audio
+        bed = mix_bgm(bed, conform_normalized(bgm, target, bgm_normalizer(loudness)), bgm_volume)
+    if dialogues:
+        voices = []
+        for i, dialogue in enumerate(dialogues):
+            voice = conform_normalized(graph.input(dialogue.path).audio, target, dialogue_normalizer(loudness, i))
+            if dialogue.volume != 1.0:
+                voice = voice.volume(dialogue.volume)
+            if dialogue.start > 0:
+                voice = voice.filter("adelay", delays=round(dialogue.start * 1000), all=1)
+            voices.append(voice)
+        if len(voices) > 1:
+            voices = graph.filter(
+                "amix", voices, kinds=AUDIO,
+                inputs=len(voices), duration="longest", dropout_transition=0, normalize=0,
+            )
+        # 侧链提前结束时 sidechaincompress 也会结束，补静音到成片时长
+        voice = voices[0].filter("apad", whole_dur=f"{duration:.3f}")
+        if duck:
+            bed = graph.filter(
+                "sidechaincompress", [bed, voice], kinds=AUDIO,
+                threshold=DUCK_THRESHOLD, ratio=DUCK_RATIO, attack=DUCK_ATTACK, release=DUCK_RELEASE,
+            )[0]
+        bed = graph.filter(
+            "amix", [bed, voice], kinds=AUDIO,
+            inputs=2, duration="first", dropout_transition=0, normalize=0,
+        )[0]
+    return bed if bed is main else bed.label("amixed")
+
+
+def build_merge_graph(
+    infos: Sequence[MediaInfo],
+    target: MergeTarget,
+    scale_flags: Optional[str] = None,
+    with_audio: bool = True,
+    loudness: Optional[LoudnessPlan] = None,
+) -> Tuple[FilterGraph, Stream, Optional[Stream]]:
+    """所有片段归一化后 concat，返回 (滤镜图, 视频流, 音频流)
+
+    with_audio 为 False 时只拼接视频，音频流返回 None；
+    loudness 给出时各片段音轨在图内按测量值做响度归一化。
+    """
+    graph = FilterGraph()
+    clips = [graph.input(info.path) for info in infos]
+    segments = []
+    for i, (clip, info) in enumerate(zip(clips, infos)):
+        video = normalize_video(clip.video, target, scale_flags)
+        if with_audio:
+            audio = segment_audio(clip, info, target, info.duration, clip_normalizer(loudness, i))
+            segments.append([video, audio])
+        else:
+            segments.append([video])
+    joined = graph.concat(segments)
+    video = joined[0].label("vout")
+    audio = joined[1].label("aout") if with_audio else None
+    return graph, video, audio
+
+
+def build_filter_merge_graph(
+    infos: Sequence[MediaInfo],
+    output_path: Path,
+    target: Optional[MergeTarget] = None,
+    bgm_file: Optional[str] = None,
+    bgm_volume: float = DEFAULT_BGM_VOLUME,
+    threads: int = 0,
+    variants: Sequence[Variant] = (),
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> FilterGraph:
+    """一次解码、一次编码的合并滤镜图
+
+    每个输入在图内完成 scale/pad/fps/setsar 归一化，然后 concat，
+    可选的背景音乐和配音（带闪避）在同一个图中混音。没有音轨的片段补静音。
+    variants 中的其他画幅作为同一命令的额外输出。
+    loudness 为各音频输入的响度测量，第二遍 loudnorm 在同一个图中完成。
+    """
+    target = target or MergeTarget.from_infos(infos)
+    graph, video, audio = build_merge_graph(infos, target, loudness=loudness)
+    audio = mix_soundtrack(
+        graph, audio, target, sum(info.duration for info in infos),
+        bgm_file, bgm_volume, dialogues, duck, loudness,
+    )
+
+    encode = [
+        "-c:v", "libx264", "-preset", "fast", "-crf", "23",
+        "-c:a", "aac", "-b:a", "128k",
+    ]
+    if threads:
+        encode += ["-threads", str(threads)]
+
+    # 其他画幅从同一次解码的结果 split 出来，每个输出单独编码
+    extra = [v for v in variants if Path(v.output_path) != Path(output_path)]
+    outputs = [(video, audio, output_path)]
+    if extra:
+        videos = video.split(len(extra) + 1, ["vmain"] + [f"vsplit{k}" for k in range(len(extra))])
+        audios = audio.split(len(extra) + 1, ["amain"] + [f"asplit{k}" for k in range(len(extra))])
+        outputs = [(videos[0], audios[0], output_path)]
+        for k, variant in enumerate(extra):
+            fitted = fit(videos[k + 1], variant.width, variant.height).label(f"vvar{k}")
+            outputs.append((fitted, audios[k + 1], variant.output_path))
+
+    for video_out, audio_out, path in outputs:
+        graph.output(path, video_out, audio_out, args=encode)
+    return graph
+
+
+def build_filter_merge_command(
+    infos: Sequence[MediaInfo],
+    output_path: Path,
+    target: Optional[MergeTarget] = None,
+    bgm_file: Optional[str] = None,
+    bgm_volume: float = DEFAULT_BGM_VOLUME,
+    threads: int = 0,
+    ffmpeg_path: str = "ffmpeg",
+    variants: Sequence[Variant] = (),
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+) -> List[str]:
+    """构建一次解码、一次编码的合并命令"""
+    graph = build_filter_merge_graph(
+        infos, output_path, target, bgm_file, bgm_volume, threads, variants, loudness, dialogues, duck
+    )
+    return graph.compile(ffmpeg_path)
+
+
+def build_audio_remix_graph(
+    video_source: Path,
+    infos: Sequence[MediaInfo],
+    output_path: Path,
+    target: Optional[MergeTarget] = None,
+    bgm_file: Optional[str] = None,
+    bgm_volume: float = DEFAULT_BGM_VOLUME,
+    loudness: Optional[LoudnessPlan] = None,
+    dialogues: Sequence[Dialogue] = (),
+    duck: bool = True,
+    concat_list: bool = True,
+) -> FilterGraph:
+    """视频流复制，只在图内重建音轨（归一化、混音）后重新编码音频
+
+    video_source 为视频片段的 concat 列表文件（concat_list 为真）或已渲染的成片，
+    infos 为提供音轨的原始片段。
+    """
+    target = target or MergeTarget.from_infos(infos)
+    graph = FilterGraph()
+    args = ["-f", "concat", "-safe", "0"] if concat_list else []
+    video = graph.input(video_source, args=args).video
+    clips = [graph.input(info.path) for info in infos]
+    segments = [
+        [segment_audio(clip, info, target, info.duration, clip_normalizer(loudness, i))]
+        for i, (clip, info) in enumerate(zip(clips, infos))
+    ]
+    audio = graph.concat(segments)[0].label("aout")
+    audio = mix_soundtrack(
+        graph, audio, target, sum(info.duration for info in infos),
+        bgm_file, bgm_volume, dialogues, duck, loudness,
+    )
+    graph.output(
+        output_path, video, audio,
+        args=["-c:v", "copy", "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart"],
+    )
+    return graph
+
+
+def draft_target(infos: Sequence[Optional[MediaInfo]], short_edge: int = DRAFT_SHORT_EDGE) -> MergeTarget:
+    """按主输出画幅缩小到 short_edge 短边（不放大）"""
+    target = MergeTarget.from_infos(infos)
+    scale = min(1.0, short_edge / min(target.width, target.height))
+    target.width = round(target.width * scale / 2) * 2
+    target.height = round(target.height * scale / 2) * 2
+    return target
+
+
+def audio_copy_compatible(infos: Sequence[MediaInfo]) -> bool:
+    """所有片段的音轨编码参数一致时，可以用 concat 分离器直接复制音频"""
+    if not infos or not all(info.has_audio for info in infos):
+        return False
+    first = infos[0]
+    return all(
+        (info.audio_codec, info.sample_rate, info.channels)
+        == (first.audio_codec, first.sample_rate, first.channels)
+        for info in infos
+    )
+
+
+def build_draft_graph(
+    infos: Sequence[MediaInfo],
+    output_path: Path,
+    audio_list: Optional[Path] = None,
+    target: Optional[MergeTarget] = None,
+    bgm_file: Optional[str] = None,
+    bgm_volume: float = DEFAULT_BGM_VOLUME,
+    threads: int = 0,
+    dialogues: Sequence[Dialogue] = (),
+) -> FilterGraph:
+    """草稿预览滤镜图：低分辨率、ultrafast、分片 MP4
+
+    audio_list 为所有片段的 concat 列表文件，给出时音频直接流复制
+    （调用方需先确认 audio_copy_compatible 且没有背景音乐和配音），否则在图内重新编码音频。
+    """
+    target = target or draft_target(infos)
+    copy_audio = audio_list is not None and not bgm_file and not dialogues
+    graph, video, audio = build_merge_graph(
+        infos, target, scale_flags="fast_bilinear", with_audio=not copy_audio,
+    )
+    if copy_audio:
+        audio = graph.input(audio_list, args=["-f", "concat", "-safe", "0"]).audio
+    else:
+        audio = mix_soundtrack(
+            graph, audio, target, sum(info.duration for info in infos), bgm_file, bgm_volume, dialogues
+        )
+
+    args = [
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "30",
+        # 每秒一个关键帧，分片足够细，边编码边可播放
+        "-force_key_frames", "expr:gte(t,n_forced*1)",
+    ]
+    args += ["-c:a", "copy"] if copy_audio else ["-c:a", "aac", "-b:a", "96k"]
+    if threads:
+        args += ["-threads", str(threads)]
+    args += ["-movflags", FRAGMENTED_MP4_FLAGS]
+    graph.output(output_path, video, audio, args=args)
+    return graph
+
+
+def build_draft_command(
+    infos: Sequence[MediaInfo],
+    output_path: Path,
+    audio_list: Optional[Path] = None,
+    target: Optional[MergeTarget] = None,
+    bgm_file: Optional[str] = None,
+    bgm_volume: float = DEFAULT_BGM_VOLUME,
+    threads: int = 0,
+    ffmpeg_path: str = "ffmpeg",
+    dialogues: Sequence[Dialogue] = (),
+) -> List[str]:
+    """构建草稿预览命令"""
+    graph = build_draft_graph(infos, output_path, audio_list, target, bgm_file, bgm_volume, threads, dialogues)
+    return graph.compile(ffmpeg_path)
@@ -0,0 +1,103 @@
+"""FFmpeg 并行任务调度"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, List, Optional, Sequence
+
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.runner import FFmpegCancelledError, FFmpegRunError, Progress, run_ffmpeg
+
+
+class JobFailedError(FFmpegError):
+    """并行任务中某一个失败"""
+
+    def __init__(self, index: int, label: str, stderr: str):
+        self.index = index
+        self.label = label
+        self.stderr = stderr
+        super().__init__(f"任务 {index + 1} ({label}) 执行失败: {stderr}")
+
+
+def cpu_budget(budget: Optional[int] = None) -> int:
+    """全局 CPU 预算，默认使用全部可用核心"""
+    if budget and int(budget) > 0:
+        return int(budget)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_jobs(jobs: int, total: int, budget: Optional[int] = None) -> int:
+    """计算并发数：jobs<=0 时按 CPU 预算自动选择，且不超过任务数"""
+    if total <= 0:
+        return 1
+    if jobs <= 0:
+        jobs = cpu_budget(budget)
+    return max(1, min(jobs, total))
+
+
+def threads_per_job(jobs: int, budget: Optional[int] = None) -> int:
+    """把 CPU 预算平均分给每个 ffmpeg 进程，避免线程超订"""
+    return max(1, cpu_budget(budget) // max(1, jobs))
+
+
+def run_parallel(
+    commands: Sequence[List[str]],
+    jobs: int = 0,
+    labels: Optional[Sequence[str]] = None,
+    budget: Optional[int] = None,
+    on_progress: Optional[Callable[[int, Progress], None]] = None,
+    durations: Optional[Sequence[float]] = None,
+    timeout: Optional[float] = None,
+) -> None:
+    """在有界线程池中并发执行 FFmpeg 命令
+
+    on_progress(index, progress) 接收每个任务的进度；timeout 为单个任务的墙钟时限。
+    任意一个命令失败时，取消尚未开始的任务并终止正在运行的进程，
+    然后抛出 JobFailedError 指明失败的任务。
+    """
+    if not commands:
+        return
+    labels = list(labels) if labels else [str(i) for i in range(len(commands))]
+    workers = resolve_jobs(jobs, len(commands), budget)
+    cancelled = threading.Event()
+
+    def run_one(index: int) -> None:
+        if cancelled.is_set():
+            return
+        callback = partial(on_progress, index) if on_progress is not None else None
+        try:
+            run_ffmpeg(
+                commands[index],
+                on_progress=callback,
+                duration=durations[index] if durations else None,
+                timeout=timeout,
+                cancel_event=cancelled,
+            )
+        except FFmpegCancelledError:
+            return
+        except FFmpegRunError as e:
+            if not cancelled.is_set():
+                raise JobFailedError(index, labels[index], e.stderr) from e
+        except FFmpegError as e:
+            if not cancelled.is_set():
+                raise JobFailedError(index, labels[index], f"{e}\n{getattr(e, 'stderr', '')}".strip()) from e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_one, i) for i in range(len(commands))]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+
+        failed = next((f for f in futures if f in done and f.exception()), None)
+        if failed is None:
+            return
+
+        # 取消剩余任务，正在运行的进程会在下一次轮询时被终止
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+
+    raise failed.exception()
@@ -0,0 +1,165 @@
+"""基于命名管道的流式合并：不落盘中间文件"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from videoclaw.ffmpeg.concat import concat_list_entry, match_encode_args
+from videoclaw.ffmpeg.graph import FilterGraph
+from videoclaw.ffmpeg.merge import mix_bgm
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.runner import FFmpegCancelledError, Progress, run_ffmpeg
+
+# 常见的内存文件系统目录
+RAM_DISK_CANDIDATES = ["/dev/shm"]
+
+# 管道中的流格式：NUT 可流式读写且能承载任意编码
+PIPE_FORMAT = "nut"
+
+
+class PipeMergeError(FFmpegError):
+    """管道合并中某个进程失败"""
+
+    def __init__(self, label: str, error: FFmpegError):
+        self.label = label
+        self.stderr = getattr(error, "stderr", "") or str(error)
+        super().__init__(f"{label} 失败: {error}")
+
+
+def pipes_supported(directory: Optional[Path] = None) -> bool:
+    """当前平台和目录是否支持创建命名管道"""
+    if not hasattr(os, "mkfifo"):
+        return False
+    try:
+        probe_dir = Path(tempfile.mkdtemp(prefix="videoclaw-fifo-", dir=directory))
+    except OSError:
+        return False
+    try:
+        os.mkfifo(probe_dir / "probe")
+        return True
+    except OSError:
+        return False
+    finally:
+        shutil.rmtree(probe_dir, ignore_errors=True)
+
+
+def default_temp_root(configured: Optional[str] = None) -> Optional[Path]:
+    """中间文件目录：使用配置的目录，未配置时返回 None（系统临时目录）
+
+    完整分辨率的中间文件可能很大，默认不放在内存文件系统中。
+    """
+    if configured:
+        path = Path(configured).expanduser()
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    return None
+
+
+def fallback_temp_root(temp_root: Optional[Path] = None) -> Optional[Path]:
+    """不支持管道时两阶段流程的中间文件目录：优先使用配置，其次内存文件系统，最后系统临时目录"""
+    if temp_root is not None:
+        return temp_root
+    for candidate in RAM_DISK_CANDIDATES:
+        path = Path(candidate)
+        if path.is_dir() and os.access(path, os.W_OK):
+            return path
+    return None
+
+
+def build_pipe_commands(
+    infos: Sequence[MediaInfo],
+    reference: MediaInfo,
+    fifos: Sequence[Path],
+    list_file: Path,
+    output_path: Path,
+    bgm_file: Optional[str] = None,
+    threads: int = 0,
+    ffmpeg_path: str = "ffmpeg",
+) -> Tuple[List[List[str]], List[str]]:
+    """构建写入端（每个片段归一化后以 NUT 流写入管道）和最终封装命令"""
+    writers = []
+    for info, fifo in zip(infos, fifos):
+        cmd = [ffmpeg_path, "-y", "-i", info.path]
+        if reference.has_audio and not info.has_audio:
+            cmd += ["-f", "lavfi", "-i", f"anullsrc=r={reference.sample_rate or 44100}:cl=stereo"]
+        cmd += match_encode_args(reference, info, threads)
+        cmd += ["-f", PIPE_FORMAT, str(fifo)]
+        writers.append(cmd)
+
+    graph = FilterGraph()
+    clips = graph.input(list_file, args=["-f", "concat", "-safe", "0"])
+    if bgm_file:
+        bgm = graph.input(bgm_file, args=["-stream_loop", "-1"])
+        audio = mix_bgm(clips.audio, bgm.audio)
+        args = ["-c:v", "copy", "-c:a", "aac", "-b:a", "128k"]
+        graph.output(output_path, clips.video, audio, args=args + ["-movflags", "+faststart"])
+    else:
+        graph.output(output_path, args=["-c", "copy", "-movflags", "+faststart"])
+    muxer = graph.compile(ffmpeg_path)
+    return writers, muxer
+
+
+def pipe_merge(
+    infos: Sequence[MediaInfo],
+    reference: MediaInfo,
+    output_path: Path,
+    bgm_file: Optional[str] = None,
+    fifo_root: Optional[Path] = None,
+    threads: int = 0,
+    timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    ffmpeg_path: str = "ffmpeg",
+) -> Path:
+    """每个片段的归一化进程把 NUT 流写入命名管道，由 concat 封装进程直接读取
+
+    管道按顺序被读取，因此片段实际上是依次编码的；换来的是没有任何中间文件读写。
+    任一进程失败时终止其余进程并抛出 PipeMergeError。
+    """
+    fifo_dir = Path(tempfile.mkdtemp(prefix="videoclaw-pipe-", dir=fifo_root))
+    try:
+        fifos = []
+        for i in range(len(infos)):
+            fifo = fifo_dir / f"clip_{i:03d}.{PIPE_FORMAT}"
+            os.mkfifo(fifo)
+            fifos.append(fifo)
+        list_file = fifo_dir / "concat_list.txt"
+        list_file.write_text("".join(concat_list_entry(fifo) for fifo in fifos))
+
+        writers, muxer = build_pipe_commands(
+            infos, reference, fifos, list_file, output_path, bgm_file, threads, ffmpeg_path
+        )
+
+        cancel = threading.Event()
+        errors: List[PipeMergeError] = []
+
+        def run(cmd: List[str], label: str, **kwargs) -> None:
+            try:
+                run_ffmpeg(cmd, cancel_event=cancel, timeout=timeout, **kwargs)
+            except FFmpegCancelledError:
+                pass
+            except FFmpegError as e:
+                errors.append(PipeMergeError(label, e))
+                cancel.set()
+
+        total = sum(info.duration for info in infos)
+        workers = [threading.Thread(
+            target=run, args=(muxer, "封装"),
+            kwargs={"on_progress": on_progress, "duration": total},
+        )]
+        for info, cmd in zip(infos, writers):
+            workers.append(threading.Thread(target=run, args=(cmd, info.path)))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        if errors:
+            raise errors[0]
+        return output_path
+    finally:
+        shutil.rmtree(fifo_dir, ignore_errors=True)
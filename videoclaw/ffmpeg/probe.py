@@ -0,0 +1,257 @@
+"""媒体文件探测"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from videoclaw.ffmpeg.processor import FFmpegError
+
+
+@dataclass
+class MediaInfo:
+    """媒体文件信息（首个视频流和首个音频流）"""
+    path: str
+    duration: float = 0.0
+    width: int = 0
+    height: int = 0
+    fps: str = ""  # r_frame_rate，如 "24/1"
+    video_codec: Optional[str] = None
+    profile: Optional[str] = None
+    pix_fmt: Optional[str] = None
+    sample_aspect_ratio: Optional[str] = None
+    video_timescale: Optional[int] = None
+    audio_codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    channel_layout: Optional[str] = None
+    streams: List[Dict[str, Any]] = field(default_factory=list)
+    keyframes: List[float] = field(default_factory=list)  # 视频关键帧时间点（秒）
+
+    @property
+    def has_video(self) -> bool:
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+    @property
+    def fps_value(self) -> float:
+        """帧率数值"""
+        if not self.fps:
+            return 0.0
+        num, _, den = self.fps.partition("/")
+        try:
+            return float(num) / float(den or 1)
+        except (ValueError, ZeroDivisionError):
+            return 0.0
+
+    def stream_signature(self) -> tuple:
+        """concat -c copy 要求一致的流参数"""
+        return (
+            self.video_codec, self.profile, self.width, self.height, self.fps,
+            self.pix_fmt, self.sample_aspect_ratio or "1:1",
+            self.audio_codec, self.sample_rate, self.channels,
+        )
+
+    @classmethod
+    def from_ffprobe(cls, path: str, data: Dict[str, Any]) -> "MediaInfo":
+        """从 ffprobe JSON 输出构建"""
+        info = cls(path=path)
+        fmt = data.get("format", {})
+        try:
+            info.duration = float(fmt.get("duration") or 0)
+        except ValueError:
+            info.duration = 0.0
+
+        video_index = None
+        for stream in data.get("streams", []):
+            codec_type = stream.get("codec_type")
+            info.streams.append({
+                "index": stream.get("index"),
+                "codec_type": codec_type,
+                "codec_name": stream.get("codec_name"),
+            })
+            if codec_type == "video" and info.video_codec is None:
+                if stream.get("disposition", {}).get("attached_pic"):
+                    continue  # 跳过封面图
+                video_index = stream.get("index")
+                info.video_codec = stream.get("codec_name")
+                info.profile = stream.get("profile")
+                info.width = int(stream.get("width") or 0)
+                info.height = int(stream.get("height") or 0)
+                info.fps = stream.get("r_frame_rate") or ""
+                info.pix_fmt = stream.get("pix_fmt")
+                sar = stream.get("sample_aspect_ratio")
+                info.sample_aspect_ratio = sar if sar and sar != "0:1" else None
+                time_base = stream.get("time_base", "")
+                if "/" in time_base:
+                    info.video_timescale = int(time_base.split("/")[1])
+            elif codec_type == "audio" and info.audio_codec is None:
+                info.audio_codec = stream.get("codec_name")
+                info.sample_rate = int(stream.get("sample_rate") or 0) or None
+                info.channels = stream.get("channels")
+                info.channel_layout = stream.get("channel_layout")
+
+        for packet in data.get("packets", []):
+            if video_index is not None and packet.get("stream_index", video_index) != video_index:
+                continue
+            if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A"):
+                info.keyframes.append(float(packet["pts_time"]))
+        info.keyframes.sort()
+        return info
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MediaInfo":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def probe(
+    path: Union[str, Path],
+    ffprobe_path: str = "ffprobe",
+    keyframes: bool = False,
+) -> MediaInfo:
+    """使用一次 JSON 格式的 ffprobe 调用获取媒体信息
+
+    keyframes 为 True 时在同一次调用中读取视频包标记，得到关键帧位置。
+    """
+    cmd = [ffprobe_path, "-v", "error", "-print_format", "json"]
+    if keyframes:
+        cmd += ["-show_entries", "format:stream:packet=stream_index,pts_time,flags"]
+    else:
+        cmd += ["-show_format", "-show_streams"]
+    cmd.append(str(path))
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise FFmpegError(f"ffprobe 执行失败: {e.stderr}") from e
+    except FileNotFoundError as e:
+        raise FFmpegError(f"找不到 ffprobe: {ffprobe_path}") from e
+
+    try:
+        data = json.loads(result.stdout or "{}")
+    except json.JSONDecodeError as e:
+        raise FFmpegError(f"ffprobe 输出解析失败: {e}") from e
+    return MediaInfo.from_ffprobe(str(path), data)
+
+
+class ProbeCache:
+    """基于 SQLite 的探测结果缓存，键为 (path, size, mtime)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS media (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            probed_at REAL NOT NULL,
+            info TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_media_key ON media (path, size, mtime_ns);
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def file_key(path: Union[str, Path]) -> tuple:
+        """缓存键：绝对路径、文件大小、修改时间"""
+        resolved = Path(path).resolve()
+        stat = resolved.stat()
+        return str(resolved), stat.st_size, stat.st_mtime_ns
+
+    def get(self, path: Union[str, Path]) -> Optional[MediaInfo]:
+        try:
+            key = self.file_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT info FROM media WHERE path = ? AND size = ? AND mtime_ns = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+        info = MediaInfo.from_dict(json.loads(row[0]))
+        info.path = str(path)
+        return info
+
+    def put(self, path: Union[str, Path], info: MediaInfo) -> None:
+        try:
+            key = self.file_key(path)
+        except OSError:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media (path, size, mtime_ns, probed_at, info) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (*key, time.time(), json.dumps(info.to_dict())),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ProbeService:
+    """媒体探测服务：并行探测并缓存结果"""
+
+    def __init__(
+        self,
+        cache_path: Optional[Path] = None,
+        ffprobe_path: str = "ffprobe",
+        keyframes: bool = True,
+    ):
+        self.cache = ProbeCache(cache_path) if cache_path else None
+        self.ffprobe_path = ffprobe_path
+        self.keyframes = keyframes
+
+    @classmethod
+    def for_project(cls, project_path: Optional[Path], **kwargs) -> "ProbeService":
+        """项目级服务，缓存位于 <project>/.videoclaw/cache/probe.sqlite"""
+        cache_path = None
+        if project_path is not None:
+            cache_path = Path(project_path) / ".videoclaw" / "cache" / "probe.sqlite"
+        return cls(cache_path, **kwargs)
+
+    def probe(self, path: Union[str, Path]) -> MediaInfo:
+        """探测单个文件，优先使用缓存"""
+        if self.cache is not None:
+            cached = self.cache.get(path)
+            # 需要关键帧而缓存中没有时重新探测
+            if cached is not None and (cached.keyframes or not self.keyframes or not cached.has_video):
+                return cached
+        info = probe(path, self.ffprobe_path, keyframes=self.keyframes)
+        if self.cache is not None:
+            self.cache.put(path, info)
+        return info
+
+    def probe_many(self, paths: Sequence[Union[str, Path]], jobs: int = 0) -> List[Optional[MediaInfo]]:
+        """并行探测多个文件，保持输入顺序；探测失败的文件返回 None"""
+        if not paths:
+            return []
+
+        def safe_probe(path):
+            try:
+                return self.probe(path)
+            except FFmpegError:
+                return None
+
+        workers = jobs if jobs > 0 else min(len(paths), (os.cpu_count() or 1) * 2)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return list(pool.map(safe_probe, paths))
@@ -1,9 +1,10 @@
 """FFmpeg 视频处理模块"""
 from __future__ import annotations
 
-import subprocess
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
+
+from videoclaw.ffmpeg.graph import FilterGraph
 
 
 class FFmpegError(Exception):
@@ -14,44 +15,61 @@ class FFmpegError(Exception):
 class FFmpegProcessor:
     """FFmpeg 视频处理器"""
 
-    def __init__(self, ffmpeg_path: str = "ffmpeg"):
+    def __init__(
+        self,
+        ffmpeg_path: str = "ffmpeg",
+        timeout: Optional[float] = None,
+        on_progress: Optional[Callable] = None,
+    ):
         self.ffmpeg_path = ffmpeg_path
+        self.timeout = timeout
+        self.on_progress = on_progress
+
+    def _run_command(self, cmd: List[str], duration: Optional[float] = None) -> None:
+        """执行 FFmpeg 命令（流式读取进度，只保留 stderr 末尾用于报错）"""
+        from videoclaw.ffmpeg.runner import run_ffmpeg
+        run_ffmpeg(cmd, on_progress=self.on_progress, duration=duration, timeout=self.timeout)
+
+    def render(self, graph: FilterGraph, duration: Optional[float] = None, dry_run: bool = False) -> List[str]:
+        """把滤镜图编译为一次 FFmpeg 调用并执行，dry_run 时只打印命令
 
-    def _run_command(self, cmd: List[str]) -> None:
-        """执行 FFmpeg 命令"""
-        try:
-            result = subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-        except subprocess.CalledProcessError as e:
-            raise FFmpegError(f"FFmpeg 执行失败: {e.stderr}")
-
-    def merge(self, input_files: List[str], output_file: str) -> Path:
-        """合并多个视频文件"""
+        返回编译后的命令。
+        """
+        cmd = graph.compile(self.ffmpeg_path)
+        if dry_run:
+            graph.dry_run(self.ffmpeg_path)
+        else:
+            self._run_command(cmd, duration)
+        return cmd
+
+    def merge(self, input_files: List[str], output_file: str, bgm_file: Optional[str] = None) -> Path:
+        """合并多个视频文件
+
+        视频流直接复制；指定 bgm_file 时在同一次调用中把背景音乐混入音轨。
+        """
         output_path = Path(output_file)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
+        from videoclaw.ffmpeg.concat import concat_list_entry
+
         # 创建临时文件列表
         list_file = output_path.parent / "input_list.txt"
         with open(list_file, "w") as f:
             for file in input_files:
-                f.write(f"file '{file}'\n")
+                f.write(concat_list_entry(file))
 
         # 使用 FFmpeg concat 合并
-        cmd = [
-            self.ffmpeg_path,
-            "-f", "concat",
-            "-safe", "0",
-            "-i", str(list_file),
-            "-c", "copy",
-            "-y",
-            str(output_path)
-        ]
+        graph = FilterGraph()
+        clips = graph.input(str(list_file), args=["-f", "concat", "-safe", "0"])
+        if bgm_file:
+            from videoclaw.ffmpeg.merge import mix_bgm
+            bgm = graph.input(bgm_file, args=["-stream_loop", "-1"])
+            audio = mix_bgm(clips.audio, bgm.audio)
+            graph.output(output_path, clips.video, audio, args=["-c:v", "copy", "-c:a", "aac"])
+        else:
+            graph.output(output_path, args=["-c", "copy"])
 
-        self._run_command(cmd)
+        self.render(graph)
         list_file.unlink()
 
         return output_path
@@ -0,0 +1,198 @@
+"""预览用的低分辨率代理文件：视频转小尺寸 H.264，图片转 WebP"""
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from videoclaw.cache import ContentCache, file_digest
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.runner import run_ffmpeg
+from videoclaw.utils.logging import get_logger
+
+logger = get_logger(name="ffmpeg.proxy")
+
+VIDEO_SUFFIXES = {".mp4", ".mov", ".mkv", ".webm", ".m4v", ".avi"}
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif"}
+
+# 视频代理的最大高度，图片代理的最大边长
+PROXY_VIDEO_HEIGHT = 360
+PROXY_IMAGE_SIZE = 640
+
+# 项目缓存目录名（.videoclaw/cache/proxies）
+CACHE_NAME = "proxies"
+
+# 后台监听的项目子目录
+WATCH_DIRS = ("videos", "assets")
+
+
+def proxy_kind(path: Path) -> Optional[str]:
+    """根据扩展名判断代理类型：video / image，不支持时返回 None"""
+    suffix = Path(path).suffix.lower()
+    if suffix in VIDEO_SUFFIXES:
+        return "video"
+    if suffix in IMAGE_SUFFIXES:
+        return "image"
+    return None
+
+
+def build_video_proxy_command(
+    source: Path,
+    output_path: Path,
+    height: int = PROXY_VIDEO_HEIGHT,
+    ffmpeg_path: str = "ffmpeg",
+) -> List[str]:
+    """缩小到 height（不放大）的 H.264 + AAC，moov 前置便于边下边播"""
+    return [
+        ffmpeg_path, "-y", "-i", str(source),
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", f"scale=-2:'min({height},ih)'",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "28", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "64k", "-ac", "2",
+        "-movflags", "+faststart",
+        str(output_path),
+    ]
+
+
+def make_image_proxy(source: Path, output_path: Path, size: int = PROXY_IMAGE_SIZE) -> None:
+    """等比缩小到 size 以内并保存为 WebP"""
+    with Image.open(source) as img:
+        # JPEG 可以在解码时直接缩小，避免解出全尺寸图像
+        img.draft("RGB", (size, size))
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        img.thumbnail((size, size))
+        img.save(output_path, "WEBP", quality=80, method=4)
+
+
+def proxy_for(
+    source: Path,
+    cache: ContentCache,
+    timeout: Optional[float] = None,
+    ffmpeg_path: str = "ffmpeg",
+) -> Path:
+    """返回 source 的代理文件，没有缓存时生成一次（按内容摘要缓存）"""
+    source = Path(source)
+    kind = proxy_kind(source)
+    if kind is None:
+        raise ValueError(f"不支持预览代理的文件类型: {source.suffix}")
+
+    if kind == "video":
+        key = ContentCache.make_key(file_digest(source), "proxy", "video", str(PROXY_VIDEO_HEIGHT))
+        suffix = ".mp4"
+    else:
+        key = ContentCache.make_key(file_digest(source), "proxy", "image", str(PROXY_IMAGE_SIZE))
+        suffix = ".webp"
+    hit = cache.get(key, suffix)
+    if hit is not None:
+        return hit
+
+    temp_dir = Path(tempfile.mkdtemp(prefix="videoclaw-proxy-"))
+    try:
+        output = temp_dir / f"proxy{suffix}"
+        if kind == "video":
+            run_ffmpeg(build_video_proxy_command(source, output, ffmpeg_path=ffmpeg_path), timeout=timeout)
+        else:
+            make_image_proxy(source, output)
+        return cache.put(key, output, suffix)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def scan_media(directories: Iterable[Path]) -> Dict[Path, Tuple[int, int]]:
+    """列出目录下所有可生成代理的文件及其 (大小, 修改时间)"""
+    found = {}
+    for directory in directories:
+        if not directory.is_dir():
+            continue
+        for path in directory.rglob("*"):
+            if proxy_kind(path) is None or not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found[path] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+class ProxyWatcher:
+    """后台轮询项目的 videos/ 和 assets/，为新出现或有变化的文件生成代理
+
+    文件大小和修改时间在两次轮询之间保持不变才处理，避免读取仍在写入的文件。
+    代理逐个生成，不与前台任务争抢 CPU。
+    """
+
+    def __init__(
+        self,
+        project_path: Path,
+        cache: Optional[ContentCache] = None,
+        interval: float = 2.0,
+        directories: Optional[Iterable[Path]] = None,
+    ):
+        self.project_path = Path(project_path)
+        self.cache = cache or ContentCache.for_project(self.project_path, CACHE_NAME)
+        self.interval = interval
+        self.directories = list(directories) if directories else [self.project_path / d for d in WATCH_DIRS]
+        self._pending: Dict[Path, Tuple[int, int]] = {}
+        self._done: Dict[Path, Tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> List[Path]:
+        """扫描一次，为已稳定的新文件生成代理，返回本次生成的代理路径"""
+        created = []
+        current = scan_media(self.directories)
+        for path, state in current.items():
+            if self._stop.is_set():
+                break
+            if self._done.get(path) == state:
+                continue
+            if self._pending.get(path) != state:
+                # 第一次看到或仍在变化，等下一轮确认已写完
+                self._pending[path] = state
+                continue
+            self._pending.pop(path, None)
+            self._done[path] = state
+            try:
+                created.append(proxy_for(path, self.cache))
+                logger.info(f"已生成预览代理: {path.name}")
+            except (OSError, ValueError, FFmpegError) as e:
+                logger.warning(f"生成预览代理失败 {path}: {e}")
+        for path in list(self._pending):
+            if path not in current:
+                del self._pending[path]
+        return created
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+    def start(self) -> "ProxyWatcher":
+        self._thread = threading.Thread(target=self.run, name="proxy-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def open_command(path: Path, platform: Optional[str] = None) -> Optional[List[str]]:
+    """系统默认应用打开文件的命令，没有可用的打开方式时返回 None"""
+    platform = platform or sys.platform
+    if platform == "darwin":
+        return ["open", str(path)]
+    if platform.startswith("win"):
+        return ["cmd", "/c", "start", "", str(path)]
+    opener = shutil.which("xdg-open")
+    if opener and (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        return [opener, str(path)]
+    return None
@@ -0,0 +1,193 @@
+"""流式执行 FFmpeg：进度回调、有界 stderr、取消与超时"""
+from __future__ import annotations
+
+import io
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from videoclaw.ffmpeg.processor import FFmpegError
+
+# 出错时保留的 stderr 行数
+STDERR_TAIL_LINES = 40
+
+# 检查取消和超时的间隔（秒）
+POLL_INTERVAL = 0.2
+
+
+class FFmpegRunError(FFmpegError):
+    """FFmpeg 进程以非零状态退出"""
+
+    def __init__(self, returncode: int, stderr: str):
+        self.returncode = returncode
+        self.stderr = stderr
+        super().__init__(f"FFmpeg 执行失败 (exit {returncode}): {stderr}")
+
+
+class FFmpegTimeoutError(FFmpegError):
+    """FFmpeg 超过墙钟时间限制"""
+
+    def __init__(self, timeout: float, stderr: str = ""):
+        self.timeout = timeout
+        self.stderr = stderr
+        super().__init__(f"FFmpeg 执行超时: {timeout} 秒")
+
+
+class FFmpegCancelledError(FFmpegError):
+    """FFmpeg 被取消"""
+
+    def __init__(self, stderr: str = ""):
+        self.stderr = stderr
+        super().__init__("FFmpeg 已取消")
+
+
+@dataclass
+class Progress:
+    """来自 -progress 输出的编码进度"""
+    frame: int = 0
+    fps: float = 0.0
+    out_time: float = 0.0  # 已输出的媒体时长（秒）
+    speed: float = 0.0  # 相对实时的倍速
+    total_size: int = 0
+    duration: Optional[float] = None  # 预期总时长（秒）
+    finished: bool = False
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.duration:
+            return None
+        return min(100.0, self.out_time / self.duration * 100)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """预计剩余秒数"""
+        if not self.duration or self.speed <= 0:
+            return None
+        return max(0.0, (self.duration - self.out_time) / self.speed)
+
+    def update(self, values: Dict[str, str]) -> None:
+        """用一组 key=value 进度字段更新"""
+        try:
+            if "frame" in values:
+                self.frame = int(values["frame"])
+            if "fps" in values:
+                self.fps = float(values["fps"])
+            # out_time_ms 实际单位也是微秒
+            out_us = values.get("out_time_us") or values.get("out_time_ms")
+            if out_us and out_us != "N/A":
+                self.out_time = max(0.0, int(out_us) / 1_000_000)
+            speed = values.get("speed", "").rstrip("x").strip()
+            if speed and speed != "N/A":
+                self.speed = float(speed)
+            if values.get("total_size", "N/A") != "N/A":
+                self.total_size = int(values["total_size"])
+        except ValueError:
+            pass
+        self.finished = values.get("progress") == "end"
+
+
+def with_progress_args(cmd: List[str]) -> List[str]:
+    """在可执行文件之后插入 -progress pipe:1 -nostats"""
+    return [cmd[0], "-progress", "pipe:1", "-nostats"] + list(cmd[1:])
+
+
+def run_ffmpeg(
+    cmd: List[str],
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    duration: Optional[float] = None,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    stderr_lines: int = STDERR_TAIL_LINES,
+) -> str:
+    """执行 FFmpeg 命令并增量读取输出，返回 stderr 的最后 stderr_lines 行
+
+    on_progress 不为空时通过 -progress pipe:1 获取帧数/fps/倍速/ETA；
+    stderr 只保留最后 stderr_lines 行用于错误信息和解析滤镜输出；
+    cancel_event 被设置或超过 timeout 秒时终止进程。
+    """
+    if on_progress is not None:
+        cmd = with_progress_args(cmd)
+    elif "-nostats" not in cmd and "ffmpeg" in Path(cmd[0]).name.lower():
+        # 不关闭时 ffmpeg 持续输出以 \r 结尾的统计行，挤掉真正的错误信息
+        cmd = [cmd[0], "-nostats"] + list(cmd[1:])
+
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE if on_progress is not None else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+    except FileNotFoundError as e:
+        raise FFmpegError(f"找不到可执行文件: {cmd[0]}") from e
+
+    tail: deque = deque(maxlen=stderr_lines)
+
+    def read_stderr():
+        # 通用换行模式下 \r 也算行尾，单行不会无限增长
+        stream = io.TextIOWrapper(proc.stderr, encoding="utf-8", errors="replace", newline=None)
+        for line in iter(stream.readline, ""):
+            tail.append(line.rstrip())
+
+    def read_progress():
+        progress = Progress(duration=duration)
+        block: Dict[str, str] = {}
+        for raw in iter(proc.stdout.readline, b""):
+            key, sep, value = raw.decode(errors="replace").strip().partition("=")
+            if not sep:
+                continue
+            block[key] = value
+            if key == "progress":
+                progress.update(block)
+                block = {}
+                try:
+                    on_progress(progress)
+                except Exception:
+                    pass  # 回调异常不影响编码
+
+    readers = [threading.Thread(target=read_stderr, daemon=True)]
+    if on_progress is not None:
+        readers.append(threading.Thread(target=read_progress, daemon=True))
+    for reader in readers:
+        reader.start()
+
+    deadline = time.monotonic() + timeout if timeout else None
+    error: Optional[FFmpegError] = None
+    while True:
+        try:
+            proc.wait(timeout=POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        if cancel_event is not None and cancel_event.is_set():
+            error = FFmpegCancelledError()
+        elif deadline is not None and time.monotonic() > deadline:
+            error = FFmpegTimeoutError(timeout)
+        if error is not None:
+            _terminate(proc)
+            break
+
+    for reader in readers:
+        reader.join(timeout=5)
+
+    stderr = "\n".join(tail)
+    if error is not None:
+        error.stderr = stderr
+        raise error
+    if proc.returncode != 0:
+        raise FFmpegRunError(proc.returncode, stderr)
+    return stderr
+
+
+def _terminate(proc: subprocess.Popen, grace: float = 5.0) -> None:
+    """先 terminate，超过宽限时间后 kill"""
+    proc.terminate()
+    try:
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
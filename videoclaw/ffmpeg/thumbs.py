@@ -0,0 +1,152 @@
+"""一次解码同时提取封面、缩略图和缩略图拼板"""
+from __future__ import annotations
+
+import math
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from videoclaw.cache import ContentCache, configured_max_bytes, file_digest, parse_size
+from videoclaw.ffmpeg.probe import MediaInfo, probe
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.runner import run_ffmpeg
+
+DEFAULT_THUMB_COUNT = 9
+DEFAULT_THUMB_WIDTH = 320
+DEFAULT_SHEET_COLUMNS = 3
+
+# 未指定封面时间时取视频时长的该比例处
+DEFAULT_COVER_POSITION = 1 / 3
+
+# 在封面时间点之后的这段窗口内挑选最有代表性的一帧（避开转场和模糊帧）
+COVER_WINDOW = 1.0
+
+# 缓存目录名（~/.videoclaw/cache/thumbs），发布时按视频内容查找封面
+CACHE_NAME = "thumbs"
+
+
+@dataclass
+class ThumbSet:
+    """一个视频的封面、缩略图和拼板"""
+    cover: Path
+    thumbnails: List[Path]
+    sheet: Path
+
+
+def cover_time(duration: float, cover_at: Optional[float] = None) -> float:
+    """封面挑选窗口的起点，保证窗口落在视频内"""
+    start = duration * DEFAULT_COVER_POSITION if cover_at is None else cover_at
+    return max(0.0, min(start, duration - COVER_WINDOW))
+
+
+def build_thumbs_command(
+    info: MediaInfo,
+    out_dir: Path,
+    count: int = DEFAULT_THUMB_COUNT,
+    width: int = DEFAULT_THUMB_WIDTH,
+    cover_at: Optional[float] = None,
+    columns: int = DEFAULT_SHEET_COLUMNS,
+    ffmpeg_path: str = "ffmpeg",
+) -> List[str]:
+    """构建单次解码、三路输出的命令
+
+    解码结果 split 为两路：一路在封面窗口内用 thumbnail 滤镜挑选代表帧，
+    另一路按时长均匀取 count 帧（取每个区间的中点），再 split 为单张缩略图和 tile 拼板。
+    """
+    duration = max(info.duration, 0.1)
+    fps = info.fps_value or 25.0
+    interval = duration / count
+    rows = math.ceil(count / columns)
+    graph = ";".join([
+        "[0:v:0]split=2[cover_in][thumb_in]",
+        f"[cover_in]trim=start={cover_time(duration, cover_at):.3f}:duration={COVER_WINDOW},"
+        f"setpts=PTS-STARTPTS,thumbnail=n={max(1, round(fps * COVER_WINDOW))}[cover]",
+        # 片尾帧不足时复制最后一帧，保证缩略图数量精确
+        f"[thumb_in]trim=start={interval / 2:.3f},setpts=PTS-STARTPTS,fps={count}/{duration:.3f},"
+        f"scale={width}:-2,setsar=1,tpad=stop={count}:stop_mode=clone,trim=end_frame={count},"
+        "split=2[thumbs][sheet_in]",
+        f"[sheet_in]tile={columns}x{rows}[sheet]",
+    ])
+    return [
+        ffmpeg_path, "-y", "-i", info.path,
+        "-filter_complex", graph,
+        "-map", "[cover]", "-frames:v", "1", "-q:v", "2", str(out_dir / "cover.jpg"),
+        "-map", "[thumbs]", "-frames:v", str(count), "-q:v", "3", str(out_dir / "thumb_%02d.jpg"),
+        "-map", "[sheet]", "-frames:v", "1", "-q:v", "3", str(out_dir / "sheet.jpg"),
+    ]
+
+
+def thumbs_key(digest: str, count: int, width: int, cover_at: Optional[float], columns: int) -> str:
+    return ContentCache.make_key(digest, "thumbs", str(count), str(width), str(cover_at), str(columns))
+
+
+def cover_key(digest: str) -> str:
+    """最近一次为该内容选定的封面，不区分提取参数"""
+    return ContentCache.make_key(digest, "cover")
+
+
+def thumbs_cache(max_size=None) -> ContentCache:
+    """跨项目的缩略图缓存，容量上限默认取配置 cache.max_size，超出后写入时淘汰"""
+    max_bytes = configured_max_bytes() if max_size is None else parse_size(max_size)
+    return ContentCache.global_cache(CACHE_NAME, max_bytes)
+
+
+def extract_thumbs(
+    video_path: Path,
+    count: int = DEFAULT_THUMB_COUNT,
+    width: int = DEFAULT_THUMB_WIDTH,
+    cover_at: Optional[float] = None,
+    columns: int = DEFAULT_SHEET_COLUMNS,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+    ffmpeg_path: str = "ffmpeg",
+    ffprobe_path: str = "ffprobe",
+) -> ThumbSet:
+    """提取封面、缩略图和拼板，按视频内容摘要 + 参数缓存，重复执行直接返回缓存"""
+    cache = cache or thumbs_cache()
+    digest = file_digest(video_path)
+    key = thumbs_key(digest, count, width, cover_at, columns)
+
+    names = ["_cover.jpg", "_sheet.jpg"] + [f"_thumb{i:02d}.jpg" for i in range(1, count + 1)]
+    hits = [cache.get(key, name) for name in names]
+    if all(hits):
+        cache.put(cover_key(digest), hits[0], ".jpg", move=False)
+        return ThumbSet(cover=hits[0], sheet=hits[1], thumbnails=hits[2:])
+
+    info = probe(str(video_path), ffprobe_path)
+    if not info.has_video:
+        raise FFmpegError(f"没有视频流: {video_path}")
+
+    out_dir = Path(tempfile.mkdtemp(prefix="videoclaw-thumbs-"))
+    try:
+        run_ffmpeg(
+            build_thumbs_command(info, out_dir, count, width, cover_at, columns, ffmpeg_path),
+            timeout=timeout,
+        )
+        files = [out_dir / "cover.jpg", out_dir / "sheet.jpg"]
+        files += [out_dir / f"thumb_{i:02d}.jpg" for i in range(1, count + 1)]
+        stored = [cache.put(key, path, name) for path, name in zip(files, names)]
+        cache.put(cover_key(digest), stored[0], ".jpg", move=False)
+        # 刚写入的条目最新，淘汰时最后才会删到
+        cache.prune()
+        return ThumbSet(cover=stored[0], sheet=stored[1], thumbnails=stored[2:])
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def find_cover(
+    video_path: Path,
+    cache: Optional[ContentCache] = None,
+    generate: bool = True,
+) -> Optional[Path]:
+    """查找视频已缓存的封面，没有时按默认参数提取；失败返回 None"""
+    cache = cache or thumbs_cache()
+    try:
+        hit = cache.get(cover_key(file_digest(video_path)), ".jpg")
+        if hit is not None or not generate:
+            return hit
+        return extract_thumbs(video_path, cache=cache).cover
+    except (OSError, FFmpegError):
+        return None
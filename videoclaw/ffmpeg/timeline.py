@@ -0,0 +1,159 @@
+"""把时间线编译为一次 ffmpeg 调用：截取、拼接、xfade 转场和音频轨道混音"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from videoclaw.ffmpeg.graph import AUDIO, FilterGraph, Stream
+from videoclaw.ffmpeg.merge import MergeTarget, conform_audio, segment_audio
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.project.timeline import Gap, Timeline, TimelineClip, Transition
+
+# (视频, 音频, 时长, 与上一项之间的转场)
+_Segment = Tuple[Stream, Stream, float, Optional[Transition]]
+
+
+def item_durations(timeline: Timeline, media: Dict[str, MediaInfo]) -> List[float]:
+    """视频轨上每一项的实际时长（出点超出素材时按素材结尾计算）"""
+    durations = []
+    for item in timeline.clips:
+        if isinstance(item, Gap):
+            durations.append(item.duration)
+        else:
+            durations.append(item.duration(media[item.source].duration))
+    return durations
+
+
+def timeline_duration(timeline: Timeline, media: Dict[str, MediaInfo]) -> float:
+    """成片时长：各项时长之和减去转场重叠部分"""
+    total = sum(item_durations(timeline, media))
+    overlap = sum(item.transition.duration for item in timeline.clips[1:] if item.transition)
+    return max(0.0, total - overlap)
+
+
+def validate_timeline(timeline: Timeline, media: Dict[str, MediaInfo]) -> None:
+    """检查片段时长和转场，有问题时抛出 ValueError"""
+    if not timeline.clips:
+        raise ValueError("时间线为空")
+    durations = item_durations(timeline, media)
+    for i, (item, duration) in enumerate(zip(timeline.clips, durations)):
+        if duration <= 0:
+            raise ValueError(f"第 {i + 1} 项时长为 0，请检查入点和出点")
+        if item.transition is None:
+            continue
+        if i == 0:
+            raise ValueError("第 1 项前面没有内容，不能设置转场")
+        if item.transition.duration <= 0:
+            raise ValueError(f"第 {i + 1} 项的转场时长必须大于 0")
+        if item.transition.duration >= min(duration, durations[i - 1]):
+            raise ValueError(f"第 {i + 1} 项的转场时长超过了相邻片段的时长")
+
+
+def _gap_segment(graph: FilterGraph, gap: Gap, target: MergeTarget) -> Tuple[Stream, Stream]:
+    length = f"{gap.duration:.3f}"
+    video = (
+        graph.source("color", c="black", s=f"{target.width}x{target.height}", r=target.fps, d=length)
+        .format("yuv420p")
+        .filter("settb", "AVTB")
+        .fps(target.fps)
+    )
+    audio = graph.source("anullsrc", kind=AUDIO, r=target.sample_rate, cl="stereo").trim(duration=length)
+    return video, audio
+
+
+def _join(graph: FilterGraph, segments: Sequence[_Segment], target: MergeTarget) -> Tuple[Stream, Stream]:
+    """没有转场的相邻项用 concat 拼接，有转场处用 xfade / acrossfade 重叠"""
+    groups: List[List[_Segment]] = []
+    for segment in segments:
+        if segment[3] is None and groups:
+            groups[-1].append(segment)
+        else:
+            groups.append([segment])
+
+    video = audio = None
+    length = 0.0
+    for group in groups:
+        if len(group) == 1:
+            group_video, group_audio = group[0][0], group[0][1]
+        else:
+            group_video, group_audio = graph.concat([[v, a] for v, a, _, _ in group])
+            # concat 的输出不带帧率信息，xfade 要求恒定帧率
+            group_video = group_video.fps(target.fps)
+        group_length = sum(duration for _, _, duration, _ in group)
+        transition = group[0][3]
+        if video is None:
+            video, audio, length = group_video, group_audio, group_length
+            continue
+        offset = length - transition.duration
+        video = graph.filter(
+            "xfade", [video, group_video],
+            transition=transition.kind, duration=transition.duration, offset=f"{offset:.3f}",
+        )[0]
+        audio = graph.filter("acrossfade", [audio, group_audio], kinds=AUDIO, d=transition.duration)[0]
+        length += group_length - transition.duration
+    return video, audio
+
+
+def build_timeline_graph(
+    timeline: Timeline,
+    media: Dict[str, MediaInfo],
+    inputs: Dict[str, str],
+    output_path: Path,
+    target: MergeTarget,
+    resolve: Callable[[str], str] = str,
+    threads: int = 0,
+) -> FilterGraph:
+    """编译时间线
+
+    media 为每个视频素材的探测结果，inputs 为实际读取的文件（归一化后的缓存片段），
+    二者都以时间线中的 source 为键；resolve 把音频轨道的 source 转换为文件路径。
+    片段只在图内截取入点/出点，因此修改入点、出点或转场不需要重新归一化素材。
+    """
+    validate_timeline(timeline, media)
+    graph = FilterGraph()
+    reference = target.as_reference()
+
+    segments: List[_Segment] = []
+    for item, duration in zip(timeline.clips, item_durations(timeline, media)):
+        if isinstance(item, TimelineClip):
+            args = ["-ss", f"{item.in_point:.3f}"] if item.in_point else []
+            clip = graph.input(inputs[item.source], args=args + ["-t", f"{duration:.3f}"])
+            # 统一时间基并标记恒定帧率，xfade 要求两路输入一致
+            video = clip.video.filter("settb", "AVTB").reset_pts().fps(target.fps)
+            audio = segment_audio(clip, reference, target, duration)
+        else:
+            video, audio = _gap_segment(graph, item, target)
+        segments.append((video, audio, duration, item.transition))
+
+    video, audio = _join(graph, segments, target)
+    video = video.label("vout")
+
+    layers = []
+    for lane in timeline.audio_lanes:
+        for entry in lane.items:
+            args = ["-stream_loop", "-1"] if entry.loop else []
+            if entry.in_point:
+                args += ["-ss", f"{entry.in_point:.3f}"]
+            if entry.out_point is not None and not entry.loop:
+                args += ["-t", f"{entry.out_point - entry.in_point:.3f}"]
+            layer = conform_audio(graph.input(resolve(entry.source), args=args).audio, target)
+            layer = layer.volume(round(entry.volume * lane.volume, 4))
+            if entry.start > 0:
+                layer = layer.filter("adelay", delays=round(entry.start * 1000), all=1)
+            layers.append(layer)
+    if layers:
+        # 时长以视频轨的原声为准，循环的背景音乐在片尾截断
+        audio = graph.filter(
+            "amix", [audio] + layers, kinds=AUDIO,
+            inputs=len(layers) + 1, duration="first", dropout_transition=0, normalize=0,
+        )[0]
+    audio = audio.label("aout")
+
+    args = [
+        "-c:v", "libx264", "-preset", "fast", "-crf", "23", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k",
+    ]
+    if threads:
+        args += ["-threads", str(threads)]
+    graph.output(output_path, video, audio, args=args + ["-movflags", "+faststart"])
+    return graph
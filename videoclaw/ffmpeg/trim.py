@@ -0,0 +1,188 @@
+"""关键帧感知的快速截取：完整 GOP 流复制，只重新编码切点处不完整的 GOP"""
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from videoclaw.ffmpeg.chunked import build_join_command
+from videoclaw.ffmpeg.concat import AUDIO_ENCODERS, VIDEO_ENCODERS, concat_list_entry, match_encode_args
+from videoclaw.ffmpeg.parallel import resolve_jobs, run_parallel, threads_per_job
+from videoclaw.ffmpeg.probe import MediaInfo
+from videoclaw.ffmpeg.runner import Progress, run_ffmpeg
+
+# 时间比较的容差（秒），小于半帧
+EPSILON = 0.001
+
+
+@dataclass
+class TrimPlan:
+    """截取计划：每部分为 (起点, 终点) 秒，不需要时为 None"""
+    start: float
+    end: float
+    head: Optional[Tuple[float, float]] = None  # 切点到第一个关键帧，重新编码
+    copy: Optional[Tuple[float, float]] = None  # 完整 GOP，流复制
+    tail: Optional[Tuple[float, float]] = None  # 最后一个关键帧到出点，重新编码
+
+    @property
+    def copied(self) -> float:
+        return self.copy[1] - self.copy[0] if self.copy else 0.0
+
+    @property
+    def reencoded(self) -> float:
+        return sum(part[1] - part[0] for part in (self.head, self.tail) if part is not None)
+
+    @property
+    def parts(self) -> List[Tuple[str, Tuple[float, float]]]:
+        return [(name, span) for name, span in (("head", self.head), ("copy", self.copy), ("tail", self.tail)) if span]
+
+
+def plan_trim(info: MediaInfo, start: float, end: Optional[float] = None) -> TrimPlan:
+    """根据关键帧位置规划截取
+
+    区间内第一个关键帧之前、最后一个关键帧之后的部分重新编码，中间的完整 GOP 直接复制；
+    区间内没有完整 GOP（或没有关键帧信息、编码器无法复现）时整段重新编码。
+    """
+    end = info.duration if end is None else min(end, info.duration)
+    if end - start <= EPSILON:
+        raise ValueError(f"截取区间无效: {start:g}-{end:g} 秒（素材时长 {info.duration:g} 秒）")
+
+    plan = TrimPlan(start=start, end=end)
+    keyframes = info.keyframes if info.video_codec in VIDEO_ENCODERS else []
+    first = bisect.bisect_left(keyframes, start - EPSILON)
+    inside = [k for k in keyframes[first:] if k <= end + EPSILON]
+    if not inside:
+        plan.head = (start, end)
+        return plan
+    # 出点在素材结尾时，最后一个 GOP 也是完整的
+    copy_end = end if end >= info.duration - EPSILON else inside[-1]
+    if copy_end - inside[0] <= EPSILON:
+        plan.head = (start, end)
+        return plan
+
+    copy_start = inside[0]
+    if copy_start - start > EPSILON:
+        plan.head = (start, copy_start)
+    plan.copy = (copy_start, copy_end)
+    if end - copy_end > EPSILON:
+        plan.tail = (copy_end, end)
+    return plan
+
+
+def _frames(span: Tuple[float, float], fps: float) -> int:
+    return max(1, round((span[1] - span[0]) * fps))
+
+
+def edge_encode_args(info: MediaInfo, threads: int = 0) -> List[str]:
+    """重新编码切点部分的视频参数，与素材的码流参数一致才能和复制的 GOP 拼接"""
+    video_only = dataclasses.replace(info, audio_codec=None)
+    return match_encode_args(video_only, video_only, threads)
+
+
+def build_trim_commands(
+    info: MediaInfo,
+    plan: TrimPlan,
+    temp_dir: Path,
+    threads: int = 0,
+    ffmpeg_path: str = "ffmpeg",
+) -> Tuple[List[List[str]], List[Path], Optional[Path]]:
+    """构建各部分的命令，返回 (命令列表, 按顺序的视频部分, 音轨文件)"""
+    fps = info.fps_value or 24.0
+    commands = []
+    parts = []
+    for name, span in plan.parts:
+        path = temp_dir / f"{name}.mp4"
+        if name == "copy":
+            cmd = [ffmpeg_path, "-y", "-ss", f"{span[0]:.6f}", "-i", info.path]
+            if span[1] < info.duration - EPSILON:
+                # 按帧数截取：有 B 帧时按时间截取会多带出下一个 GOP 之前解码的帧
+                cmd += ["-frames:v", str(_frames(span, fps))]
+            cmd += ["-map", "0:v:0", "-c", "copy", "-an", "-avoid_negative_ts", "make_zero", str(path)]
+        else:
+            cmd = [ffmpeg_path, "-y", "-ss", f"{span[0]:.6f}", "-i", info.path]
+            cmd += ["-frames:v", str(_frames(span, fps))]
+            cmd += edge_encode_args(info, threads) + [str(path)]
+        commands.append(cmd)
+        parts.append(path)
+
+    audio_path = None
+    if info.has_audio:
+        audio_path = temp_dir / "audio.m4a"
+        encoder = AUDIO_ENCODERS.get(info.audio_codec, "aac")
+        cmd = [
+            ffmpeg_path, "-y", "-ss", f"{plan.start:.6f}", "-i", info.path,
+            "-t", f"{plan.end - plan.start:.6f}", "-map", "0:a:0", "-vn",
+            "-c:a", encoder, "-b:a", "128k",
+        ]
+        if info.sample_rate:
+            cmd += ["-ar", str(info.sample_rate)]
+        if info.channels:
+            cmd += ["-ac", str(info.channels)]
+        commands.append(cmd + [str(audio_path)])
+    return commands, parts, audio_path
+
+
+def build_video_mux_command(list_file: Path, output_path: Path, ffmpeg_path: str = "ffmpeg") -> List[str]:
+    """没有音轨时只拼接视频部分"""
+    return [
+        ffmpeg_path, "-y", "-f", "concat", "-safe", "0", "-i", str(list_file),
+        "-map", "0:v", "-c", "copy", "-movflags", "+faststart", str(output_path),
+    ]
+
+
+def smart_trim_many(
+    items: Sequence[Tuple[MediaInfo, float, Optional[float], Path]],
+    jobs: int = 0,
+    cpu_budget: Optional[int] = None,
+    timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[int, Progress], None]] = None,
+    temp_root: Optional[Path] = None,
+    ffmpeg_path: str = "ffmpeg",
+) -> List[TrimPlan]:
+    """批量截取 (素材, 入点, 出点, 输出路径)
+
+    所有片段的切点编码、GOP 复制和音轨编码在同一个进程池中执行，最后逐个流复制拼接。
+    返回每个片段的截取计划。
+    """
+    plans = [plan_trim(info, start, end) for info, start, end, _ in items]
+    total = sum(len(plan.parts) + info.has_audio for (info, _, _, _), plan in zip(items, plans))
+    workers = resolve_jobs(jobs, total, cpu_budget)
+    threads = threads_per_job(workers, cpu_budget)
+    temp_dir = Path(tempfile.mkdtemp(prefix="videoclaw-trim-", dir=temp_root))
+    try:
+        layouts = []
+        for i, ((info, _, _, _), plan) in enumerate(zip(items, plans)):
+            clip_dir = temp_dir / f"clip_{i:03d}"
+            clip_dir.mkdir()
+            layouts.append((clip_dir,) + build_trim_commands(info, plan, clip_dir, threads, ffmpeg_path))
+
+        commands = [cmd for _, clip_commands, _, _ in layouts for cmd in clip_commands]
+        run_parallel(commands, workers, budget=cpu_budget, on_progress=on_progress, timeout=timeout)
+
+        for (clip_dir, _, parts, audio_path), (_, _, _, output_path) in zip(layouts, items):
+            list_file = clip_dir / "parts.txt"
+            list_file.write_text("".join(concat_list_entry(path) for path in parts))
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            if audio_path is not None:
+                cmd = build_join_command(list_file, audio_path, output_path, ffmpeg_path)
+            else:
+                cmd = build_video_mux_command(list_file, output_path, ffmpeg_path)
+            run_ffmpeg(cmd, timeout=timeout)
+        return plans
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def smart_trim(
+    info: MediaInfo,
+    start: float,
+    end: Optional[float],
+    output_path: Path,
+    **kwargs,
+) -> TrimPlan:
+    """截取单个素材的 [start, end) 秒"""
+    return smart_trim_many([(info, start, end, output_path)], **kwargs)[0]
@@ -0,0 +1,24 @@
+"""媒体预处理模块"""
+from videoclaw.media.images import (
+    GEMINI_RULE,
+    SEEDANCE_RULE,
+    SEEDREAM_I2I_RULE,
+    ImageRule,
+    PreparedImage,
+    encode_optimized,
+    image_data_url,
+    prepare_image,
+    ssim,
+)
+
+__all__ = [
+    "GEMINI_RULE",
+    "SEEDANCE_RULE",
+    "SEEDREAM_I2I_RULE",
+    "ImageRule",
+    "PreparedImage",
+    "encode_optimized",
+    "image_data_url",
+    "prepare_image",
+    "ssim",
+]
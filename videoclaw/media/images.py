@@ -0,0 +1,284 @@
+"""参考图预处理：尺寸已符合要求时原样透传，需要缩放或体积过大时按目标 SSIM 选择格式和质量重新编码"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+from PIL import Image, ImageMath
+
+from videoclaw.utils.logging import get_logger
+
+logger = get_logger(name="media.images")
+
+# 可以原样上传的格式及其 MIME 类型（其余格式转码为 PNG）
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+# 有损格式，已经是这些格式的图片不再重新压缩（避免二次压缩损失）
+LOSSY_FORMATS = ("JPEG", "WEBP")
+
+# 尺寸符合要求但超过该大小的无损图片（通常是 PNG）也重新编码
+OPTIMIZE_MIN_BYTES = 512 * 1024
+
+# 重新编码时要求的最低 SSIM（亮度，8x8 块），在满足它的前提下选字节数最少的格式和质量
+TARGET_SSIM = 0.985
+
+# 依次尝试的质量（二分查找满足目标 SSIM 的最低质量）
+QUALITY_STEPS = (95, 90, 85, 80, 75, 70, 60, 50)
+
+# 计算 SSIM 前把图片缩小到的最大边长（只影响评估速度，不影响上传的图片）
+SSIM_MAX_SIDE = 1024
+
+# SSIM 常数：(K1*L)^2, (K2*L)^2，L=255
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+_SSIM_BLOCK = 8
+
+# data URL 缓存的总大小上限（字节），超出后淘汰最久未用的条目
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImageRule:
+    """服务商对参考图的要求：尺寸范围（0 表示不限制）和接受的格式"""
+    min_side: int = 0
+    min_pixels: int = 0
+    max_side: int = 0
+    formats: Tuple[str, ...] = ("JPEG", "PNG", "WEBP")
+
+
+# Seedance 图生视频：宽高均在 [300, 6000] 像素
+SEEDANCE_RULE = ImageRule(min_side=300, max_side=6000)
+
+# Seedream 图生图：至少 3686400 像素（约 1920x1920），边长不超过 6000
+SEEDREAM_I2I_RULE = ImageRule(min_pixels=3686400, max_side=6000)
+
+# Gemini：不限制尺寸，请求体总大小有上限，只做格式和体积优化
+GEMINI_RULE = ImageRule()
+
+
+@dataclass
+class PreparedImage:
+    """预处理结果：上传用的字节、MIME 类型和最终尺寸"""
+    data: bytes
+    mime: str
+    size: Tuple[int, int]
+    resized: bool = False
+    quality: Optional[int] = None
+    ssim: Optional[float] = None
+
+    @property
+    def format(self) -> str:
+        return next(fmt for fmt, mime in PASSTHROUGH_FORMATS.items() if mime == self.mime)
+
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+def target_size(size: Tuple[int, int], rule: ImageRule) -> Optional[Tuple[int, int]]:
+    """按规则计算目标尺寸（保持宽高比），已符合要求时返回 None"""
+    width, height = size
+    scale = 1.0
+    if rule.min_side and min(width, height) < rule.min_side:
+        scale = rule.min_side / min(width, height)
+    if rule.min_pixels and width * height * scale * scale < rule.min_pixels:
+        scale = (rule.min_pixels / (width * height)) ** 0.5
+    if rule.max_side and max(width, height) * scale > rule.max_side:
+        scale = rule.max_side / max(width, height)
+    if scale == 1.0:
+        return None
+    # 向上取整，避免放大后仍差一个像素达不到下限
+    return max(1, int(width * scale + 0.999)), max(1, int(height * scale + 0.999))
+
+
+def _luma(img: Image.Image, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """SSIM 评估用的亮度图（F 模式），宽高裁成 8 的倍数"""
+    gray = img.convert("L")
+    if size is None:
+        scale = min(1.0, SSIM_MAX_SIDE / max(gray.size))
+        size = (max(_SSIM_BLOCK, int(gray.width * scale)), max(_SSIM_BLOCK, int(gray.height * scale)))
+    if gray.size != size:
+        gray = gray.resize(size, Image.Resampling.BOX)
+    width, height = size[0] // _SSIM_BLOCK * _SSIM_BLOCK, size[1] // _SSIM_BLOCK * _SSIM_BLOCK
+    return gray.crop((0, 0, width, height)).convert("F")
+
+
+def ssim(reference: Image.Image, candidate: Image.Image) -> float:
+    """两张图亮度的平均 SSIM（8x8 不重叠窗口），只用 PIL，不依赖 numpy"""
+    x = _luma(reference)
+    return _ssim_luma(x, _luma(candidate, x.size))
+
+
+def _ssim_luma(x: Image.Image, y: Image.Image) -> float:
+    def mean(image: Image.Image) -> Image.Image:
+        # 每个 8x8 块的均值
+        return image.reduce(_SSIM_BLOCK)
+
+    def product(a: Image.Image, b: Image.Image) -> Image.Image:
+        return ImageMath.lambda_eval(lambda args: args["a"] * args["b"], a=a, b=b)
+
+    mx, my = mean(x), mean(y)
+    exx, eyy, exy = mean(product(x, x)), mean(product(y, y)), mean(product(x, y))
+    ssim_map = ImageMath.lambda_eval(
+        lambda a: ((a["mx"] * a["my"] * 2 + _C1) * ((a["exy"] - a["mx"] * a["my"]) * 2 + _C2))
+        / ((a["mx"] * a["mx"] + a["my"] * a["my"] + _C1)
+           * (a["exx"] - a["mx"] * a["mx"] + a["eyy"] - a["my"] * a["my"] + _C2)),
+        mx=mx, my=my, exx=exx, eyy=eyy, exy=exy,
+    )
+    # ImageStat 按直方图统计，不支持 F 模式；整图 BOX 缩到 1 像素即为均值
+    return ssim_map.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+
+
+def _has_transparency(img: Image.Image) -> bool:
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        alpha = img.convert("RGBA").getchannel("A")
+        return alpha.getextrema()[0] < 255
+    return False
+
+
+def _encode(img: Image.Image, fmt: str, quality: Optional[int] = None) -> bytes:
+    buffered = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(buffered, format="JPEG", quality=quality, optimize=True)
+    elif fmt == "WEBP":
+        img.save(buffered, format="WEBP", quality=quality, method=4)
+    else:
+        # optimize=True 对数百万像素的图片要多花十倍以上时间，收益只有 10% 左右
+        img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def encode_optimized(
+    img: Image.Image,
+    formats: Sequence[str] = LOSSY_FORMATS,
+    target_ssim: float = TARGET_SSIM,
+) -> PreparedImage:
+    """在 formats 允许的格式中选字节数最少、且 SSIM 不低于 target_ssim 的编码
+
+    每种有损格式按 QUALITY_STEPS 二分查找满足目标的最低质量；都达不到目标（或有透明通道
+    又不能用 WebP）时用无损 PNG。
+    """
+    alpha = _has_transparency(img)
+    img = img.convert("RGBA" if alpha else ("L" if img.mode in ("1", "L") else "RGB"))
+    reference = _luma(img)
+
+    best: Optional[PreparedImage] = None
+    for fmt in (f for f in LOSSY_FORMATS if f in formats):
+        if fmt == "JPEG" and alpha:
+            continue
+        lo, hi, found = 0, len(QUALITY_STEPS) - 1, None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            data = _encode(img, fmt, QUALITY_STEPS[mid])
+            score = _ssim_luma(reference, _luma(Image.open(io.BytesIO(data)), reference.size))
+            if score >= target_ssim:
+                found = (data, QUALITY_STEPS[mid], score)
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        if found is not None and (best is None or len(found[0]) < len(best.data)):
+            best = PreparedImage(
+                data=found[0], mime=PASSTHROUGH_FORMATS[fmt], size=img.size, quality=found[1], ssim=found[2]
+            )
+    if best is None:
+        best = PreparedImage(
+            data=_encode(img, "PNG"), mime=PASSTHROUGH_FORMATS["PNG"], size=img.size, ssim=1.0
+        )
+    return best
+
+
+def prepare_image(
+    data: bytes,
+    rule: ImageRule = ImageRule(),
+    target_ssim: float = TARGET_SSIM,
+) -> PreparedImage:
+    """按规则预处理图片
+
+    Image.open 只读取文件头，格式和尺寸都符合要求、且不是过大的无损图片时直接返回原始字节，
+    不解码也不重新编码。JPEG 缩小时用 draft() 让解码器按 1/2、1/4、1/8 直接输出低分辨率，
+    再精确缩放。需要重新编码时由 encode_optimized 选择格式和质量。
+    """
+    img = Image.open(io.BytesIO(data))
+    fmt = img.format or ""
+    size = target_size(img.size, rule)
+    if size is None and fmt in PASSTHROUGH_FORMATS and fmt in rule.formats:
+        if fmt in LOSSY_FORMATS or len(data) <= OPTIMIZE_MIN_BYTES:
+            logger.debug(f"参考图原样上传: {fmt} {img.width}x{img.height} {len(data) / 1e3:.0f} KB")
+            return PreparedImage(data=data, mime=PASSTHROUGH_FORMATS[fmt], size=img.size)
+
+    original = img.size
+    if size is not None:
+        if fmt == "JPEG" and size[0] < img.width:
+            img.draft(img.mode, size)
+        img = img.resize(size, Image.Resampling.LANCZOS)
+        logger.info(f"图片尺寸已调整: {img.width}x{img.height} (原始: {original[0]}x{original[1]})")
+
+    prepared = encode_optimized(img, rule.formats, target_ssim)
+    prepared.resized = size is not None
+    quality = f" q{prepared.quality}" if prepared.quality else ""
+    logger.info(
+        f"参考图编码: {fmt or '未知'} {len(data) / 1e3:.0f} KB → {prepared.format}{quality} "
+        f"{len(prepared.data) / 1e3:.0f} KB (SSIM {prepared.ssim:.3f})"
+    )
+    return prepared
+
+
+class _DataUrlCache:
+    """进程内 LRU 缓存：(内容摘要, 规则) → data URL，同一参考图在多个镜头间只编码一次"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[tuple, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: str) -> None:
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+
+_cache = _DataUrlCache()
+
+
+def image_data_url(data: bytes, rule: ImageRule = ImageRule(), target_ssim: float = TARGET_SSIM) -> str:
+    """预处理图片并编码为 base64 data URL，相同内容、规则和目标 SSIM 命中缓存"""
+    key = (hashlib.sha256(data).hexdigest(), rule, target_ssim)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    url = prepare_image(data, rule, target_ssim).data_url()
+    _cache.put(key, url)
+    return url
+
+
+def clear_cache() -> None:
+    """清空 data URL 缓存"""
+    _cache.clear()
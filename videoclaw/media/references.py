@@ -0,0 +1,193 @@
+"""参考视频/音频压缩：上传前转成模型够用的最小形式（限制分辨率、帧率和时长，单声道低码率音频）
+
+压缩结果按源文件内容摘要缓存在 ~/.videoclaw/cache/references（容量上限为 cache.max_size），
+多个镜头引用同一素材时只转码一次。
+"""
+from __future__ import annotations
+
+import base64
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+from videoclaw.cache import ContentCache, configured_max_bytes, file_digest
+from videoclaw.ffmpeg.processor import FFmpegError
+from videoclaw.ffmpeg.runner import run_ffmpeg
+from videoclaw.utils.logging import get_logger
+from videoclaw.utils.payload import Base64File
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = get_logger(name="media.references")
+
+# 缓存目录名（~/.videoclaw/cache/references）
+CACHE_NAME = "references"
+
+# 参考素材只取开头这段（秒），模型只看短参考片段
+MAX_REFERENCE_SECONDS = 15
+
+# 视频参考：短边上限、帧率上限和编码质量，每秒一个关键帧
+MAX_VIDEO_SHORT_SIDE = 480
+MAX_VIDEO_FPS = 24
+VIDEO_CRF = 30
+
+# 音频统一转为单声道低码率
+AUDIO_BITRATE = "64k"
+VIDEO_AUDIO_BITRATE = "48k"
+
+# 压缩参数变化时递增，使旧缓存失效
+REFERENCE_VERSION = "1"
+
+# 各类参考压缩后的扩展名和 MIME 类型
+_OUTPUT = {"video": (".mp4", "video/mp4"), "audio": (".mp3", "audio/mp3")}
+
+
+@dataclass
+class CompactedReference:
+    """压缩后的参考素材；压缩没有变小或失败时 path 就是源文件"""
+    source: Path
+    path: Path
+    kind: str
+    original_bytes: int
+    cached: bool = False
+
+    @property
+    def bytes(self) -> int:
+        return self.path.stat().st_size
+
+    @property
+    def mime(self) -> str:
+        return _OUTPUT[self.kind][1]
+
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{base64.b64encode(self.path.read_bytes()).decode('ascii')}"
+
+
+def build_video_reference_command(source: Path, output_path: Path, ffmpeg_path: str = "ffmpeg") -> List[str]:
+    """截取开头、短边缩到上限以内（不放大）、限制帧率，1 秒 GOP，单声道低码率音频"""
+    side = MAX_VIDEO_SHORT_SIDE
+    return [
+        ffmpeg_path, "-y", "-i", str(source), "-t", str(MAX_REFERENCE_SECONDS),
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", f"scale='if(gte(iw,ih),-2,min(iw,{side}))':'if(gte(iw,ih),min(ih,{side}),-2)'",
+        "-fpsmax", str(MAX_VIDEO_FPS),
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", str(VIDEO_CRF), "-pix_fmt", "yuv420p",
+        "-g", str(MAX_VIDEO_FPS), "-keyint_min", str(MAX_VIDEO_FPS),
+        "-c:a", "aac", "-ac", "1", "-b:a", VIDEO_AUDIO_BITRATE,
+        "-movflags", "+faststart",
+        str(output_path),
+    ]
+
+
+def build_audio_reference_command(source: Path, output_path: Path, ffmpeg_path: str = "ffmpeg") -> List[str]:
+    """截取开头，转为单声道低码率 MP3"""
+    return [
+        ffmpeg_path, "-y", "-i", str(source), "-t", str(MAX_REFERENCE_SECONDS),
+        "-map", "0:a:0", "-vn",
+        "-c:a", "libmp3lame", "-ac", "1", "-b:a", AUDIO_BITRATE,
+        str(output_path),
+    ]
+
+
+def reference_key(digest: str, kind: str) -> str:
+    if kind == "video":
+        params = [str(MAX_REFERENCE_SECONDS), str(MAX_VIDEO_SHORT_SIDE), str(MAX_VIDEO_FPS), str(VIDEO_CRF)]
+    else:
+        params = [str(MAX_REFERENCE_SECONDS), AUDIO_BITRATE]
+    return ContentCache.make_key(digest, "reference", kind, *params, REFERENCE_VERSION)
+
+
+def peak_rss() -> Optional[int]:
+    """本进程和已结束子进程（ffmpeg）中较大的峰值常驻内存（字节），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux 单位是 KB，macOS 是字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def compact_reference(
+    source: Union[str, Path],
+    kind: str,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+    ffmpeg_path: str = "ffmpeg",
+) -> CompactedReference:
+    """压缩一个参考视频（kind="video"）或音频（kind="audio"），按内容摘要缓存
+
+    压缩结果不比源文件小时缓存源文件的副本；FFmpeg 不可用或转码失败时直接使用源文件。
+    """
+    if kind not in _OUTPUT:
+        raise ValueError(f"未知的参考类型: {kind}")
+    source = Path(source)
+    original_bytes = source.stat().st_size
+    suffix = _OUTPUT[kind][0]
+    cache = cache or ContentCache.global_cache(CACHE_NAME, configured_max_bytes())
+    key = reference_key(file_digest(source), kind)
+    hit = cache.get(key, suffix)
+    if hit is not None:
+        return CompactedReference(source, hit, kind, original_bytes, cached=True)
+
+    build = build_video_reference_command if kind == "video" else build_audio_reference_command
+    temp_dir = Path(tempfile.mkdtemp(prefix="videoclaw-ref-"))
+    try:
+        output = temp_dir / f"reference{suffix}"
+        try:
+            run_ffmpeg(build(source, output, ffmpeg_path), timeout=timeout)
+        except FFmpegError as e:
+            logger.warning(f"参考素材压缩失败，上传原文件: {source.name}: {e}")
+            return CompactedReference(source, source, kind, original_bytes)
+        if output.stat().st_size >= original_bytes and source.suffix.lower() == suffix:
+            stored = cache.put(key, source, suffix, move=False)
+        else:
+            stored = cache.put(key, output, suffix)
+        # 按 cache.max_size 淘汰最久未用的条目，刚写入的这一条保留
+        cache.prune(keep=[stored])
+        return CompactedReference(source, stored, kind, original_bytes)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _log_reference(ref: CompactedReference, payload_bytes: int) -> None:
+    rss = peak_rss()
+    logger.info(
+        f"参考{'视频' if ref.kind == 'video' else '音频'}: {ref.source.name} "
+        f"{ref.original_bytes / 1e6:.1f} MB → {ref.bytes / 1e6:.2f} MB"
+        f"{'（缓存）' if ref.cached else ''}，data URL {payload_bytes / 1e6:.2f} MB"
+        + (f"，峰值内存 {rss / 1e6:.0f} MB" if rss else "")
+    )
+
+
+def reference_data_url(
+    source: Union[str, Path],
+    kind: str,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    """压缩参考素材并编码为 data URL，记录压缩前后大小和峰值内存"""
+    ref = compact_reference(source, kind, cache, timeout)
+    url = ref.data_url()
+    _log_reference(ref, len(url))
+    return url
+
+
+def reference_part(
+    source: Union[str, Path],
+    kind: str,
+    cache: Optional[ContentCache] = None,
+    timeout: Optional[float] = None,
+) -> Base64File:
+    """压缩参考素材，返回发送时才读取编码的 data URL（用于流式请求体）"""
+    ref = compact_reference(source, kind, cache, timeout)
+    part = Base64File(ref.path, ref.mime)
+    _log_reference(ref, part.encoded_length())
+    return part
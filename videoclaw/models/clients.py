@@ -0,0 +1,54 @@
+"""SDK 客户端注册表：同一 (provider, region, api_key) 在进程内只创建一个客户端，复用其连接池"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, str, str], Any] = {}
+
+
+def _key(provider: str, region: Optional[str], api_key: str) -> Tuple[str, str, str]:
+    # 只保存 api_key 的摘要，注册表里不留明文
+    return provider, region or "", hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def get_client(provider: str, region: Optional[str], api_key: str, factory: Callable[[], Any]) -> Any:
+    """返回已注册的客户端，不存在时调用 factory 创建并注册"""
+    key = _key(provider, region, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def ark_base_url(region: str) -> str:
+    return f"https://ark.{region}.volces.com/api/v3"
+
+
+def ark_client(region: str, api_key: str) -> Any:
+    """火山方舟 Ark 客户端（Seedream、Seedance 共用）"""
+    from volcenginesdkarkruntime import Ark
+
+    return get_client(
+        "volcengine", region, api_key,
+        lambda: Ark(base_url=ark_base_url(region), api_key=api_key),
+    )
+
+
+def genai_client(api_key: str) -> Any:
+    """Google Gen AI 客户端"""
+    def create():
+        from google import genai
+        return genai.Client(api_key=api_key)
+
+    return get_client("gemini", None, api_key, create)
+
+
+def clear_clients() -> None:
+    """清空注册表（测试或切换凭证后使用）"""
+    with _lock:
+        _clients.clear()
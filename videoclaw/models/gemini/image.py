@@ -8,7 +8,9 @@ import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from videoclaw.media.images import GEMINI_RULE, prepare_image
 from videoclaw.models.base import GenerationResult, ImageBackend
+from videoclaw.models.clients import genai_client
 from videoclaw.utils.logging import get_logger
 
 logger = get_logger(name="gemini.image")
@@ -57,9 +59,7 @@ class GeminiImageBackend(ImageBackend):
     def client(self):
         """Lazy-loaded Google Generative AI client"""
         if self._client is None:
-            from google import genai
-
-            self._client = genai.Client(api_key=self.api_key)
+            self._client = genai_client(self.api_key)
         return self._client
 
     def _extract_image_from_response(self, response) -> Optional[bytes]:
@@ -133,9 +133,10 @@ class GeminiImageBackend(ImageBackend):
         try:
             from google.genai import types
 
-            # 构建多模态内容
+            # 构建多模态内容（过大的无损图片按目标 SSIM 重新编码，MIME 类型与实际格式一致）
+            prepared = prepare_image(image, GEMINI_RULE)
             contents = [
-                types.Part.from_bytes(data=image, mime_type="image/png"),
+                types.Part.from_bytes(data=prepared.data, mime_type=prepared.mime),
                 types.Part.from_text(text=prompt)
             ]
 
@@ -4,12 +4,17 @@ from __future__ import annotations
 import hashlib
 import time
 from pathlib import Path
-from typing import Any, Dict
-
-from volcenginesdkarkruntime import Ark
+from typing import Any, Dict, Union
 
+from videoclaw.cache import file_digest
+from videoclaw.media.images import SEEDANCE_RULE, TARGET_SSIM, image_data_url, prepare_image
+from videoclaw.media.references import compact_reference, reference_key, reference_part
 from videoclaw.models.base import GenerationResult, VideoBackend
+from videoclaw.models.clients import ark_base_url, ark_client
+from videoclaw.storage.references import get_reference_store, reference_store_settings
+from videoclaw.utils.download import download
 from videoclaw.utils.logging import get_logger
+from videoclaw.utils.payload import Base64File, post_json
 
 logger = get_logger(name="volcengine.seedance")
 
@@ -37,10 +42,10 @@ class VolcEngineSeedance(VideoBackend):
                 "Set via config or environment variable ARK_API_KEY"
             )
 
-        self.client = Ark(
-            base_url=f"https://ark.{self.region}.volces.com/api/v3",
-            api_key=self.api_key,
-        )
+        # 同一区域和密钥的后端共用一个客户端
+        self.client = ark_client(self.region, self.api_key)
+        # 配置了 storage.references 时参考素材只上传一次，之后的镜头传 URL
+        self.reference_store = get_reference_store(reference_store_settings(config))
 
     def image_to_video(
         self,
@@ -59,30 +64,6 @@ class VolcEngineSeedance(VideoBackend):
         local_path = Path.home() / "videoclaw-projects" / "temp" / filename
         local_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # 将图片转换为 base64 data URL
-        import base64
-        import io
-        from PIL import Image
-
-        # 处理多图输入
-        def process_image(image_bytes: bytes) -> str:
-            """将图片字节转换为 base64 data URL"""
-            img = Image.open(io.BytesIO(image_bytes))
-            # 确保图片宽度至少 300px（API 要求）
-            min_size = 300
-            if img.width < min_size or img.height < min_size:
-                # 放大图片
-                scale = max(min_size / img.width, min_size / img.height)
-                new_size = (int(img.width * scale), int(img.height * scale))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-                logger.info(f"图片尺寸已调整: {img.width}x{img.height}")
-            buffered = io.BytesIO()
-            img_format = img.format or "PNG"
-            img.save(buffered, format=img_format)
-            img_bytes = buffered.getvalue()
-            b64_img = base64.b64encode(img_bytes).decode('utf-8')
-            return f"data:image/{img_format.lower()};base64,{b64_img}"
-
         # 标准化 images 为列表
         if isinstance(images, bytes):
             image_list = [images]
@@ -92,50 +73,37 @@ class VolcEngineSeedance(VideoBackend):
         # 构建 content 列表
         content = [{"type": "text", "text": prompt}]
 
-        # 添加图片
+        # 添加图片（宽高需至少 300px；已符合要求的图片原样上传，编码结果按内容缓存）
         for img_bytes in image_list:
-            data_url = process_image(img_bytes)
-            content.append({"type": "image_url", "image_url": {"url": data_url}})
-
-        # 添加视频参考
-        if video_refs:
-            for video_path in video_refs:
-                with open(video_path, "rb") as f:
-                    video_data = f.read()
-                b64_video = base64.b64encode(video_data).decode('utf-8')
-                # 视频使用 data URL 格式
-                content.append({
-                    "type": "video_url",
-                    "video_url": {"url": f"data:video/mp4;base64,{b64_video}"}
-                })
-
-        # 添加音频参考
-        if audio_refs:
-            for audio_path in audio_refs:
-                with open(audio_path, "rb") as f:
-                    audio_data = f.read()
-                b64_audio = base64.b64encode(audio_data).decode('utf-8')
-                # 音频使用 data URL 格式
-                content.append({
-                    "type": "audio_url",
-                    "audio_url": {"url": f"data:audio/mp3;base64,{b64_audio}"}
-                })
+            content.append({"type": "image_url", "image_url": {"url": self._image_url(img_bytes)}})
+
+        # 添加视频/音频参考（先在本地压缩为低分辨率短片段和单声道音频，按内容缓存；
+        # 内联时发送才从缓存文件分块编码，不在内存中生成 data URL）
+        refs = []
+        for kind, paths in (("video", video_refs), ("audio", audio_refs)):
+            for path in paths or []:
+                url = self._reference_url(path, kind)
+                refs.append(url)
+                content.append({"type": f"{kind}_url", f"{kind}_url": {"url": url}})
+
+        options = {
+            "ratio": kwargs.get("ratio", "16:9"),
+            # resolution 参数仅在文生视频时有效，图生视频时不传
+            "duration": kwargs.get("duration", 5),
+            "watermark": kwargs.get("watermark", False),
+            "generate_audio": kwargs.get("generate_audio", False),
+        }
 
         try:
             # Step 1: 创建异步任务 (使用 base64 data URL)
             logger.debug(f"创建视频生成任务，model: {self.model}")
-            response = self.client.content_generation.tasks.create(
-                model=self.model,
-                content=content,
-                ratio=kwargs.get("ratio", "16:9"),
-                # resolution 参数仅在文生视频时有效，图生视频时不传
-                # resolution=kwargs.get("resolution"),
-                duration=kwargs.get("duration", 5),
-                watermark=kwargs.get("watermark", False),
-                generate_audio=kwargs.get("generate_audio", False),
-            )
-
-            task_id = response.id
+            if any(isinstance(url, Base64File) for url in refs):
+                task_id = self._create_task_streaming(content, options, gzip=kwargs.get("gzip_body", False))
+            else:
+                response = self.client.content_generation.tasks.create(
+                    model=self.model, content=content, **options
+                )
+                task_id = response.id
             logger.info(f"视频生成任务已创建，task_id: {task_id}")
 
             # Step 2: 轮询等待任务完成
@@ -153,9 +121,7 @@ class VolcEngineSeedance(VideoBackend):
                     # 下载视频
                     video_url = task.content.video_url
                     logger.info(f"视频生成成功，下载视频...")
-                    import requests
-                    video_data = requests.get(video_url).content
-                    local_path.write_bytes(video_data)
+                    download(video_url, local_path)
 
                     return GenerationResult(
                         local_path=local_path,
@@ -182,3 +148,48 @@ class VolcEngineSeedance(VideoBackend):
         except Exception as e:
             logger.error(f"视频生成异常: {e}")
             raise
+
+    def _image_url(self, image: bytes) -> str:
+        """图片的 URL：配置了参考素材存储时上传一次后复用，否则为内联 data URL"""
+        if self.reference_store is None:
+            return image_data_url(image, SEEDANCE_RULE)
+        key = f"{hashlib.sha256(image).hexdigest()}:image:{SEEDANCE_RULE!r}:{TARGET_SSIM}"
+
+        def produce():
+            prepared = prepare_image(image, SEEDANCE_RULE)
+            return prepared.data, prepared.mime
+
+        try:
+            return self.reference_store.url_for(key, produce)
+        except Exception as e:
+            # 上传失败不影响生成，退回内联
+            logger.warning(f"参考图上传失败，改为内联: {e}")
+            return image_data_url(image, SEEDANCE_RULE)
+
+    def _reference_url(self, path: str, kind: str) -> Union[str, Base64File]:
+        """视频/音频参考的 URL，未配置存储或上传失败时返回流式内联的 data URL"""
+        if self.reference_store is not None:
+            # 与压缩缓存同一个键，压缩参数变化时不会复用旧的上传
+            key = reference_key(file_digest(path), kind)
+
+            def produce():
+                ref = compact_reference(path, kind)
+                return ref.path, ref.mime
+
+            try:
+                return self.reference_store.url_for(key, produce)
+            except Exception as e:
+                logger.warning(f"参考素材上传失败，改为内联: {e}")
+        return reference_part(path, kind)
+
+    def _create_task_streaming(self, content: list, options: Dict[str, Any], gzip: bool = False) -> str:
+        """绕过 SDK 直接 POST 创建任务，请求体流式生成（参考素材发送时才读取编码）"""
+        response = post_json(
+            f"{ark_base_url(self.region)}/contents/generations/tasks",
+            {"model": self.model, "content": content, **options},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            gzip=gzip,
+        )
+        if response.status_code >= 400:
+            raise RuntimeError(f"Video generation failed: HTTP {response.status_code}: {response.text[:500]}")
+        return response.json()["id"]
@@ -6,9 +6,10 @@ import time
 from pathlib import Path
 from typing import Any, Dict
 
-from volcenginesdkarkruntime import Ark
-
+from videoclaw.media.images import SEEDREAM_I2I_RULE, image_data_url
 from videoclaw.models.base import GenerationResult, ImageBackend
+from videoclaw.models.clients import ark_client
+from videoclaw.utils.download import download
 from videoclaw.utils.logging import get_logger
 
 logger = get_logger(name="volcengine.seedream")
@@ -38,11 +39,8 @@ class VolcEngineSeedream(ImageBackend):
                 "Set via config or environment variable ARK_API_KEY"
             )
 
-        # 初始化 SDK
-        self.client = Ark(
-            base_url=f"https://ark.{self.region}.volces.com/api/v3",
-            api_key=self.api_key,
-        )
+        # 初始化 SDK，同一区域和密钥的后端共用一个客户端
+        self.client = ark_client(self.region, self.api_key)
 
     def text_to_image(self, prompt: str, **kwargs) -> GenerationResult:
         logger.info(f"开始生成图片，prompt: {prompt[:50]}...")
@@ -66,9 +64,7 @@ class VolcEngineSeedream(ImageBackend):
 
             # 下载图片
             image_url = response.data[0].url
-            import requests
-            image_data = requests.get(image_url).content
-            local_path.write_bytes(image_data)
+            download(image_url, local_path)
 
             logger.info(f"图片生成成功: {local_path}")
         except Exception as e:
@@ -88,27 +84,8 @@ class VolcEngineSeedream(ImageBackend):
     def image_to_image(self, image: bytes, prompt: str, **kwargs) -> GenerationResult:
         logger.info(f"开始图生图，prompt: {prompt[:50]}...")
 
-        # 将图片转换为 base64 data URL
-        import base64
-        import io
-        from PIL import Image
-
-        img = Image.open(io.BytesIO(image))
-        # 确保图片尺寸足够（图生图要求至少 3686400 像素 ≈ 1920x1920）
-        min_pixels = 3686400
-        current_pixels = img.width * img.height
-        if current_pixels < min_pixels:
-            scale = (min_pixels / current_pixels) ** 0.5
-            new_size = (int(img.width * scale), int(img.height * scale))
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
-            logger.info(f"图片尺寸已调整: {img.width}x{img.height} (原始: {img.width // scale:.0f}x{img.height // scale:.0f})")
-
-        buffered = io.BytesIO()
-        img_format = img.format or "PNG"
-        img.save(buffered, format=img_format)
-        img_bytes = buffered.getvalue()
-        b64_img = base64.b64encode(img_bytes).decode('utf-8')
-        data_url = f"data:image/{img_format.lower()};base64,{b64_img}"
+        # 将图片转换为 base64 data URL（图生图要求至少 3686400 像素 ≈ 1920x1920）
+        data_url = image_data_url(image, SEEDREAM_I2I_RULE)
 
         try:
             response = self.client.images.generate(
@@ -122,15 +99,12 @@ class VolcEngineSeedream(ImageBackend):
 
             # 下载结果图片
             image_url = response.data[0].url
-            import requests
-            image_data = requests.get(image_url).content
 
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             hash_suffix = hashlib.md5(prompt.encode()).hexdigest()[:6]
             filename = f"seedream_i2i_{timestamp}_{hash_suffix}.png"
             local_path = Path.home() / "videoclaw-projects" / "temp" / filename
-            local_path.parent.mkdir(parents=True, exist_ok=True)
-            local_path.write_bytes(image_data)
+            download(image_url, local_path)
 
             logger.info(f"图生图成功: {local_path}")
             return GenerationResult(
@@ -0,0 +1,5 @@
+"""项目级状态文件（.videoclaw/*.json）"""
+from videoclaw.project.renders import RenderLog
+from videoclaw.project.timeline import Timeline
+
+__all__ = ["RenderLog", "Timeline"]
@@ -0,0 +1,74 @@
+"""成片记录：.videoclaw/renders.json"""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from videoclaw.project.files import read_json, write_json
+
+RENDERS_FILE = "renders.json"
+
+
+def file_fingerprint(path: Path) -> Optional[Dict[str, int]]:
+    """文件大小和修改时间，用于判断成片在上次渲染后是否被替换或修改"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class RenderLog:
+    """记录项目中生成过的成片及其画幅版本，按输出文件路径索引"""
+
+    def __init__(self, path: Path, project_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.project_path = Path(project_path) if project_path else None
+
+    @classmethod
+    def for_project(cls, project_path: Path) -> "RenderLog":
+        return cls(project_path / ".videoclaw" / RENDERS_FILE, project_path)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """读取全部记录，文件不存在或损坏时返回空字典"""
+        data = read_json(self.path)
+        return data.get("renders", {}) if isinstance(data, dict) else {}
+
+    def get(self, output: Path) -> Optional[Dict[str, Any]]:
+        return self.load().get(self.key(output))
+
+    def record(self, output: Path, **fields: Any) -> Dict[str, Any]:
+        """写入或更新一条成片记录"""
+        renders = self.load()
+        entry = dict(renders.get(self.key(output), {}))
+        entry.update(fields)
+        entry["path"] = self.key(output)
+        entry["rendered_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        renders[entry["path"]] = entry
+        write_json(self.path, {"renders": renders})
+        return entry
+
+    def changed_sections(self, output: Path, manifest: Dict[str, Any]) -> Optional[List[str]]:
+        """与上次渲染记录的输入清单（manifest）比较，返回内容有变化的部分（如 ["audio"]）
+
+        没有记录、记录中没有清单，或成片在渲染后被删除、修改时返回 None，表示需要完整渲染。
+        """
+        entry = self.get(output)
+        if not entry or not isinstance(entry.get("manifest"), dict):
+            return None
+        if entry.get("fingerprint") is None or entry["fingerprint"] != file_fingerprint(output):
+            return None
+        previous = entry["manifest"]
+        return [name for name in manifest if previous.get(name) != manifest[name]]
+
+    def key(self, output: Path) -> str:
+        """项目内的文件用相对路径，便于项目整体移动"""
+        output = Path(output).resolve()
+        if self.project_path is not None:
+            try:
+                return output.relative_to(self.project_path.resolve()).as_posix()
+            except ValueError:
+                pass
+        return str(output)
@@ -0,0 +1,217 @@
+"""时间线：.videoclaw/timeline.json
+
+视频轨由片段（带入点/出点）和空白组成，相邻两项之间可以有 xfade 转场；
+音频轨道在片段原声之上按时间点叠加背景音乐、配音等。
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from videoclaw.project.files import read_json, write_json
+
+TIMELINE_FILE = "timeline.json"
+TIMELINE_VERSION = 1
+
+# 文本分镜中的镜头标题与时间段，如 【拔剑】（4-8秒）
+SHOT_PATTERN = re.compile(
+    r"【([^】]+)】\s*[（(]\s*(\d+(?:\.\d+)?)\s*[-–~～至]\s*(\d+(?:\.\d+)?)\s*[秒sS]\s*[）)]"
+)
+
+
+@dataclass
+class Transition:
+    """与上一项之间的转场，kind 为 ffmpeg xfade 的 transition 名称"""
+    kind: str = "fade"
+    duration: float = 0.5
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.kind, "duration": self.duration}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Transition":
+        return cls(kind=data.get("type", "fade"), duration=float(data.get("duration", 0.5)))
+
+
+@dataclass
+class TimelineClip:
+    """视频轨上的一个片段，out_point 为 None 时播放到素材结尾"""
+    source: str
+    in_point: float = 0.0
+    out_point: Optional[float] = None
+    name: str = ""
+    transition: Optional[Transition] = None
+
+    def duration(self, source_duration: float) -> float:
+        end = source_duration if self.out_point is None else min(self.out_point, source_duration)
+        return max(0.0, end - self.in_point)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"source": self.source, "in": self.in_point, "out": self.out_point}
+        if self.name:
+            data["name"] = self.name
+        if self.transition:
+            data["transition"] = self.transition.to_dict()
+        return data
+
+
+@dataclass
+class Gap:
+    """视频轨上的空白（黑场 + 静音）"""
+    duration: float
+    transition: Optional[Transition] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"gap": self.duration}
+        if self.transition:
+            data["transition"] = self.transition.to_dict()
+        return data
+
+
+TrackItem = Union[TimelineClip, Gap]
+
+
+@dataclass
+class AudioItem:
+    """音频轨道上的一段，从时间线的 start 秒开始播放"""
+    source: str
+    start: float = 0.0
+    in_point: float = 0.0
+    out_point: Optional[float] = None
+    volume: float = 1.0
+    loop: bool = False  # 循环播放直到时间线结束
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"source": self.source, "start": self.start, "in": self.in_point}
+        if self.out_point is not None:
+            data["out"] = self.out_point
+        if self.volume != 1.0:
+            data["volume"] = self.volume
+        if self.loop:
+            data["loop"] = True
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AudioItem":
+        out = data.get("out")
+        return cls(
+            source=data["source"],
+            start=float(data.get("start", 0.0)),
+            in_point=float(data.get("in", 0.0)),
+            out_point=None if out is None else float(out),
+            volume=float(data.get("volume", 1.0)),
+            loop=bool(data.get("loop", False)),
+        )
+
+
+@dataclass
+class AudioLane:
+    """一条音频轨道（如 bgm、配音），volume 作用于整条轨道"""
+    name: str
+    items: List[AudioItem] = field(default_factory=list)
+    volume: float = 1.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "volume": self.volume, "items": [i.to_dict() for i in self.items]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AudioLane":
+        return cls(
+            name=data.get("name", ""),
+            items=[AudioItem.from_dict(i) for i in data.get("items", [])],
+            volume=float(data.get("volume", 1.0)),
+        )
+
+
+@dataclass
+class Shot:
+    """文本分镜中的一个镜头"""
+    title: str
+    start: float
+    end: float
+
+
+def parse_storyboard(text: str) -> List[Shot]:
+    """提取文本分镜中所有 【标题】（X-Y秒） 格式的镜头"""
+    shots = []
+    for match in SHOT_PATTERN.finditer(text):
+        start, end = float(match.group(2)), float(match.group(3))
+        if end > start:
+            shots.append(Shot(title=match.group(1).strip(), start=start, end=end))
+    return shots
+
+
+def _item_from_dict(data: Dict[str, Any]) -> TrackItem:
+    transition = Transition.from_dict(data["transition"]) if data.get("transition") else None
+    if "gap" in data:
+        return Gap(duration=float(data["gap"]), transition=transition)
+    out = data.get("out")
+    return TimelineClip(
+        source=data["source"],
+        in_point=float(data.get("in", 0.0)),
+        out_point=None if out is None else float(out),
+        name=data.get("name", ""),
+        transition=transition,
+    )
+
+
+@dataclass
+class Timeline:
+    """项目时间线，素材路径相对于项目目录"""
+    clips: List[TrackItem] = field(default_factory=list)
+    audio_lanes: List[AudioLane] = field(default_factory=list)
+
+    @staticmethod
+    def path_for(project_path: Path) -> Path:
+        return Path(project_path) / ".videoclaw" / TIMELINE_FILE
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Timeline"]:
+        """读取时间线，文件不存在或损坏时返回 None"""
+        data = read_json(path)
+        if not isinstance(data, dict):
+            return None
+        return cls.from_dict(data)
+
+    def save(self, path: Path) -> None:
+        write_json(path, self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": TIMELINE_VERSION,
+            "clips": [item.to_dict() for item in self.clips],
+            "audio_lanes": [lane.to_dict() for lane in self.audio_lanes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Timeline":
+        return cls(
+            clips=[_item_from_dict(item) for item in data.get("clips", [])],
+            audio_lanes=[AudioLane.from_dict(lane) for lane in data.get("audio_lanes", [])],
+        )
+
+    @classmethod
+    def from_storyboard(cls, shots: Sequence[Shot], sources: Sequence[str]) -> "Timeline":
+        """根据分镜时间段建立时间线
+
+        只有一个视频时（多镜头一次生成），每个镜头截取该视频中对应的时间段；
+        视频数与镜头数相同时，每个镜头对应一个视频，从头截取镜头时长。
+        """
+        if not shots:
+            raise ValueError("分镜中没有找到 【标题】（X-Y秒） 格式的镜头")
+        if len(sources) == 1:
+            clips = [TimelineClip(sources[0], shot.start, shot.end, shot.title) for shot in shots]
+        elif len(sources) == len(shots):
+            clips = [
+                TimelineClip(source, 0.0, shot.end - shot.start, shot.title)
+                for source, shot in zip(sources, shots)
+            ]
+        else:
+            raise ValueError(f"分镜有 {len(shots)} 个镜头，但找到 {len(sources)} 个视频，无法对应")
+        return cls(clips=list(clips))
+
+    def sources(self) -> List[str]:
+        """时间线引用的全部视频素材（去重，保持顺序）"""
+        return list(dict.fromkeys(item.source for item in self.clips if isinstance(item, TimelineClip)))
@@ -7,6 +7,7 @@ from typing import Optional
 
 from playwright.async_api import async_playwright
 
+from videoclaw.ffmpeg.thumbs import find_cover
 from videoclaw.publisher.base import Publisher, PublishResult
 from videoclaw.publisher.cookie_manager import validate_cookie
 
@@ -43,7 +44,10 @@ class DouYinPublisher(Publisher):
         cover_path: Optional[Path] = None,
         account: str = "default",
     ) -> PublishResult:
-        """发布视频到抖音"""
+        """发布视频到抖音
+
+        未指定封面时使用 videoclaw thumbs 为该视频缓存的封面（没有则现场提取）。
+        """
         cookie_path = self.get_cookie_path(account)
 
         if not cookie_path.exists():
@@ -60,6 +64,9 @@ class DouYinPublisher(Publisher):
                 error="Cookie 已失效，请重新登录"
             )
 
+        if cover_path is None:
+            cover_path = await asyncio.to_thread(find_cover, Path(video_path))
+
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=self.headless)
             context = await browser.new_context(storage_state=str(cookie_path))
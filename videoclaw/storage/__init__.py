@@ -1,5 +1,7 @@
 """存储模块"""
 from videoclaw.storage.base import StorageBackend, StorageResult
 from videoclaw.storage.local import LocalStorage
+from videoclaw.storage.objects import ObjectStore
+from videoclaw.storage.references import ReferenceStore, get_reference_store
 
-__all__ = ["StorageBackend", "StorageResult", "LocalStorage"]
+__all__ = ["StorageBackend", "StorageResult", "LocalStorage", "ObjectStore", "ReferenceStore", "get_reference_store"]
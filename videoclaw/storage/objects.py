@@ -0,0 +1,138 @@
+"""对象存储：按对象名上传文件并返回模型服务可以下载的 URL"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+# 预签名 URL 默认有效期（秒）
+DEFAULT_URL_EXPIRES = 7 * 24 * 3600
+
+
+class ObjectStore(ABC):
+    """对象存储后端基类"""
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        """对象是否已经存在"""
+
+    @abstractmethod
+    def put(self, name: str, source: Union[Path, bytes], content_type: str) -> None:
+        """上传文件或字节到 name"""
+
+    @abstractmethod
+    def url(self, name: str) -> Tuple[str, Optional[float]]:
+        """对象的下载 URL 和过期时间戳（永久有效时为 None）"""
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class LocalHTTPStore(ObjectStore):
+    """本地目录 + 后台 HTTP 服务，用于测试和本地调试（外部服务无法访问 127.0.0.1）
+
+    public_base_url 不为空时返回以它为前缀的 URL（例如经内网穿透暴露的地址）。
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        public_base_url: Optional[str] = None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        handler = partial(_QuietHandler, directory=str(self.root))
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        self.base_url = (public_base_url or f"http://{host}:{port}").rstrip("/")
+
+    def exists(self, name: str) -> bool:
+        return (self.root / name).is_file()
+
+    def put(self, name: str, source: Union[Path, bytes], content_type: str) -> None:
+        target = self.root / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(source, bytes):
+                    f.write(source)
+                else:
+                    with open(source, "rb") as src:
+                        shutil.copyfileobj(src, f)
+            os.replace(tmp_name, target)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+    def url(self, name: str) -> Tuple[str, Optional[float]]:
+        return f"{self.base_url}/{name}", None
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class S3Store(ObjectStore):
+    """S3 兼容对象存储（AWS S3、火山引擎 TOS、阿里云 OSS、MinIO 等），需要安装 boto3
+
+    设置 public_base_url（公共读的桶或 CDN 域名）时返回永久 URL，否则返回预签名 URL。
+    凭证按 boto3 的默认方式读取（环境变量、~/.aws/credentials 等）。
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        public_base_url: Optional[str] = None,
+        url_expires: int = DEFAULT_URL_EXPIRES,
+    ):
+        try:
+            import boto3
+        except ImportError as e:
+            raise RuntimeError("S3 存储需要 boto3，请运行: pip install 'videoclaw[s3]'") from e
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self.url_expires = url_expires
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    def exists(self, name: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=name)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, name: str, source: Union[Path, bytes], content_type: str) -> None:
+        extra = {"ContentType": content_type}
+        if isinstance(source, bytes):
+            self._client.put_object(Bucket=self.bucket, Key=name, Body=source, **extra)
+        else:
+            # upload_file 对大文件自动分片并行上传
+            self._client.upload_file(str(source), self.bucket, name, ExtraArgs=extra)
+
+    def url(self, name: str) -> Tuple[str, Optional[float]]:
+        if self.public_base_url:
+            return f"{self.public_base_url}/{name}", None
+        url = self._client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": name}, ExpiresIn=self.url_expires
+        )
+        return url, time.time() + self.url_expires
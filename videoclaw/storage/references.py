@@ -0,0 +1,157 @@
+"""参考素材只上传一次：按内容摘要命名对象，记录 URL，之后的镜头直接传 URL 而不是内联 data URL"""
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from videoclaw.cache import file_digest
+from videoclaw.project.files import read_json, write_json
+from videoclaw.storage.objects import DEFAULT_URL_EXPIRES, LocalHTTPStore, ObjectStore, S3Store
+from videoclaw.utils.logging import get_logger
+
+logger = get_logger(name="storage.references")
+
+# 对象名前缀
+DEFAULT_PREFIX = "videoclaw/refs/"
+
+# 预签名 URL 剩余有效期少于该值（秒）时重新签名，避免任务排队期间过期
+MIN_URL_LIFETIME = 3600
+
+# URL 索引文件（跨进程复用已上传的对象）
+INDEX_PATH = Path.home() / ".videoclaw" / "cache" / "reference_urls.json"
+
+# 索引最多保留的条目数
+MAX_INDEX_ENTRIES = 2000
+
+Payload = Tuple[Union[Path, bytes], str]
+
+
+def _extension(mime: str) -> str:
+    return {"image/jpeg": ".jpg", "audio/mp3": ".mp3"}.get(mime) or mimetypes.guess_extension(mime) or ""
+
+
+class ReferenceStore:
+    """按内容寻址的参考素材上传器
+
+    key 由调用方给出（通常是源文件摘要 + 预处理参数），命中索引时不再预处理也不再上传；
+    未命中时调用 produce() 得到要上传的文件或字节，以其内容摘要命名对象，已存在的对象只重新取 URL。
+    """
+
+    def __init__(
+        self,
+        store: ObjectStore,
+        prefix: str = DEFAULT_PREFIX,
+        index_path: Optional[Path] = INDEX_PATH,
+        namespace: str = "",
+    ):
+        self.store = store
+        self.prefix = prefix
+        # 索引键带上存储标识，切换桶或服务商后不会复用其它存储的 URL
+        self.namespace = namespace
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        if index_path is not None:
+            data = read_json(index_path)
+            if isinstance(data, dict):
+                self._index = data
+        self.uploaded_bytes = 0
+
+    def _fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        if not entry or "url" not in entry:
+            return False
+        expires = entry.get("expires")
+        return expires is None or expires - time.time() > MIN_URL_LIFETIME
+
+    def url_for(self, key: str, produce: Callable[[], Payload]) -> str:
+        """返回 key 对应素材的 URL，必要时上传"""
+        key = f"{self.namespace}|{key}"
+        with self._lock:
+            entry = self._index.get(key)
+            if self._fresh(entry):
+                return entry["url"]
+
+        if entry and entry.get("object") and self.store.exists(entry["object"]):
+            name = entry["object"]
+        else:
+            source, mime = produce()
+            digest = hashlib.sha256(source).hexdigest() if isinstance(source, bytes) else file_digest(source)
+            name = f"{self.prefix}{digest}{_extension(mime)}"
+            if not self.store.exists(name):
+                size = len(source) if isinstance(source, bytes) else Path(source).stat().st_size
+                started = time.monotonic()
+                self.store.put(name, source, mime)
+                self.uploaded_bytes += size
+                logger.info(f"参考素材已上传: {name} {size / 1e6:.2f} MB，{time.monotonic() - started:.1f} 秒")
+        url, expires = self.store.url(name)
+
+        with self._lock:
+            # 重新插入，使字典顺序保持为最近写入在后
+            self._index.pop(key, None)
+            self._index[key] = {"object": name, "url": url, "expires": expires}
+            self._prune_index()
+            if self.index_path is not None:
+                write_json(self.index_path, self._index)
+        return url
+
+    def _prune_index(self) -> None:
+        """去掉已过期的 URL，条目数超过 MAX_INDEX_ENTRIES 时丢弃最早写入的（对象本身按内容摘要命名，之后仍可复用）"""
+        now = time.time()
+        entries = [
+            (key, entry) for key, entry in self._index.items()
+            if isinstance(entry, dict) and (entry.get("expires") is None or entry["expires"] > now)
+        ]
+        self._index = dict(entries[-MAX_INDEX_ENTRIES:])
+
+
+def reference_store_settings(config: Any) -> Dict[str, Any]:
+    """从 Config 对象或配置字典中取出 storage.references"""
+    if isinstance(config, dict):
+        return (config.get("storage") or {}).get("references") or {}
+    return config.get("storage.references", {}) or {}
+
+
+_stores: Dict[tuple, ReferenceStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_reference_store(settings: Dict[str, Any]) -> Optional[ReferenceStore]:
+    """按 storage.references 配置返回上传器（同一配置在进程内共用一个）；provider 为空或 inline 时返回 None"""
+    provider = settings.get("provider") or "inline"
+    if provider == "inline":
+        return None
+    key = tuple(sorted((k, str(v)) for k, v in settings.items()))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = _create_reference_store(provider, settings)
+        return _stores[key]
+
+
+def _create_reference_store(provider: str, settings: Dict[str, Any]) -> ReferenceStore:
+    prefix = settings.get("prefix", DEFAULT_PREFIX)
+    if provider == "s3":
+        if not settings.get("bucket"):
+            raise ValueError("storage.references.bucket is required for the s3 provider")
+        store = S3Store(
+            bucket=settings["bucket"],
+            endpoint_url=settings.get("endpoint_url"),
+            region=settings.get("region"),
+            public_base_url=settings.get("public_base_url"),
+            url_expires=int(settings.get("url_expires", DEFAULT_URL_EXPIRES)),
+        )
+        namespace = f"s3:{settings.get('endpoint_url') or ''}:{store.bucket}:{store.public_base_url or ''}"
+        return ReferenceStore(store, prefix=prefix, namespace=namespace)
+    if provider == "http":
+        root = Path(settings.get("root") or Path.home() / ".videoclaw" / "refs")
+        http_store = LocalHTTPStore(
+            root, port=int(settings.get("port", 0)), public_base_url=settings.get("public_base_url")
+        )
+        # 随机端口的 URL 只在本进程有效，不写索引文件
+        return ReferenceStore(
+            http_store, prefix=prefix, index_path=None, namespace=f"http:{http_store.base_url}"
+        )
+    raise ValueError(f"Unknown reference store provider: {provider}")
@@ -0,0 +1,210 @@
+"""流式下载：分块写入临时文件，断线后用 HTTP Range 续传，校验长度后原子重命名"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+import requests
+
+from videoclaw.utils.http import get_session
+from videoclaw.utils.logging import get_logger
+
+logger = get_logger(name="download")
+
+# 每次写入的块大小（连接中断时最多丢弃一块未写完的数据）
+CHUNK_SIZE = 256 * 1024
+
+# (连接超时, 两次读取之间的超时)，单位秒
+DEFAULT_TIMEOUT = (10, 60)
+
+# 连接中断后的最大续传次数
+DEFAULT_RETRIES = 5
+
+# 续传前等待的基础时间（秒），按次数指数增长
+RETRY_BACKOFF = 1.0
+
+# 未完成的下载以该后缀保存在目标文件旁边，下次下载同一目标时续传
+PART_SUFFIX = ".part"
+
+# part 文件对应的 ETag / Last-Modified，续传时作为 If-Range 发送
+VALIDATOR_SUFFIX = ".validator"
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+class DownloadError(RuntimeError):
+    """下载失败（HTTP 错误、长度不符或重试次数用尽）"""
+
+
+class _ServerError(DownloadError):
+    """5xx 响应，可以重试"""
+
+
+@dataclass
+class DownloadResult:
+    """下载结果：文件路径、总字节数、本次传输的字节数和耗时"""
+    path: Path
+    size: int
+    transferred: int
+    seconds: float
+    resumed: bool = False
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.transferred / self.seconds if self.seconds > 0 else 0.0
+
+
+def _total_size(response: requests.Response, offset: int) -> Optional[int]:
+    """从 Content-Range（206）或 Content-Length（200）得到文件总长度，未知时返回 None"""
+    if response.status_code == 206:
+        match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+        if not match:
+            raise DownloadError(f"无效的 Content-Range: {response.headers.get('Content-Range')}")
+        if int(match.group(1)) != offset:
+            raise DownloadError(f"续传起点不符: 请求 {offset}，返回 {match.group(1)}")
+        return None if match.group(3) == "*" else int(match.group(3))
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def _validator(response: requests.Response) -> Optional[str]:
+    """可用于 If-Range 的校验值：强 ETag，其次 Last-Modified；都没有时返回 None"""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _discard(part: Path, validator_path: Path) -> None:
+    for path in (part, validator_path):
+        if path.exists():
+            path.unlink()
+
+
+def _fetch(
+    url: str,
+    part: Path,
+    timeout: Union[float, Tuple[float, float]],
+    chunk_size: int,
+    on_progress: Optional[Callable[[int, Optional[int]], None]],
+) -> Tuple[int, Optional[int]]:
+    """从 part 已有的长度开始请求并追加写入，返回 (本次写入字节数, 文件总长度)
+
+    续传时带上 If-Range（首次响应的 ETag 或 Last-Modified，保存在 part 旁的 .validator 文件），
+    服务端文件变化后返回完整内容（200），不会把旧数据和新数据拼在一起；没有校验值的 part 文件
+    无法确认来源，丢弃后从头下载。
+    """
+    validator_path = part.with_name(part.name + VALIDATOR_SUFFIX)
+    validator = validator_path.read_text().strip() if validator_path.exists() else ""
+    if part.exists() and not validator:
+        _discard(part, validator_path)
+    offset = part.stat().st_size if part.exists() else 0
+    # 不接受压缩传输，保证写入的字节数可以和 Content-Length 比较
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    with get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416 and offset:
+            match = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+            if match and int(match.group(1)) == offset:
+                # 上次已经下载完整
+                return 0, offset
+            # 长度未知或对不上，丢弃后在本次尝试中从头下载
+            response.close()
+            _discard(part, validator_path)
+            return _fetch(url, part, timeout, chunk_size, on_progress)
+        if response.status_code >= 500:
+            raise _ServerError(f"HTTP {response.status_code}: {url}")
+        if response.status_code >= 400:
+            raise DownloadError(f"HTTP {response.status_code}: {url}")
+        if response.status_code != 206:
+            # 服务端不支持 Range 或文件已变化，从头下载并记录新的校验值
+            offset = 0
+            validator = _validator(response)
+            if validator:
+                validator_path.write_text(validator)
+            elif validator_path.exists():
+                validator_path.unlink()
+        total = _total_size(response, offset)
+
+        written = 0
+        with open(part, "ab" if offset else "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                written += len(chunk)
+                if on_progress is not None:
+                    on_progress(offset + written, total)
+        return written, total
+
+
+def download(
+    url: str,
+    dest: Union[str, Path],
+    timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    chunk_size: int = CHUNK_SIZE,
+    on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> DownloadResult:
+    """下载 url 到 dest
+
+    数据分块写入 dest 旁的 .part 文件，不在内存中保留整个文件；连接中断或读取超时后
+    从已写入的位置用 Range + If-Range 请求续传，最多 retries 次；长度与 Content-Length 一致后
+    才原子重命名为 dest。on_progress(已下载字节数, 总字节数或 None) 在每块写入后调用。
+    请求经过共享连接池，连续下载同一主机的文件时复用连接。
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + PART_SUFFIX)
+    resumed = part.exists() and part.stat().st_size > 0
+    transferred = 0
+    started = time.monotonic()
+
+    attempt = 0
+    while True:
+        try:
+            written, total = _fetch(url, part, timeout, chunk_size, on_progress)
+            transferred += written
+            if not part.exists():
+                error: Exception = DownloadError("没有写入任何数据")
+            else:
+                size = part.stat().st_size
+                # 长度一致（包括 416 确认已完整）时直接完成，不消耗重试次数
+                if total is None or size == total:
+                    break
+                if size > total:
+                    _discard(part, part.with_name(part.name + VALIDATOR_SUFFIX))
+                    raise DownloadError(f"下载长度 {size} 超过 Content-Length {total}")
+                # 连接被提前关闭，剩余部分续传
+                error = DownloadError(f"连接提前结束: {size}/{total} 字节")
+        except (
+            requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, _ServerError
+        ) as e:
+            error = e
+        attempt += 1
+        if attempt > retries:
+            raise DownloadError(f"下载失败（已重试 {retries} 次）: {url}: {error}")
+        wait = RETRY_BACKOFF * 2 ** (attempt - 1)
+        logger.warning(f"下载中断，{wait:g} 秒后续传（第 {attempt} 次）: {error}")
+        time.sleep(wait)
+        resumed = True
+
+    os.replace(part, dest)
+    validator_path = part.with_name(part.name + VALIDATOR_SUFFIX)
+    if validator_path.exists():
+        validator_path.unlink()
+    result = DownloadResult(
+        path=dest, size=dest.stat().st_size, transferred=transferred,
+        seconds=time.monotonic() - started, resumed=resumed,
+    )
+    logger.info(
+        f"下载完成: {dest.name} {result.size / 1e6:.1f} MB，"
+        f"{result.bytes_per_second / 1e6:.2f} MB/s" + ("（续传）" if resumed else "")
+    )
+    return result
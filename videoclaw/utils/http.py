@@ -0,0 +1,69 @@
+"""进程内共享的 HTTP 连接池：保持长连接，同一主机的多次下载复用 TCP/TLS 连接"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 缓存连接池的主机数（模型 API、对象存储 CDN 等）
+POOL_CONNECTIONS = 8
+
+# 每个主机保持的空闲连接数，不小于并行生成/下载的线程数
+POOL_MAXSIZE = 16
+
+# 建立连接失败时的重试次数（请求未发出，任何方法都可以安全重试）
+CONNECT_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+_lock = threading.Lock()
+_adapter: Optional[HTTPAdapter] = None
+_adapter_pid: Optional[int] = None
+_local = threading.local()
+
+
+def _build_adapter() -> HTTPAdapter:
+    # 只重试连接阶段的错误；读取中断和 5xx 由调用方决定（例如下载会用 Range 续传）
+    retry = Retry(
+        total=CONNECT_RETRIES, connect=CONNECT_RETRIES, read=0, status=0, redirect=5,
+        backoff_factor=RETRY_BACKOFF, allowed_methods=None, raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+
+def _shared_adapter() -> HTTPAdapter:
+    """进程内唯一的适配器（urllib3 连接池本身是线程安全的）；fork 后的子进程重新创建"""
+    global _adapter, _adapter_pid
+    with _lock:
+        if _adapter is None or _adapter_pid != os.getpid():
+            _adapter = _build_adapter()
+            _adapter_pid = os.getpid()
+        return _adapter
+
+
+def get_session() -> requests.Session:
+    """当前线程的 Session
+
+    Session 的 Cookie 等状态不是线程安全的，所以每个线程一个 Session，
+    但它们挂载同一个适配器，共享连接池。
+    """
+    adapter = _shared_adapter()
+    session = getattr(_local, "session", None)
+    if session is None or session.get_adapter("https://") is not adapter:
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+def close_sessions() -> None:
+    """关闭共享连接池（测试或长时间空闲后调用），下次 get_session 时重建"""
+    global _adapter
+    with _lock:
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = None
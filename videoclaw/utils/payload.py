@@ -0,0 +1,187 @@
+"""流式 JSON 请求体：文件边读边 base64 编码写入请求体，不在内存中拼出完整的 data URL 和 JSON
+
+请求体不压缩时可以预先算出准确长度（base64 长度只取决于文件大小），以 Content-Length 发送；
+gzip 压缩时长度未知，以分块传输发送。
+"""
+from __future__ import annotations
+
+import base64
+import json
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+import requests
+
+from videoclaw.utils.http import get_session
+
+# 每次从文件读取的字节数，必须是 3 的倍数，分块编码的结果才能直接拼接
+READ_SIZE = 3 * 64 * 1024
+
+# 长度超过该值、且不需要转义的字符串按切片输出，不经过 json.dumps 复制
+_LARGE_STRING = 64 * 1024
+
+
+@dataclass
+class Base64File:
+    """请求体里的一个 data URL 字符串，内容来自文件（或字节），发送时才分块读取编码"""
+    source: Union[str, Path, bytes]
+    mime: str
+
+    @property
+    def prefix(self) -> bytes:
+        return f"data:{self.mime};base64,".encode("ascii")
+
+    def size(self) -> int:
+        if isinstance(self.source, bytes):
+            return len(self.source)
+        return Path(self.source).stat().st_size
+
+    def encoded_length(self) -> int:
+        """data URL 的长度（不含引号）"""
+        return len(self.prefix) + (self.size() + 2) // 3 * 4
+
+    def iter_encoded(self, read_size: int = READ_SIZE) -> Iterator[bytes]:
+        yield self.prefix
+        if isinstance(self.source, bytes):
+            view = memoryview(self.source)
+            for start in range(0, len(view), read_size):
+                yield base64.b64encode(view[start:start + read_size])
+            return
+        with open(self.source, "rb") as f:
+            while True:
+                chunk = f.read(read_size)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+
+
+def _is_plain(text: str) -> bool:
+    """JSON 编码时不需要转义（可以原样输出）的字符串"""
+    return text.isascii() and text.isprintable() and '"' not in text and "\\" not in text
+
+
+def _pieces(value: Any) -> Iterator[Union[bytes, str, Base64File]]:
+    """把 value 拆成 JSON 片段：小的部分是已编码的 bytes，大字符串和文件保持引用"""
+    if isinstance(value, Base64File):
+        yield b'"'
+        yield value
+        yield b'"'
+    elif isinstance(value, Mapping):
+        yield b"{"
+        for i, (key, item) in enumerate(value.items()):
+            yield (b"," if i else b"") + json.dumps(str(key)).encode() + b":"
+            yield from _pieces(item)
+        yield b"}"
+    elif isinstance(value, (list, tuple)):
+        yield b"["
+        for i, item in enumerate(value):
+            if i:
+                yield b","
+            yield from _pieces(item)
+        yield b"]"
+    elif isinstance(value, str) and len(value) > _LARGE_STRING and _is_plain(value):
+        yield b'"'
+        yield value
+        yield b'"'
+    else:
+        yield json.dumps(value).encode()
+
+
+class JsonBody:
+    """可重复迭代的流式 JSON 请求体
+
+    requests 对有 __len__ 的可迭代对象发送 Content-Length，对生成器使用分块传输。
+    """
+
+    def __init__(self, value: Any, gzip: bool = False, read_size: int = READ_SIZE):
+        self.value = value
+        self.gzip = gzip
+        self.read_size = read_size
+
+    def _iter_raw(self) -> Iterator[bytes]:
+        pending: List[bytes] = []
+        pending_size = 0
+        for piece in _pieces(self.value):
+            if isinstance(piece, bytes):
+                # 合并小片段，减少写入次数
+                pending.append(piece)
+                pending_size += len(piece)
+                if pending_size < self.read_size:
+                    continue
+                yield b"".join(pending)
+                pending, pending_size = [], 0
+                continue
+            if pending:
+                yield b"".join(pending)
+                pending, pending_size = [], 0
+            if isinstance(piece, Base64File):
+                yield from piece.iter_encoded(self.read_size)
+            else:
+                for start in range(0, len(piece), self.read_size):
+                    yield piece[start:start + self.read_size].encode("ascii")
+        if pending:
+            yield b"".join(pending)
+
+    def __iter__(self) -> Iterator[bytes]:
+        if not self.gzip:
+            yield from self._iter_raw()
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in self._iter_raw():
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def content_length(self) -> Optional[int]:
+        """未压缩请求体的准确字节数；gzip 时返回 None"""
+        if self.gzip:
+            return None
+        total = 0
+        for piece in _pieces(self.value):
+            if isinstance(piece, Base64File):
+                total += piece.encoded_length()
+            else:
+                total += len(piece)
+        return total
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.gzip:
+            headers["Content-Encoding"] = "gzip"
+        return headers
+
+    def data(self) -> Union["_SizedBody", Iterator[bytes]]:
+        """传给 requests 的 data 参数"""
+        length = self.content_length()
+        return iter(self) if length is None else _SizedBody(self, length)
+
+
+class _SizedBody:
+    """带长度的可迭代对象，requests 据此发送 Content-Length 而不是分块传输"""
+
+    def __init__(self, body: JsonBody, length: int):
+        self._body = body
+        self._length = length
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._body)
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def post_json(
+    url: str,
+    value: Any,
+    headers: Optional[Mapping[str, str]] = None,
+    gzip: bool = False,
+    timeout: Union[float, Tuple[float, float]] = (10, 300),
+) -> requests.Response:
+    """用共享连接池以流式请求体 POST value（其中的 Base64File 在发送时才读取）"""
+    body = JsonBody(value, gzip=gzip)
+    return get_session().post(
+        url, data=body.data(), headers={**body.headers(), **(headers or {})}, timeout=timeout
+    )